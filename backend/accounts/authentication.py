@@ -0,0 +1,62 @@
+"""
+JWT authentication that resolves the token's user without a query.
+
+Tokens carry the user's role and provider_id as signed claims
+(ClaimsTokenObtainPairSerializer). The user itself comes from
+accounts.user_cache: a regular User instance with its Provider attached,
+so permission checks (role, provider_id), request.user.provider and
+foreign key assignment all work without a database round trip.
+
+A token whose role / provider claims no longer match the user (changed
+since login) is rejected, so role changes take effect immediately rather
+than when the token expires.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import user_cache
+
+
+def _claims(user):
+    return {"role": user.role, "provider_id": str(user.provider_id) if user.provider_id else None}
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Copied into every access token minted from this refresh token
+        for claim, value in _claims(user).items():
+            token[claim] = value
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = user_cache.get_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Tokens issued before the claims were added carry none; let them run out
+        if "role" in validated_token:
+            token_claims = {claim: validated_token.get(claim) for claim in ("role", "provider_id")}
+            if token_claims != _claims(user):
+                raise AuthenticationFailed(_("Role or provider changed since login"), code="claims_changed")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from integrations.flowable_service import FlowableUserService
+from . import user_cache
 import uuid
 
 
@@ -21,6 +22,15 @@ class User(AbstractUser):
         related_name="users"
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Cached copies are used to authenticate requests
+        user_cache.invalidate(self.pk)
+
+    def delete(self, *args, **kwargs):
+        user_cache.invalidate(self.pk)
+        return super().delete(*args, **kwargs)
+
     def sync_to_flowable(self, groups=None):
         """Sync this user to Flowable"""
         try:
@@ -1,3 +1,127 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from providers.models import Provider
+from . import user_cache
+from .authentication import CachedJWTAuthentication, ClaimsTokenObtainPairSerializer
+from .models import User
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.user = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.provider)
+
+    def setUp(self):
+        # Users are cached by id, and the users outlive each test
+        cache.clear()
+
+    def committed(self):
+        # The cache entry is dropped when the saving transaction commits
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def _token(self, user=None):
+        return str(ClaimsTokenObtainPairSerializer.get_token(user or self.user).access_token)
+
+    def _authenticate(self, token):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def _rejected(self, token):
+        with self.assertRaises(AuthenticationFailed) as raised:
+            self._authenticate(token)
+        return raised.exception.detail["code"]
+
+    def test_cached_user_needs_no_query(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.assertNumQueries(0):
+            user = self._authenticate(token)
+            self.assertEqual((user.pk, user.role, user.provider.name), (self.user.pk, "SUPPLIER_REP", "Acme"))
+
+    def test_role_or_provider_change_rejects_older_tokens(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.committed():
+            self.user.role = "PROVIDER_ADMIN"
+            self.user.save()
+        self.assertEqual(self._rejected(token), "claims_changed")
+        self.assertEqual(self._authenticate(self._token()).role, "PROVIDER_ADMIN")
+
+        token = self._token()
+        other = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        with self.committed():
+            self.user.provider = other
+            self.user.save()
+        self.assertEqual(self._rejected(token), "claims_changed")
+
+    def test_tokens_without_claims_are_still_accepted(self):
+        self.assertEqual(self._authenticate(str(AccessToken.for_user(self.user))).pk, self.user.pk)
+
+    def test_inactive_user_is_rejected(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.committed():
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self._rejected(token), "user_inactive")
+
+    def test_user_save_invalidates_the_cached_copy(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.committed():
+            self.user.first_name = "Renamed"
+            self.user.save()
+
+        self.assertIsNone(cache.get(user_cache._key(self.user.pk)))
+        self.assertEqual(self._authenticate(token).first_name, "Renamed")
+
+    def test_provider_save_invalidates_its_users(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.committed():
+            self.provider.name = "Acme Ltd"
+            self.provider.save()
+
+        self.assertEqual(self._authenticate(token).provider.name, "Acme Ltd")
+
+    def test_invalidation_waits_for_the_commit(self):
+        token = self._token()
+        self._authenticate(token)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            # Still cached until the change is committed
+            self.assertTrue(self._authenticate(token).is_active)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._rejected(token), "user_inactive")
+
+    def test_queryset_update_shows_up_when_the_entry_expires(self):
+        token = self._token()
+        self._authenticate(token)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # Bypasses save(), as does a save() in another process with a per-process cache
+        self.assertTrue(self._authenticate(token).is_active)
+
+        cache.delete(user_cache._key(self.user.pk))
+        self.assertEqual(self._rejected(token), "user_inactive")
+
+    def test_unknown_user_is_rejected(self):
+        token = self._token()
+        self.user.delete()
+
+        self.assertEqual(self._rejected(token), "user_not_found")
@@ -0,0 +1,79 @@
+"""
+Short-lived cache of User rows (with their Provider) for request
+authentication, so resolving request.user, its role and
+request.user.provider takes no query.
+
+Entries live USER_CACHE_TTL seconds and are deleted when the user or
+their provider is saved or deleted (User.save()/delete(),
+Provider.save()/delete()). Changes that bypass those methods
+(queryset.update()) show up once the entry expires.
+
+Invalidation only reaches the cache the changing process uses. With the
+default LocMemCache every process has its own: a user deactivated or
+demoted in one uvicorn worker (or in the dispatcher container) keeps
+authenticating, with their old role, on every other process for up to
+USER_CACHE_TTL seconds. Run several processes with a shared CACHE_BACKEND
+(Redis, Memcached) for immediate effect, or lower USER_CACHE_TTL.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+def _key(user_id):
+    return f"accounts:user:{user_id}"
+
+
+# Left out of the cache (and loaded on access if ever needed)
+_UNCACHED_FIELDS = {"password"}
+
+
+def _snapshot(instance):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in _UNCACHED_FIELDS
+    }
+
+
+def _restore(model, values):
+    # A regular model instance, as if loaded from the database; fields
+    # added since the entry was cached are simply deferred
+    return model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+
+
+def get_user(user_id):
+    """The User with `user_id` (provider attached), or None"""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Provider = apps.get_model("providers", "Provider")
+
+    entry = cache.get(_key(user_id))
+    if entry is None:
+        user = User.objects.select_related("provider").filter(pk=user_id).first()
+        if user is None:
+            return None
+
+        cache.set(
+            _key(user_id),
+            {"user": _snapshot(user), "provider": _snapshot(user.provider) if user.provider else None},
+            settings.USER_CACHE_TTL,
+        )
+        return user
+
+    user = _restore(User, entry["user"])
+    if entry["provider"] is not None:
+        user.provider = _restore(Provider, entry["provider"])
+    return user
+
+
+def invalidate(*user_ids):
+    """Drop cached users once the current transaction commits"""
+    keys = [_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_provider(provider):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    invalidate(*User.objects.filter(provider=provider).values_list("pk", flat=True))
@@ -32,7 +32,7 @@ class UserViewSet(
     - Users can view themselves
     - List is limited to same provider (unless staff)
     """
-    queryset = User.objects.select_related("provider").all()
+    queryset = User.objects.select_related("provider").order_by("-date_joined")
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
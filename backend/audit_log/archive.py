@@ -0,0 +1,13 @@
+from config.retention import Archive
+from .models import AuditLog
+
+# Old entries moved out of the table by `manage.py archive_audit_logs`
+audit_archive = Archive(
+    "audit_logs",
+    AuditLog,
+    fields=[
+        "id", "created_at", "user_id", "user_role",
+        "action_category", "action_type", "result",
+        "description", "entity_type", "entity_id", "metadata",
+    ],
+)
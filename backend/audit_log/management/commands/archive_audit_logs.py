@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from audit_log.archive import audit_archive
+
+
+class Command(BaseCommand):
+    help = "Move audit log entries older than the retention period to compressed archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.AUDIT_LOG_RETENTION_DAYS)
+        parser.add_argument("--limit", type=int, default=None, help="Move at most LIMIT entries this run")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        moved = audit_archive.archive_before(cutoff, limit=options["limit"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} audit log entries older than {cutoff:%Y-%m-%d %H:%M} to {audit_archive.directory}"
+        ))
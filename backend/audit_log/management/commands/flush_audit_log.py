@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from audit_log.sink import audit_spool
+
+
+class Command(BaseCommand):
+    help = "Write audit log entries left in the spool by stopped processes to the database"
+
+    def handle(self, *args, **options):
+        flushed = audit_spool.adopt_orphans()
+
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} audit log entries"))
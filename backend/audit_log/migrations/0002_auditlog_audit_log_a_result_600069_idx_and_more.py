@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit_log', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['result', '-created_at'], name='audit_log_a_result_600069_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user_role', '-created_at'], name='audit_log_a_user_ro_1cf84d_idx'),
+        ),
+    ]
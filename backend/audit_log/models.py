@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
+from . import sink
+
 User = get_user_model()
 
 
@@ -139,6 +141,8 @@ class AuditLog(models.Model):
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['action_category', '-created_at']),
             models.Index(fields=['action_type', '-created_at']),
+            models.Index(fields=['result', '-created_at']),
+            models.Index(fields=['user_role', '-created_at']),
         ]
     
     def __str__(self):
@@ -147,7 +151,9 @@ class AuditLog(models.Model):
     @classmethod
     def log_action(cls, user, action_type, action_category, description='', entity_type='', entity_id='', metadata=None, result='SUCCESS', request=None):
         """
-        Helper method to create audit log entries
+        Helper method to create audit log entries.
+        Written directly or through the spool, depending on AUDIT_LOG_MODE
+        (see audit_log.sink).
         
         Usage:
         AuditLog.log_action(
@@ -161,14 +167,14 @@ class AuditLog(models.Model):
             request=request
         )
         """
-        return cls.objects.create(
+        return sink.write(
             user=user,
-            user_role=getattr(user, 'role', 'Unknown'),
-            action_category=action_category,
             action_type=action_type,
-            result=result,
+            action_category=action_category,
             description=description,
             entity_type=entity_type,
-            entity_id=str(entity_id),
-            metadata=metadata or {},
+            entity_id=entity_id,
+            metadata=metadata,
+            result=result,
+            created_at=timezone.now(),
         )
@@ -0,0 +1,265 @@
+"""
+Buffered audit log writer.
+
+In "buffered" mode AuditLog.log_action() appends the entry to a per-process
+spool file (one JSON line, no database write) and a background thread
+moves spooled entries into the database with bulk_create once
+AUDIT_LOG_FLUSH_SIZE entries are waiting or every AUDIT_LOG_FLUSH_INTERVAL
+seconds, and once more at interpreter exit.
+
+The spool file is the source of truth until its entries are committed, so
+a process killed before flushing loses nothing: each process holds an
+flock on its own lock file, and any process (or `manage.py
+flush_audit_log`) that can take the lock of a dead process adopts and
+flushes its spool files. A file that cannot be written (bad entries, a
+database error) is renamed to *.failed and left for inspection, so it
+never holds back the files after it.
+
+"sync" mode inserts each entry in the calling request, as before.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+
+
+class AuditSpool:
+    def __init__(self, directory=None, flush_size=None, flush_interval=None):
+        self.directory = Path(directory or settings.AUDIT_LOG_SPOOL_DIR)
+        self.flush_size = flush_size or settings.AUDIT_LOG_FLUSH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_LOG_FLUSH_INTERVAL
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+        self._pid = None
+        self._token = None
+        self._lock_file = None
+        self._active = None
+        self._pending = 0
+        self._sequence = 0
+        self._thread = None
+
+    # ---- process lifecycle ----
+
+    def _ensure_started(self):
+        # Spool files and the flusher thread must not be shared across forked workers
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._token = f"{pid}-{uuid.uuid4().hex[:8]}"
+            # Lock before the file becomes visible, so it never looks orphaned
+            staging = self.directory / f"{self._token}.lock.tmp"
+            self._lock_file = open(staging, "w")
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            staging.rename(self.directory / f"{self._token}.lock")
+
+            self._active = None
+            self._pending = 0
+            self._sequence = 0
+            self._stopping.clear()
+            self._pid = pid
+
+            self._thread = threading.Thread(target=self._run, name="audit-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.adopt_orphans()
+        except Exception as e:
+            print(f"Audit log spool recovery failed: {e}")
+
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Audit log flush failed: {e}")
+            finally:
+                # The flusher thread owns its own database connection
+                connections.close_all()
+
+    def shutdown(self):
+        """Stop the flusher thread and flush everything still spooled"""
+        if self._pid != os.getpid():
+            return
+
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+        if not self._spool_files(self._token):
+            (self.directory / f"{self._token}.lock").unlink(missing_ok=True)
+
+    # ---- writing ----
+
+    def append(self, entry):
+        self._ensure_started()
+        line = json.dumps(entry, cls=DjangoJSONEncoder) + "\n"
+
+        with self._lock:
+            if self._active is None:
+                self._sequence += 1
+                path = self.directory / f"{self._token}.{self._sequence:08d}.jsonl"
+                self._active = open(path, "a", encoding="utf-8")
+            self._active.write(line)
+            self._active.flush()
+            self._pending += 1
+            full = self._pending >= self.flush_size
+
+        if full:
+            self._wakeup.set()
+
+    def _rotate(self):
+        """
+        Close the active file and return the spool files of this process,
+        all closed at this point. Listed under the same lock append() opens
+        files with, so a file started by a later entry is never among them.
+        """
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+                self._pending = 0
+            return self._spool_files(self._token)
+
+    # ---- flushing ----
+
+    def _spool_files(self, token):
+        return sorted(self.directory.glob(f"{token}.*.jsonl"))
+
+    def _flush_file(self, path):
+        from django.contrib.auth import get_user_model
+        from .models import AuditLog
+
+        entries = []
+        with open(path, encoding="utf-8") as spool:
+            for line in spool:
+                # A line cut short by a crash is the only way to get bad JSON here
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    print(f"Skipping truncated audit log entry in {path.name}")
+
+        # Users deleted since the entry was spooled; a direct INSERT would
+        # have been SET_NULL by the delete
+        user_ids = {entry["user_id"] for entry in entries if entry.get("user_id") is not None}
+        existing = {
+            str(pk) for pk in get_user_model().objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+        }
+        for entry in entries:
+            if entry.get("user_id") is not None and str(entry["user_id"]) not in existing:
+                entry["user_id"] = None
+
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(
+                [AuditLog(**entry) for entry in entries],
+                batch_size=settings.AUDIT_LOG_FLUSH_SIZE,
+            )
+        path.unlink()
+        return len(entries)
+
+    def _flush_files(self, paths):
+        """Flush `paths` one by one, setting aside any that fail"""
+        flushed = 0
+        for path in paths:
+            try:
+                flushed += self._flush_file(path)
+            except Exception as e:
+                failed = path.with_suffix(".failed")
+                path.rename(failed)
+                print(f"Audit log spool file {path.name} could not be written, moved to {failed.name}: {e}")
+        return flushed
+
+    def flush(self):
+        """
+        Write every closed spool file of this process to the database.
+        Returns the number of entries written.
+        """
+        if self._pid != os.getpid():
+            return 0
+
+        with self._flush_lock:
+            return self._flush_files(self._rotate())
+
+    def adopt_orphans(self):
+        """
+        Flush the spool files of processes that exited without flushing.
+        Returns the number of entries written.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        flushed = 0
+
+        for lock_path in self.directory.glob("*.lock"):
+            token = lock_path.stem
+            if token == self._token:
+                continue
+
+            with open(lock_path, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Owner is still running
+                    continue
+
+                flushed += self._flush_files(self._spool_files(token))
+                lock_path.unlink()
+
+        return flushed
+
+
+def _entry(*, user, action_type, action_category, description, entity_type, entity_id, metadata, result, created_at):
+    return {
+        "user_id": getattr(user, "pk", None),
+        "user_role": getattr(user, "role", "Unknown"),
+        "action_category": action_category,
+        "action_type": action_type,
+        "result": result,
+        "description": description,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "metadata": metadata or {},
+        "created_at": created_at,
+    }
+
+
+def write(**fields):
+    """
+    Record one audit entry according to AUDIT_LOG_MODE. Buffered entries
+    are spooled only when the surrounding transaction commits, so a
+    rolled-back action leaves no audit row, as with a direct INSERT.
+    """
+    from .models import AuditLog
+
+    entry = _entry(**fields)
+
+    if settings.AUDIT_LOG_MODE == "sync":
+        return AuditLog.objects.create(**entry)
+
+    # isoformat() keeps microseconds; DjangoJSONEncoder would cut them to milliseconds
+    spooled = {**entry, "created_at": entry["created_at"].isoformat()}
+    transaction.on_commit(lambda: audit_spool.append(spooled))
+    return AuditLog(**entry)
+
+
+# Singleton instance
+audit_spool = AuditSpool()
+atexit.register(audit_spool.shutdown)
@@ -1,14 +1,21 @@
+from django.contrib.auth import get_user_model
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
+from config.exports import ExportMixin, export_format, streaming_export
+from config.pagination import CreatedAtCursorPagination
+from config.retention import requested_days
+from .archive import audit_archive
 from .models import AuditLog
 from .serializers import AuditLogSerializer
 from .permissions import CanViewAuditLogs
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
     
     # Filterable fields
     filterset_fields = ['action_category', 'action_type', 'user', 'result', 'user_role']
@@ -18,17 +25,54 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     
     # Ordering
     ordering_fields = ['created_at']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+
+    # Columns of GET /export/
+    export_fields = [
+        'id', 'created_at', 'user_id', 'user__username', 'user_role',
+        'action_category', 'action_type', 'result',
+        'description', 'entity_type', 'entity_id', 'metadata',
+    ]
+    export_filename = 'audit-logs'
     
     def get_queryset(self):
         """
         Filter logs based on user's company
         """
         user = self.request.user
+        # The serializer shows each entry's username
+        queryset = AuditLog.objects.select_related('user')
         
         # Provider Admin can see all logs for their company
         if user.role == 'PROVIDER_ADMIN':
-            return AuditLog.objects.filter(user__provider=user.provider)
+            return queryset.filter(user__provider=user.provider)
         
         # Other users can only see their own logs
-        return AuditLog.objects.filter(user=user)
+        return queryset.filter(user=user)
+
+    @action(detail=False, methods=["get"], url_path="archive")
+    def archive(self, request):
+        """
+        Archived entries (see archive_audit_logs) created between ?start=
+        and ?end= (dates, inclusive), streamed like export/. Same scoping
+        as the list: a Provider Admin sees their company's users.
+        """
+        start, end = requested_days(request)
+        output_format = export_format(request)
+
+        user = request.user
+        if user.role == 'PROVIDER_ADMIN':
+            users = get_user_model().objects.filter(provider=user.provider).values_list('id', flat=True)
+            user_ids = {str(user_id) for user_id in users}
+        else:
+            user_ids = {str(user.pk)}
+
+        fields = audit_archive.fields
+        rows = audit_archive.read(start=start, end=end, where=lambda row: row['user_id'] in user_ids)
+
+        return streaming_export(
+            (tuple(row[field] for field in fields) for row in rows),
+            fields=fields,
+            export_format=output_format,
+            filename='audit-logs-archive',
+        )
@@ -0,0 +1,56 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter, OrderingFilter
+
+
+class GuardedSearchFilter(SearchFilter):
+    """
+    SearchFilter that refuses plain `icontains` search on large result sets.
+
+    Un-prefixed search_fields become `LIKE '%term%'`, which no B-tree index
+    can serve. When the (already filtered) queryset holds more than
+    SEARCH_MAX_SCAN_ROWS rows the client has to narrow it with indexed
+    filters first. Prefixed fields (`^`, `=`) are not guarded, so a view
+    whose search_fields are all prefixed pays no extra COUNT.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        if search_fields and self.get_search_terms(request):
+            unindexed = [field for field in search_fields if field[0] not in self.lookup_prefixes]
+            limit = settings.SEARCH_MAX_SCAN_ROWS
+            if unindexed and queryset[:limit + 1].count() > limit:
+                raise ValidationError({
+                    self.search_param: (
+                        f"Search would scan more than {limit} rows. "
+                        f"Narrow the results with filters first."
+                    )
+                })
+        return super().filter_queryset(request, queryset, view)
+
+
+class DeclaredOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter limited to the view's declared `ordering_fields`.
+    Views that declare none cannot be re-ordered from the query string.
+    Undeclared terms are a 400 rather than silently dropped, since an
+    ordering the client did not get is easy to miss.
+    """
+
+    def get_valid_fields(self, queryset, view, context={}):
+        if getattr(view, "ordering_fields", None) is None:
+            return []
+        return super().get_valid_fields(queryset, view, context)
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        valid = super().remove_invalid_fields(queryset, fields, view, request)
+        invalid = [term for term in fields if term and term not in valid]
+        if invalid:
+            allowed = [name for name, _ in self.get_valid_fields(queryset, view, {"request": request})]
+            raise ValidationError({
+                self.ordering_param: (
+                    f"Cannot order by {', '.join(invalid)}. "
+                    f"Allowed: {', '.join(allowed) or 'none'}."
+                )
+            })
+        return valid
@@ -0,0 +1,24 @@
+from django.conf import settings
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Default page-number pagination for list endpoints.
+    Clients may ask for ?page_size= up to MAX_PAGE_SIZE.
+    """
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination for append-heavy tables (audit logs).
+
+    Pages are fetched with `WHERE created_at < <cursor>` on the
+    (…, created_at) index, so a deep page costs the same as the first
+    one. The response carries next/previous cursor links and no count.
+    """
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = settings.MAX_PAGE_SIZE
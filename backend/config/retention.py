@@ -0,0 +1,156 @@
+"""
+Retention for append-only tables: rows older than a cutoff are moved out
+of the database into gzip-compressed NDJSON files partitioned by day,
+
+    ARCHIVE_DIR/<archive name>/<YYYY-MM-DD>/<first row time>-<first row pk>.ndjson.gz
+
+and read back on demand with Archive.read().
+
+Rows are moved oldest first, ARCHIVE_CHUNK_SIZE at a time. Each chunk is
+written and fsynced before its rows are deleted in a short transaction of
+its own, so writers wait at most one chunk's DELETE, and a crash in
+between leaves the rows in the table. The next run then rewrites the same
+file name (the chunk starts at the same oldest row) instead of archiving
+them twice.
+"""
+import gzip
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+
+def _json_default(value):
+    # isoformat() keeps microseconds; DjangoJSONEncoder would cut them to milliseconds
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def _write_atomic(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(path.name + ".tmp")
+    with open(staging, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            for row in rows:
+                archive.write((json.dumps(row, default=_json_default) + "\n").encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(staging, path)
+
+
+def requested_days(request):
+    """(start, end) dates of an archive query, from ?start= and ?end= (YYYY-MM-DD)"""
+    days = {}
+    for param in ("start", "end"):
+        try:
+            days[param] = date.fromisoformat(request.query_params.get(param, ""))
+        except ValueError:
+            raise ValidationError({param: "Required, as YYYY-MM-DD"})
+
+    if days["start"] > days["end"]:
+        raise ValidationError({"end": "Must not be before start"})
+    return days["start"], days["end"]
+
+
+class Archive:
+    """
+    `fields` are the columns archived (values() names); they must include
+    the primary key and created_at. `directory` defaults to
+    ARCHIVE_DIR/<name>.
+    """
+
+    def __init__(self, name, model, fields, directory=None):
+        self.name = name
+        self.model = model
+        self.fields = list(fields)
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return Path(self._directory or Path(settings.ARCHIVE_DIR) / self.name)
+
+    # ---- archiving ----
+
+    def _write_chunk(self, rows):
+        pk_name = self.model._meta.pk.name
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row["created_at"].date(), []).append(row)
+
+        for day, day_rows in by_day.items():
+            first = day_rows[0]
+            path = self.directory / day.isoformat() / f"{first['created_at']:%H%M%S%f}-{first[pk_name]}.ndjson.gz"
+            _write_atomic(path, day_rows)
+
+    def archive_before(self, cutoff, *, chunk_size=None, pause=None, limit=None):
+        """
+        Move rows created before `cutoff` into the archive.
+        Returns the number of rows moved.
+        """
+        chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+        pause = settings.ARCHIVE_PAUSE if pause is None else pause
+        pk_name = self.model._meta.pk.name
+
+        moved = 0
+        while limit is None or moved < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - moved)
+            rows = list(
+                self.model.objects.filter(created_at__lt=cutoff)
+                .order_by("created_at", pk_name)
+                .values(*self.fields)[:size]
+            )
+            if not rows:
+                break
+
+            self._write_chunk(rows)
+            with transaction.atomic():
+                self.model.objects.filter(pk__in=[row[pk_name] for row in rows]).delete()
+            moved += len(rows)
+
+            # Let queued writers in between chunks
+            if pause:
+                time.sleep(pause)
+
+        return moved
+
+    # ---- reading ----
+
+    def days(self, start=None, end=None):
+        """Archived days (dates) between `start` and `end`, inclusive"""
+        if not self.directory.is_dir():
+            return []
+
+        days = []
+        for entry in self.directory.iterdir():
+            try:
+                day = date.fromisoformat(entry.name)
+            except ValueError:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def read(self, *, start=None, end=None, where=None):
+        """
+        Archived rows created on days `start` to `end` (inclusive), oldest
+        first, as dicts of the archived fields with JSON values (datetimes,
+        UUIDs and decimals as strings). `where(row)` filters rows.
+        Only the matching day partitions are opened.
+        """
+        for day in self.days(start, end):
+            for path in sorted((self.directory / day.isoformat()).glob("*.ndjson.gz")):
+                with gzip.open(path, "rt", encoding="utf-8") as archive:
+                    for line in archive:
+                        row = json.loads(line)
+                        if where is None or where(row):
+                            yield row
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework_simplejwt",
     "corsheaders",
+    "django_filters",
 
     # Local apps
     "accounts",
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     "service_requests",
     "specialists",
     "service_orders",
+    "outbox",
 ]
 
 MIDDLEWARE = [
@@ -83,6 +85,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Read only by the test runner (manage.py test); runserver and migrate
+        # never use it. File-backed, so the concurrency tests see the same
+        # locking as the real database rather than in-memory shared cache
+        'TEST': {'NAME': os.getenv('TEST_DB_NAME', BASE_DIR / 'test_db.sqlite3')},
     }
 }
 
@@ -134,12 +140,35 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_FILTER_BACKENDS": (
+        "django_filters.rest_framework.DjangoFilterBackend",
+        "config.filters.GuardedSearchFilter",
+        "config.filters.DeclaredOrderingFilter",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "config.pagination.StandardPagination",
+    "PAGE_SIZE": int(os.getenv("PAGE_SIZE", "25")),
+}
+
+# Tokens carry role / provider_id claims; requests resolve the user from a
+# cache kept USER_CACHE_TTL seconds (accounts.authentication). Saving a
+# user clears only the saving process's entry when the cache is per
+# process, so other processes see a deactivation or role change up to
+# USER_CACHE_TTL seconds late (accounts.user_cache)
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.authentication.ClaimsTokenObtainPairSerializer",
 }
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+
+# Upper bound for ?page_size= on paginated list endpoints
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# ?search= with unindexed (icontains) fields is refused above this many rows
+SEARCH_MAX_SCAN_ROWS = int(os.getenv("SEARCH_MAX_SCAN_ROWS", "10000"))
 
 
 FLOWABLE_API_KEY = os.getenv("FLOWABLE_API_KEY")
@@ -153,9 +182,79 @@ FLOWABLE_AUTH = (
     FLOWABLE_REST_PASSWORD,
 )
 
+# Flowable HTTP connection pool
+FLOWABLE_POOL_SIZE = int(os.getenv("FLOWABLE_POOL_SIZE", "10"))
+FLOWABLE_CONNECT_TIMEOUT = float(os.getenv("FLOWABLE_CONNECT_TIMEOUT", "3.05"))
+FLOWABLE_READ_TIMEOUT = float(os.getenv("FLOWABLE_READ_TIMEOUT", "10"))
+FLOWABLE_MAX_RETRIES = int(os.getenv("FLOWABLE_MAX_RETRIES", "3"))
+
+# Rows fetched per Flowable task query page
+FLOWABLE_TASK_PAGE_SIZE = int(os.getenv("FLOWABLE_TASK_PAGE_SIZE", "100"))
+
+# Mirror submitted offers onto the bidding process as a variable
+FLOWABLE_SYNC_SUBMITTED_OFFERS = os.getenv("FLOWABLE_SYNC_SUBMITTED_OFFERS", "True") == "True"
+
+# Outbox dispatcher (manage.py dispatch_outbox)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "600"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+
+# Rows fetched per database round trip by the streaming /export/ endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Audit log writer: "buffered" spools entries to AUDIT_LOG_SPOOL_DIR and
+# bulk-inserts them in the background; "sync" (the default) inserts in the
+# request. Deployments opt into "buffered" (see docker-compose.yml)
+AUDIT_LOG_MODE = os.getenv("AUDIT_LOG_MODE", "sync")
+AUDIT_LOG_SPOOL_DIR = os.getenv("AUDIT_LOG_SPOOL_DIR", str(BASE_DIR / "audit_spool"))
+AUDIT_LOG_FLUSH_SIZE = int(os.getenv("AUDIT_LOG_FLUSH_SIZE", "200"))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL", "2"))
+
+# Live notification stream (GET /api/notifications/notifications/stream/).
+# The in-process backend only reaches streams in the publishing process,
+# i.e. a single ASGI worker
+NOTIFICATION_PUBSUB_BACKEND = os.getenv("NOTIFICATION_PUBSUB_BACKEND", "notifications.pubsub.InProcessBackend")
+NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", "15"))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+NOTIFICATION_STREAM_REPLAY_LIMIT = int(os.getenv("NOTIFICATION_STREAM_REPLAY_LIMIT", "100"))
+
+# Unread notification counters and authenticated users are read through
+# the cache. The default cache is per process; point CACHE_BACKEND /
+# CACHE_LOCATION at a shared cache when running several processes
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+NOTIFICATION_UNREAD_CACHE_TTL = int(os.getenv("NOTIFICATION_UNREAD_CACHE_TTL", "300"))
+
+# Retention: rows older than these many days are moved to compressed
+# NDJSON files under ARCHIVE_DIR (manage.py archive_audit_logs /
+# archive_notifications), ARCHIVE_CHUNK_SIZE rows per delete transaction,
+# pausing ARCHIVE_PAUSE seconds between chunks
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", str(BASE_DIR / "archive"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "1000"))
+ARCHIVE_PAUSE = float(os.getenv("ARCHIVE_PAUSE", "0.05"))
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "365"))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "180"))
+
+# Largest list accepted by POST /api/requests/service-requests/generate-bulk/
+GENERATE_BULK_MAX_ITEMS = int(os.getenv("GENERATE_BULK_MAX_ITEMS", "500"))
+
 DJANGO_BASE_URL = os.environ.get('DJANGO_BASE_URL', 'http://django:8000')
 THIRD_PARTY_API_BASE = os.getenv("THIRD_PARTY_API_BASE")
 
+# 3rd party API connection pool, timeouts and call_many() worker pool
+THIRD_PARTY_POOL_SIZE = int(os.getenv("THIRD_PARTY_POOL_SIZE", "10"))
+THIRD_PARTY_CONNECT_TIMEOUT = float(os.getenv("THIRD_PARTY_CONNECT_TIMEOUT", "3.05"))
+THIRD_PARTY_READ_TIMEOUT = float(os.getenv("THIRD_PARTY_READ_TIMEOUT", "10"))
+THIRD_PARTY_MAX_WORKERS = int(os.getenv("THIRD_PARTY_MAX_WORKERS", "8"))
+
 
 # Add CSRF_TRUSTED_ORIGINS
 CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS', 'http://localhost:8000').split(',')
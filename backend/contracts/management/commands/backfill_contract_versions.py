@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from contracts.models import Contract, ContractVersion
+
+
+class Command(BaseCommand):
+    help = "Populate Contract.current_version_number/current_rate from the latest ContractVersion"
+
+    def handle(self, *args, **options):
+        latest_version = ContractVersion.objects.filter(
+            contract=OuterRef("pk")
+        ).order_by("-version_number")
+
+        # Single UPDATE ... SET col = (SELECT ...) over the whole table
+        updated = Contract.objects.update(
+            current_version_number=Coalesce(
+                Subquery(latest_version.values("version_number")[:1]), 0
+            ),
+            current_rate=Subquery(latest_version.values("counter_rate")[:1]),
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} contracts"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='current_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='current_version_number',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
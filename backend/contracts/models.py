@@ -1,4 +1,5 @@
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 import uuid
 import random
 import string
@@ -33,10 +34,27 @@ class Contract(models.Model):
     valid_till          = models.DateField()
     terms_and_condition    = models.TextField(blank=True)
 
+    # Denormalized from the latest ContractVersion, kept in sync by ContractVersion.save()
+    current_version_number = models.PositiveIntegerField(default=0, editable=False)
+    current_rate           = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, editable=False)
+
     created_at        = models.DateTimeField(auto_now_add=True)
     updated_at        = models.DateTimeField(auto_now=True)
 
+    # Only ever changed by the UPDATEs in add_version()/ContractVersion.save()
+    # and refresh_current_version(), never by saving an instance
+    VERSION_FIELDS = ("current_version_number", "current_rate")
+
     def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            # A full save of an instance loaded before a counter offer must
+            # not roll the version pointer back
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.VERSION_FIELDS and field.attname not in deferred
+            ]
+
         if not self.contract_code:
             self.contract_code = self._generate_contract_code()
 
@@ -67,6 +85,53 @@ class Contract(models.Model):
         if self.specialist:
             return self.specialist.avg_daily_rate
         return None
+
+    @property
+    def latest_rate(self):
+        """Rate of the latest counter offer, or the originally proposed rate"""
+        if self.current_rate is not None:
+            return self.current_rate
+        return self.proposed_rate
+
+    def add_version(self, **fields):
+        """
+        Create the next ContractVersion with a gap-free version number.
+
+        The counter is bumped before anything is read, so the UPDATE takes
+        the row lock (the write lock on SQLite) and concurrent counter
+        offers on the same contract queue up instead of colliding on
+        unique_together.
+
+        The returned version carries `previous_rate`: the contract's
+        current_rate just before it, read under that same lock.
+        """
+        with transaction.atomic():
+            Contract.objects.filter(pk=self.pk).update(
+                current_version_number=F('current_version_number') + 1
+            )
+            version_number, previous_rate = Contract.objects.filter(pk=self.pk).values_list(
+                'current_version_number', 'current_rate'
+            ).get()
+
+            version = ContractVersion(contract=self, version_number=version_number, **fields)
+            version.save()
+            version.previous_rate = previous_rate
+
+        return version
+
+    def refresh_current_version(self):
+        """
+        Recompute current_version_number/current_rate from the versions table.
+        """
+        latest_version = self.versions.order_by('-version_number').first()
+
+        self.current_version_number = latest_version.version_number if latest_version else 0
+        self.current_rate = latest_version.counter_rate if latest_version else None
+
+        Contract.objects.filter(pk=self.pk).update(
+            current_version_number=self.current_version_number,
+            current_rate=self.current_rate,
+        )
         
 
 class ContractVersion(models.Model):
@@ -81,3 +146,26 @@ class ContractVersion(models.Model):
 
     class Meta:
         unique_together = [("contract", "version_number")]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # Move the contract's latest version pointer in the same transaction
+            updated = Contract.objects.filter(
+                pk=self.contract_id,
+                current_version_number__lte=self.version_number,
+            ).update(
+                current_version_number=self.version_number,
+                current_rate=self.counter_rate,
+            )
+
+        if updated and ContractVersion.contract.is_cached(self):
+            self.contract.current_version_number = self.version_number
+            self.contract.current_rate = self.counter_rate
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.contract.refresh_current_version()
+        return result
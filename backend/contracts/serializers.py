@@ -51,11 +51,7 @@ class ContractReadSerializer(serializers.ModelSerializer):
         return str(obj.providers_expected_rate)
 
     def get_proposed_rate(self, obj):
-        latest_versions = obj.versions.order_by('-version_number').first()
-
-        if latest_versions:
-            return str(latest_versions.counter_rate)
-        return str(obj.proposed_rate)
+        return str(obj.latest_rate)
 
 
 class ContractCreateSerializer(serializers.ModelSerializer):
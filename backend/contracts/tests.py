@@ -1,3 +1,215 @@
-from django.test import TestCase
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.shortcuts import get_object_or_404
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from outbox.models import OutboxKind, OutboxMessage
+from providers.models import Provider
+from specialists.tests import make_specialist
+from .models import Contract, ContractVersion
+
+
+def make_contract(**fields):
+    return Contract.objects.create(
+        title="Backend developer",
+        proposed_rate=Decimal("500.00"),
+        response_deadline=date(2030, 1, 1),
+        valid_from=date(2030, 1, 1),
+        valid_till=date(2030, 12, 31),
+        **fields,
+    )
+
+
+class CurrentVersionTests(TestCase):
+    def test_full_save_of_stale_instance_keeps_version_pointer(self):
+        contract = make_contract()
+        stale = Contract.objects.get(pk=contract.pk)
+
+        Contract.objects.get(pk=contract.pk).add_version(counter_rate=Decimal("600.00"))
+        stale.title = "Renamed"
+        stale.save()
+
+        contract.refresh_from_db()
+        self.assertEqual(contract.title, "Renamed")
+        self.assertEqual((contract.current_version_number, contract.current_rate), (1, Decimal("600.00")))
+
+        # The next version number is still free
+        self.assertEqual(stale.add_version(counter_rate=Decimal("650.00")).version_number, 2)
+
+    def test_latest_rate(self):
+        contract = make_contract()
+        self.assertEqual(contract.latest_rate, Decimal("500.00"))
+
+        contract.add_version(counter_rate=Decimal("550.00"))
+        self.assertEqual(Contract.objects.get(pk=contract.pk).latest_rate, Decimal("550.00"))
+
+
+class AcceptTaskTests(TestCase):
+    def setUp(self):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.contract = make_contract(provider=provider, status="IN_NEGOTIATION")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create(username="coordinator", role="CONTRACT_COORDINATOR", provider=provider)
+        )
+
+    @mock.patch("contracts.views.get_task_variable")
+    def test_accepts_counter_offer_made_after_the_contract_was_loaded(self, get_task_variable):
+        get_task_variable.return_value = {"variables": {"contract_id": str(self.contract.id)}}
+        real_get = Contract.objects.get
+
+        def get_then_counter_offer(*args, **kwargs):
+            contract = real_get(*args, **kwargs)
+            real_get(pk=contract.pk).add_version(counter_rate=Decimal("720.00"))
+            return contract
+
+        with mock.patch.object(Contract.objects, "get", side_effect=get_then_counter_offer):
+            response = self.client.post("/api/contracts/contracts/tasks/task-1/accept/")
+
+        self.assertEqual(response.status_code, 200)
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.status, "ACTIVE")
+        self.assertEqual(self.contract.negotiated_rate, Decimal("720.00"))
+        self.assertEqual(self.contract.current_version_number, 1)
+
+
+class CreateVersionTests(TestCase):
+    def setUp(self):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        specialist = make_specialist(provider)
+        specialist.save()
+        self.contract = make_contract(provider=provider, specialist=specialist, status="IN_NEGOTIATION")
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="rep", role="SUPPLIER_REP", provider=provider))
+
+    def test_previous_rate_is_read_under_the_version_lock(self):
+        self.contract.add_version(counter_rate=Decimal("600.00"))
+        real_get = get_object_or_404
+
+        def get_then_counter_offer(*args, **kwargs):
+            contract = real_get(*args, **kwargs)
+            # Another counter offer lands after this request loaded the contract
+            Contract.objects.get(pk=contract.pk).add_version(counter_rate=Decimal("720.00"))
+            return contract
+
+        with mock.patch("contracts.views.get_object_or_404", side_effect=get_then_counter_offer):
+            response = self.client.post(
+                f"/api/contracts/contracts/{self.contract.pk}/versions/", {"counter_rate": "650.00"}
+            )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        payload = OutboxMessage.objects.get(kind=OutboxKind.FLOWABLE_START_NEGOTIATION).payload
+        self.assertEqual((payload["proposed_rate"], payload["providers_expected_rate"]), ("650.00", "720.00"))
+        self.assertEqual(payload["business_key"], f"{self.contract.pk}:3")
+
+    def test_add_version_returns_the_rate_it_replaces(self):
+        self.assertIsNone(self.contract.add_version(counter_rate=Decimal("600.00")).previous_rate)
+        self.assertEqual(self.contract.add_version(counter_rate=Decimal("650.00")).previous_rate, Decimal("600.00"))
+
+
+class GetTasksTests(TestCase):
+    url = "/api/contracts/contracts/tasks/"
+
+    def setUp(self):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create(username="coordinator", role="CONTRACT_COORDINATOR", provider=provider)
+        )
+
+    def _tasks(self, contracts, format_id=str):
+        return [
+            {
+                "task_id": f"task-{i}",
+                "task_name": "Review counter offer",
+                "created_time": None,
+                "variables": {"contract_id": format_id(contract.id)},
+            }
+            for i, contract in enumerate(contracts)
+        ]
+
+    def _get(self, tasks):
+        with mock.patch("contracts.views.list_tasks_by_group", return_value=(tasks, None)):
+            return self.client.get(self.url)
+
+    def test_matches_contract_ids_in_any_uuid_form(self):
+        contracts = [make_contract() for _ in range(3)]
+        tasks = self._tasks(contracts, format_id=lambda id: id.hex.upper())
+        tasks.append({"task_id": "bad", "task_name": "", "created_time": None, "variables": {"contract_id": "nope"}})
+
+        # Contracts with their specialist and winning offer, in one query
+        with self.assertNumQueries(1):
+            response = self._get(tasks)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task["task_id"] for task in response.data["tasks"]], ["task-0", "task-1", "task-2"])
+        self.assertEqual([task["contract"]["id"] for task in response.data["tasks"]], [c.id for c in contracts])
+
+
+class ConcurrentCounterOfferTests(TransactionTestCase):
+    """Concurrent counter offers on one contract, against the file-backed test database"""
+
+    threads = 8
+    offers_per_thread = 15
+
+    def setUp(self):
+        self.assertFalse(connection.is_in_memory_db())
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.contract = make_contract(provider=provider, status="IN_NEGOTIATION")
+        self.user = User.objects.create(username="coordinator", role="CONTRACT_COORDINATOR", provider=provider)
+
+    def _counter_offers(self, worker, statuses, start):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        start.wait()
+        try:
+            for i in range(self.offers_per_thread):
+                response = client.post(
+                    f"/api/contracts/contracts/tasks/task-{worker}-{i}/counter-offer/",
+                    {"counter_rate": "600.00", "counter_explanation": "Market rate", "counter_terms": "Net 30"},
+                    format="json",
+                )
+                statuses.append((response.status_code, response.data.get("error")))
+        finally:
+            connection.close()
+
+    def _stale_saves(self, stop, start):
+        start.wait()
+        try:
+            while not stop.is_set():
+                stale = Contract.objects.get(pk=self.contract.pk)
+                stale.save()
+        finally:
+            connection.close()
+
+    @mock.patch("contracts.views.get_task_variable")
+    def test_versions_are_gap_free_without_constraint_failures(self, get_task_variable):
+        get_task_variable.return_value = {"variables": {"contract_id": str(self.contract.id)}}
+        statuses, stop, start = [], threading.Event(), threading.Barrier(self.threads + 1)
+
+        workers = [
+            threading.Thread(target=self._counter_offers, args=(worker, statuses, start))
+            for worker in range(self.threads)
+        ]
+        saver = threading.Thread(target=self._stale_saves, args=(stop, start))
+        for thread in [*workers, saver]:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        stop.set()
+        saver.join()
+
+        total = self.threads * self.offers_per_thread
+        self.assertEqual([status for status in statuses if status[0] != 201], [])
+        self.assertEqual(
+            sorted(ContractVersion.objects.filter(contract=self.contract).values_list("version_number", flat=True)),
+            list(range(1, total + 1)),
+        )
+        self.contract.refresh_from_db()
+        self.assertEqual(self.contract.current_version_number, total)
@@ -1,3 +1,4 @@
+import uuid
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -12,14 +13,25 @@ from .models import Contract, ContractVersion, ContractStatus
 from .serializers import *
 from .permissions import IsContractCoordinator
 from audit_log.utils import serialize_for_json
+from config.exports import ExportMixin
 from audit_log.models import AuditLog
 from integrations.flowable_client import *
-from integrations.third_party_service import third_party_service
+from outbox.models import OutboxKind
+from outbox.services import enqueue
 from providers.models import Provider
 from notifications.services import notify_roles
 
 
+def _canonical_id(value):
+    """`value` as a canonical (lowercase, hyphenated) UUID string, or None"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
 class ContractViewSet(
+    ExportMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.CreateModelMixin,
@@ -28,6 +40,15 @@ class ContractViewSet(
 ):
     queryset = Contract.objects.select_related("provider")
 
+    # Columns of GET /export/
+    export_fields = [
+        "id", "contract_code", "external_id", "title", "domain", "status",
+        "provider_id", "provider__name", "service_request_id", "specialist_id",
+        "proposed_rate", "negotiated_rate", "current_rate", "current_version_number",
+        "response_deadline", "valid_from", "valid_till", "created_at", "updated_at",
+    ]
+    export_filename = "contracts"
+
     def get_queryset(self):
         user = self.request.user
         queryset = self.queryset
@@ -61,7 +82,7 @@ class ContractViewSet(
         return ContractReadSerializer
 
     def get_permissions(self):
-        if self.action in ["start_negotiation", "get_tasks", "accept_task", "reject_task", "counter_offer_task", "metrics", "retrieve"]:
+        if self.action in ["start_negotiation", "get_tasks", "accept_task", "reject_task", "counter_offer_task", "metrics", "retrieve", "export"]:
             return [IsAuthenticated(), IsContractCoordinator()]
         return [AllowAny(),]
 
@@ -76,6 +97,7 @@ class ContractViewSet(
             message="A new contract has been created.",
             entity_type="Contract",
             entity_id=contract.id,
+            provider_id=contract.provider_id,
         )
         
     
@@ -112,6 +134,7 @@ class ContractViewSet(
             message=f"Contract status changed to {contract.status}.",
             entity_type="Contract",
             entity_id=contract.id,
+            provider_id=contract.provider_id,
         )
         
         return Response(
@@ -173,31 +196,31 @@ class ContractViewSet(
                 'valid_till': contract.valid_till,
                 'response_deadline': contract.response_deadline,
             }
-            print('.......................... i am here......................')
-                
-            try:
-                start_contract_negotiation(contract_data=contract_data)
-            except Exception as e:
-                raise Exception(f"Failed to create Flowable task: {str(e)}")
-                
-            print('.......................... i am here 2......................')
-
-            contract.status = 'IN_NEGOTIATION'
-            contract.save()
-
-            AuditLog.log_action(
-                user=request.user,
-                action_type='CONTRACT_NEGOTIATION_STARTED',
-                action_category='CONTRACT_MANAGEMENT',
-                description=f'Negotiation started for contract {str(contract.id)}',
-                entity_type='Contract',
-                entity_id=contract.id,
-                metadata={
-                    'contract_title': contract.title,
-                    'status': contract.status
-                },
-                request=request
-            )
+            with transaction.atomic():
+                contract.status = 'IN_NEGOTIATION'
+                contract.save(update_fields=['status', 'updated_at'])
+
+                # Flowable process start is delivered by the outbox dispatcher
+                business_key = f"{contract.id}:{contract.current_version_number}"
+                enqueue(
+                    kind=OutboxKind.FLOWABLE_START_NEGOTIATION,
+                    payload=serialize_for_json({**contract_data, 'business_key': business_key}),
+                    idempotency_key=f"start-negotiation:{business_key}",
+                )
+
+                AuditLog.log_action(
+                    user=request.user,
+                    action_type='CONTRACT_NEGOTIATION_STARTED',
+                    action_category='CONTRACT_MANAGEMENT',
+                    description=f'Negotiation started for contract {str(contract.id)}',
+                    entity_type='Contract',
+                    entity_id=contract.id,
+                    metadata={
+                        'contract_title': contract.title,
+                        'status': contract.status
+                    },
+                    request=request
+                )
 
             # Step 5: Return success response
             return Response({
@@ -217,57 +240,81 @@ class ContractViewSet(
     def get_tasks(self, request):
         """
         Get all negotiation tasks for contract_coordinator group
+
+        Query params:
+        - limit: return a single page of at most `limit` tasks
+        - cursor: `next_cursor` from the previous page
         """
         group_id = 'contract_coordinator'
         
+        limit = request.query_params.get('limit')
+        cursor = request.query_params.get('cursor')
+
+        if limit is not None and (not limit.isdigit() or int(limit) == 0):
+            return Response(
+                {'error': 'limit must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if cursor is not None and not cursor.isdigit():
+            return Response(
+                {'error': 'Invalid cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
             # Step 1: Get tasks from Flowable
-            flowable_tasks = get_tasks_by_group(group_id=group_id)
+            flowable_tasks, next_cursor = list_tasks_by_group(
+                group_id=group_id,
+                limit=limit,
+                cursor=cursor,
+                process_definition_key='contractNegotiationProcess',
+            )
             
-            # Step 2: Enrich with contract details from local database
+            # Step 2: Load all referenced contracts in one query
+            contract_ids = {_canonical_id(task['variables'].get('contract_id')) for task in flowable_tasks}
+            contract_ids.discard(None)
+
+            contracts = (
+                Contract.objects
+                .filter(id__in=contract_ids)
+                .select_related('specialist', 'winning_offer')
+            )
+            contracts_by_id = {_canonical_id(contract.id): contract for contract in contracts}
+
+            # Step 3: Enrich tasks from the in-memory map
             tasks_with_contracts = []
             
             for task in flowable_tasks:
-                contract_id = task['variables'].get('contract_id')
+                contract = contracts_by_id.get(_canonical_id(task['variables'].get('contract_id')))
                 
-                if not contract_id:
+                # Drop tasks whose contract no longer exists
+                if not contract:
                     continue
-                
-                try:
-                    # Get contract from database
-                    contract = Contract.objects.get(id=contract_id)
-                    latest_versions = contract.versions.order_by('-version_number').first()
-                    proposed_rate = str(contract.proposed_rate)
-                    if latest_versions:
-                        proposed_rate = str(latest_versions.counter_rate)
-
-                    task_data = {
-                        'task_id': task['task_id'],
-                        'task_name': task['task_name'],
-                        'created_time': task['created_time'],
-                        'contract': {
-                            'id': contract.id,
-                            'external_id': contract.external_id,
-                            'title': contract.title,
-                            'specialist': contract.specialist.full_name,
-                            'proposed_rate': proposed_rate,
-                            'providers_expected_rate': str(contract.providers_expected_rate),
-                            'valid_from': contract.valid_from,
-                            'valid_till': contract.valid_till,
-                            'response_deadline': contract.response_deadline,
-                            'status': contract.status,
-                            'domain': getattr(contract, 'domain', ''),
-                            'terms_condition': getattr(contract, 'terms_condition', ''),
-                        }
+
+                tasks_with_contracts.append({
+                    'task_id': task['task_id'],
+                    'task_name': task['task_name'],
+                    'created_time': task['created_time'],
+                    'contract': {
+                        'id': contract.id,
+                        'external_id': contract.external_id,
+                        'title': contract.title,
+                        'specialist': contract.specialist.full_name if contract.specialist else None,
+                        'proposed_rate': str(contract.latest_rate),
+                        'providers_expected_rate': str(contract.providers_expected_rate),
+                        'valid_from': contract.valid_from,
+                        'valid_till': contract.valid_till,
+                        'response_deadline': contract.response_deadline,
+                        'status': contract.status,
+                        'domain': getattr(contract, 'domain', ''),
+                        'terms_condition': getattr(contract, 'terms_condition', ''),
                     }
-                    
-                    tasks_with_contracts.append(task_data)
-                    
-                except Contract.DoesNotExist:
-                    return Response({'error': 'Contract not found'}, status=status.HTTP_404_NOT_FOUND)
+                })
                         
             return Response({
                 'count': len(tasks_with_contracts),
+                'next_cursor': next_cursor,
                 'tasks': tasks_with_contracts
             }, status=status.HTTP_200_OK)
             
@@ -317,15 +364,6 @@ class ContractViewSet(
                     status=status.HTTP_404_NOT_FOUND
                 )
                 
-            # Step 3: Complete Flowable task
-            try:
-                complete_task(
-                    task_id=task_id,
-                    action='accept'
-                )
-            except Exception as e:
-                raise Exception(f"Failed to complete task: {str(e)}")
-                
             # TODO: Step 4: Update 3rd party API
             # try:
             #     third_party_service.update_contract_status(
@@ -335,27 +373,32 @@ class ContractViewSet(
             # except Exception as e:
             #     raise Exception(f"Failed to update 3rd party API: {str(e)}")
 
-            latest_versions = contract.versions.order_by('-version_number').first()
-            proposed_rate = contract.proposed_rate
-            if latest_versions:
-                proposed_rate = latest_versions.counter_rate
-
-            contract.status = 'ACTIVE'
-            contract.negotiated_rate = proposed_rate
-            contract.save()
-
-            AuditLog.log_action(
-                user=request.user,
-                action_type='CONTRACT_ACCEPTED',
-                action_category='CONTRACT_MANAGEMENT',
-                description=f'Accepted contract {str(contract.id)}',
-                entity_type='Contract',
-                entity_id=contract.id,
-                metadata={
-                    'contract_title': contract.title,
-                },
-                request=request
-            )
+            with transaction.atomic():
+                # Re-read under the row lock so a counter offer that landed since is the rate accepted
+                contract = Contract.objects.select_for_update().get(pk=contract.pk)
+                contract.status = 'ACTIVE'
+                contract.negotiated_rate = contract.latest_rate
+                contract.save(update_fields=['status', 'negotiated_rate', 'updated_at'])
+
+                # Step 3: Queue Flowable task completion
+                enqueue(
+                    kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+                    payload={'task_id': task_id, 'action': 'accept'},
+                    idempotency_key=f"complete-task:{task_id}",
+                )
+
+                AuditLog.log_action(
+                    user=request.user,
+                    action_type='CONTRACT_ACCEPTED',
+                    action_category='CONTRACT_MANAGEMENT',
+                    description=f'Accepted contract {str(contract.id)}',
+                    entity_type='Contract',
+                    entity_id=contract.id,
+                    metadata={
+                        'contract_title': contract.title,
+                    },
+                    request=request
+                )
             
             # Step 5: Return success response
             return Response({
@@ -410,39 +453,38 @@ class ContractViewSet(
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            contract.status = 'REJECTED'
-            contract.save()
-                        
-            # Step 3: Complete Flowable task
-            try:
-                complete_task(
-                    task_id=task_id,
-                    action='reject'
+            with transaction.atomic():
+                contract.status = 'REJECTED'
+                contract.save(update_fields=['status', 'updated_at'])
+
+                # Step 3: Queue Flowable task completion
+                enqueue(
+                    kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+                    payload={'task_id': task_id, 'action': 'reject'},
+                    idempotency_key=f"complete-task:{task_id}",
                 )
-            except Exception as e:
-                raise Exception(f"Failed to complete task: {str(e)}")
-            
-            # TODO: Step 4: Update 3rd party API
-            # try:
-            #     third_party_service.update_contract_status(
-            #         external_id=contract.external_id,
-            #         status='Rejected'
-            #     )
-            # except Exception as e:
-            #     raise Exception(f"Failed to update 3rd party API: {str(e)}")
 
-            AuditLog.log_action(
-                user=request.user,
-                action_type='CONTRACT_REJECTED',
-                action_category='CONTRACT_MANAGEMENT',
-                description=f'Rejected contract {str(contract.id)}',
-                entity_type='Contract',
-                entity_id=contract.id,
-                metadata={
-                    'contract_title': contract.title,
-                },
-                request=request
-            )
+                # TODO: Step 4: Update 3rd party API
+                # try:
+                #     third_party_service.update_contract_status(
+                #         external_id=contract.external_id,
+                #         status='Rejected'
+                #     )
+                # except Exception as e:
+                #     raise Exception(f"Failed to update 3rd party API: {str(e)}")
+
+                AuditLog.log_action(
+                    user=request.user,
+                    action_type='CONTRACT_REJECTED',
+                    action_category='CONTRACT_MANAGEMENT',
+                    description=f'Rejected contract {str(contract.id)}',
+                    entity_type='Contract',
+                    entity_id=contract.id,
+                    metadata={
+                        'contract_title': contract.title,
+                    },
+                    request=request
+                )
             
             # Step 5: Return success response
             return Response({
@@ -522,69 +564,63 @@ class ContractViewSet(
                     status=status.HTTP_400_BAD_REQUEST
                 )
              
-            # Step 4: create latest version
-            latest_version = ContractVersion.objects.filter(
-                contract=contract
-            ).order_by('-version_number').first()
-                
-            next_version = 1 if not latest_version else latest_version.version_number + 1
-                
-            contract_version = ContractVersion.objects.create(
-                contract=contract,
-                version_number=next_version,
-                counter_rate=validated_data['counter_rate'],
-                counter_offer_explanation=validated_data['counter_explanation'],
-                proposed_terms_and_condition=validated_data['counter_terms'],
-            )
+            with transaction.atomic():
+                # Step 4: create latest version
+                contract_version = contract.add_version(
+                    counter_rate=validated_data['counter_rate'],
+                    counter_offer_explanation=validated_data['counter_explanation'],
+                    proposed_terms_and_condition=validated_data['counter_terms'],
+                )
             
-            # Step 6: Complete Flowable task
-            try:
-                complete_task(
-                    task_id=task_id,
-                    action='counter_offer',
-                    variables={
-                        'contract_id': str(contract.id),
-                        'version_id': str(contract_version.id),
-                        'counter_rate': float(validated_data['counter_rate']),
-                        'counter_explanation': validated_data['counter_explanation'],
-                        'counter_terms': validated_data['counter_terms']
-                    }
+                # Step 6: Queue Flowable task completion
+                enqueue(
+                    kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+                    payload={
+                        'task_id': task_id,
+                        'action': 'counter_offer',
+                        'variables': {
+                            'contract_id': str(contract.id),
+                            'version_id': str(contract_version.id),
+                            'counter_rate': float(validated_data['counter_rate']),
+                            'counter_explanation': validated_data['counter_explanation'],
+                            'counter_terms': validated_data['counter_terms']
+                        },
+                    },
+                    idempotency_key=f"complete-task:{task_id}",
                 )
-            except Exception as e:
-                raise Exception(f"Failed to complete task: {str(e)}")
             
-            # TODO: Step 7: Update 3rd party API
-            # try:
-            #     third_party_service.update_contract_status(
-            #         external_id=contract.external_id,
-            #         status='Counter Offer Submitted'
-            #     )
-            #     logger.info(f"3rd party API updated for contract {contract.external_id}")
-            # except Exception as e:
-            #     logger.error(f"3rd party API update failed: {str(e)}")
-            #     raise Exception(f"Failed to update 3rd party API: {str(e)}")
-
-            AuditLog.log_action(
-                user=request.user,
-                action_type='CONTRACT_COUNTER_OFFER',
-                action_category='CONTRACT_MANAGEMENT',
-                description=f'Counter offer submitted for contract {str(contract.id)}',
-                entity_type='Contract',
-                entity_id=contract.id,
-                metadata={
-                    'contract_title': contract.title,
-                    'contract_version_id': str(contract_version.id),
-                    'counter_rate': str(contract_version.counter_rate),
-                },
-                request=request
-            )
+                # TODO: Step 7: Update 3rd party API
+                # try:
+                #     third_party_service.update_contract_status(
+                #         external_id=contract.external_id,
+                #         status='Counter Offer Submitted'
+                #     )
+                #     logger.info(f"3rd party API updated for contract {contract.external_id}")
+                # except Exception as e:
+                #     logger.error(f"3rd party API update failed: {str(e)}")
+                #     raise Exception(f"Failed to update 3rd party API: {str(e)}")
+
+                AuditLog.log_action(
+                    user=request.user,
+                    action_type='CONTRACT_COUNTER_OFFER',
+                    action_category='CONTRACT_MANAGEMENT',
+                    description=f'Counter offer submitted for contract {str(contract.id)}',
+                    entity_type='Contract',
+                    entity_id=contract.id,
+                    metadata={
+                        'contract_title': contract.title,
+                        'contract_version_id': str(contract_version.id),
+                        'counter_rate': str(contract_version.counter_rate),
+                    },
+                    request=request
+                )
             
             # Step 8: Return success response
             return Response({
                 'message': 'Counter offer submitted successfully',
                 'contract_id': str(contract.id),
                 'status': contract.status,
-                'version_number': next_version,
+                'version_number': contract_version.version_number,
                 'counter_rate': str(validated_data['counter_rate'])
             }, status=status.HTTP_201_CREATED)
             
@@ -666,35 +702,32 @@ class ContractVersionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        latest_version = ContractVersion.objects.filter(contract=contract).order_by('-version_number').first()
-        next_version = 1 if not latest_version else latest_version.version_number + 1
-        
-        version = serializer.save(contract=contract, version_number=next_version)
+        with transaction.atomic():
+            version = contract.add_version(**serializer.validated_data)
+            # Read under add_version's lock, not from the contract loaded above
+            previous_rate = version.previous_rate
         
-        # Step 4: Create Flowable task
-        try:
+            # Step 4: Queue Flowable task creation
             contract_data = {
                 'contract_id': str(contract.id),
                 'title': contract.title,
                 'specialist_name': contract.specialist.full_name,
                 'proposed_rate': str(version.counter_rate),
-                'providers_expected_rate': str(latest_version.counter_rate) if latest_version else "0.00",
+                'providers_expected_rate': str(previous_rate) if previous_rate is not None else "0.00",
                 'valid_from': contract.valid_from,
                 'valid_till': contract.valid_till,
                 'response_deadline': contract.response_deadline,
             }
+            business_key = f"{contract.id}:{version.version_number}"
+            enqueue(
+                kind=OutboxKind.FLOWABLE_START_NEGOTIATION,
+                payload=serialize_for_json({**contract_data, 'business_key': business_key}),
+                idempotency_key=f"start-negotiation:{business_key}",
+            )
             
-            flowable_result = start_contract_negotiation(contract_data=contract_data)
-            
-            return Response({
-                'message': 'Contract version and task created successfully',
-                'contract_id': str(contract.id),
-                'version_id': str(version.id),
-                'status': contract.status
-            }, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            return Response(
-                {'error': f'Failed to create Flowable task: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+        return Response({
+            'message': 'Contract version and task created successfully',
+            'contract_id': str(contract.id),
+            'version_id': str(version.id),
+            'status': contract.status
+        }, status=status.HTTP_201_CREATED)
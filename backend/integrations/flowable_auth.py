@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.http import JsonResponse
 
@@ -6,12 +7,19 @@ class FlowableServiceAuthMiddleware:
     """
     Authenticates Flowable service calls using a static API key.
     This is ONLY for service-to-service calls, not for human users.
+
+    Sync and async capable, so under ASGI it does not push every request
+    (including the notification stream) through a worker thread.
     """
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
+    def _mark(self, request):
         # Check if this is a Flowable service call
         api_key = request.headers.get("X-FLOWABLE-API-KEY")
 
@@ -20,9 +28,18 @@ class FlowableServiceAuthMiddleware:
             request.is_flowable = True
             # You can also set a system user here if needed
             # request.user = User.objects.get(username='flowable_system')
-        
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self._mark(request)
         return self.get_response(request)
 
+    async def __acall__(self, request):
+        self._mark(request)
+        return await self.get_response(request)
+
         # # Only protect endpoints Flowable will call
         # if request.path.startswith("/api/flowable/"):
         #     api_key = request.headers.get("X-FLOWABLE-API-KEY")
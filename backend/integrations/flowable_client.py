@@ -1,16 +1,124 @@
+import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from datetime import datetime, time
 from django.utils import timezone
 import json
 
 
-def generate_request_task(*, request_id, offer_deadline):
-    url = f"{settings.FLOWABLE_BASE_URL}/runtime/process-instances"
+class FlowableClient:
+    """
+    Shared HTTP client for the Flowable REST API.
+
+    Holds one pooled keep-alive session per process so repeated calls
+    reuse TCP connections instead of opening a new one every time.
+    Idempotent verbs are retried on connection errors and 502/503/504.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None):
+        self.pool_size = pool_size if pool_size is not None else getattr(settings, "FLOWABLE_POOL_SIZE", 10)
+        self.connect_timeout = connect_timeout if connect_timeout is not None else getattr(settings, "FLOWABLE_CONNECT_TIMEOUT", 3.05)
+        self.read_timeout = read_timeout if read_timeout is not None else getattr(settings, "FLOWABLE_READ_TIMEOUT", 10)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, "FLOWABLE_MAX_RETRIES", 3)
+
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Sessions must not be shared across forked workers
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=0.3,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=self.IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+
+        session = requests.Session()
+        session.auth = settings.FLOWABLE_AUTH
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def url(self, path):
+        return f"{settings.FLOWABLE_BASE_URL}/{path.lstrip('/')}"
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        return self.session.request(method, self.url(path), **kwargs)
 
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+# Singleton instance
+flowable_client = FlowableClient()
+
+
+class TaskNotFound(Exception):
+    """Flowable has no such task (never existed, or already completed)"""
+
+
+def find_process_instance(*, business_key, process_definition_key):
+    """
+    Id of the active process instance of `process_definition_key` with
+    `business_key`, or None
+    """
+    params = {
+        'businessKey': business_key,
+        'processDefinitionKey': process_definition_key,
+    }
+
+    try:
+        response = flowable_client.get("runtime/process-instances", params=params)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Flowable get process instances failed: {str(e)}")
+
+    instances = response.json().get('data', [])
+    return instances[0].get('id') if instances else None
+
+
+def generate_request_task(*, request_id, offer_deadline):
     variables = [
         {"name": "request_id", "value": request_id, "type": "string"},
         {"name": "baseApiUrl", "value": settings.DJANGO_BASE_URL, "type": "string"},
+        {"name": "submitted_offers", "value": "[]", "type": "string"},
     ]
 
     if offer_deadline:
@@ -40,12 +148,7 @@ def generate_request_task(*, request_id, offer_deadline):
     }
     
     try:
-        response = requests.post(
-            url,
-            auth=settings.FLOWABLE_AUTH,
-            json=payload,
-            timeout=10,
-        )
+        response = flowable_client.post("runtime/process-instances", json=payload)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.HTTPError as e:
@@ -59,9 +162,7 @@ def generate_request_task(*, request_id, offer_deadline):
         raise Exception(f"Flowable returned {response.status_code}: {error_msg}")
 
 
-def start_contract_negotiation(*, contract_data):
-    url = f"{settings.FLOWABLE_BASE_URL}/runtime/process-instances"
-
+def start_contract_negotiation(*, contract_data, business_key=None):
     variables = [
         {"name": "contract_id", "value": contract_data.get('contract_id')},
         {"name": "title", "value": contract_data.get('title')},
@@ -80,16 +181,13 @@ def start_contract_negotiation(*, contract_data):
             {"name": "baseApiUrl", "value": settings.DJANGO_BASE_URL, "type": "string"},
         ]
     }
+    if business_key:
+        payload["businessKey"] = business_key
 
     print('...................... in side start contract .................')
 
     try:
-        response = requests.post(
-            url,
-            auth=settings.FLOWABLE_AUTH,
-            json=payload,
-            timeout=10,
-        )
+        response = flowable_client.post("runtime/process-instances", json=payload)
         print('...................... in side try contract .................')
         response.raise_for_status()
         return response.json()
@@ -106,66 +204,104 @@ def start_contract_negotiation(*, contract_data):
         raise Exception(f"Flowable returned {response.status_code}: {error_msg}")
 
 
-def get_tasks_by_group(*, group_id):
+def _format_task(task):
+    task_info = {
+        'task_id': task.get('id'),
+        'task_name': task.get('name'),
+        'process_instance_id': task.get('processInstanceId'),
+        'created_time': task.get('createTime'),
+        'assignee': task.get('assignee'),
+        'variables': {}
+    }
+
+    # Extract process variables
+    if task.get('variables'):
+        for var in task.get('variables', []):
+            task_info['variables'][var.get('name')] = var.get('value')
+
+    return task_info
+
+
+def get_task_page(*, group_id, start=0, size=None, process_definition_key=None, task_definition_key=None):
     """
-    Get all active tasks for a specific group
+    Get one page of active tasks for a specific group.
+    Returns (tasks, next_start); next_start is None on the last page.
     """
-    url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks"
-    
+    size = size or settings.FLOWABLE_TASK_PAGE_SIZE
+
     params = {
         'candidateGroup': group_id,
-        'includeProcessVariables': 'true'
+        'includeProcessVariables': 'true',
+        'sort': 'createTime',
+        'order': 'asc',
+        'start': start,
+        'size': size,
     }
-    
+
+    # Server-side filters
+    if process_definition_key:
+        params['processDefinitionKey'] = process_definition_key
+    if task_definition_key:
+        params['taskDefinitionKey'] = task_definition_key
+
     try:
-        response = requests.get(
-            url,
-            params=params,
-            auth=settings.FLOWABLE_AUTH,
-            timeout=10
-        )
+        response = flowable_client.get("runtime/tasks", params=params)
         response.raise_for_status()
-        
         result = response.json()
-        tasks = result.get('data', [])
-        
-        # Extract relevant task information
-        formatted_tasks = []
-        for task in tasks:
-            task_info = {
-                'task_id': task.get('id'),
-                'task_name': task.get('name'),
-                'process_instance_id': task.get('processInstanceId'),
-                'created_time': task.get('createTime'),
-                'assignee': task.get('assignee'),
-                'variables': {}
-            }
-            
-            # Extract process variables
-            if task.get('variables'):
-                for var in task.get('variables', []):
-                    task_info['variables'][var.get('name')] = var.get('value')
-            
-            formatted_tasks.append(task_info)
-        
-        return formatted_tasks
-        
     except requests.exceptions.RequestException as e:
         raise Exception(f"Flowable get tasks failed: {str(e)}")
 
+    tasks = result.get('data', [])
+    total = result.get('total', 0)
+
+    next_start = start + len(tasks)
+    if not tasks or next_start >= total:
+        next_start = None
+
+    return [_format_task(task) for task in tasks], next_start
+
+
+def iter_tasks_by_group(*, group_id, page_size=None, **filters):
+    """
+    Stream all active tasks for a specific group, one page at a time
+    """
+    start = 0
+    while start is not None:
+        tasks, start = get_task_page(group_id=group_id, start=start, size=page_size, **filters)
+        yield from tasks
+
+
+def get_tasks_by_group(*, group_id, page_size=None, **filters):
+    """
+    Get all active tasks for a specific group
+    """
+    return list(iter_tasks_by_group(group_id=group_id, page_size=page_size, **filters))
+
+
+def list_tasks_by_group(*, group_id, limit=None, cursor=None, **filters):
+    """
+    Get active tasks for a specific group as (tasks, next_cursor).
+    Without a limit every page is drained and next_cursor is None.
+    """
+    if limit is None:
+        return get_tasks_by_group(group_id=group_id, **filters), None
+
+    limit = min(int(limit), settings.FLOWABLE_TASK_PAGE_SIZE)
+    tasks, next_start = get_task_page(
+        group_id=group_id,
+        start=int(cursor or 0),
+        size=limit,
+        **filters
+    )
+    return tasks, (str(next_start) if next_start is not None else None)
+
 
 def get_task_variable(*, task_id):
     """
     Get details of a specific task
     """
-    url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks/{task_id}/variables"
-        
     try:
-        response = requests.get(
-            url,
-            auth=settings.FLOWABLE_AUTH,
-            timeout=10
-        )
+        response = flowable_client.get(f"runtime/tasks/{task_id}/variables")
         response.raise_for_status()
         
         variables = response.json()
@@ -190,8 +326,6 @@ def complete_task(*, task_id, action, variables = None):
     """
     Complete a task with action and optional variables
     """
-    url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks/{task_id}"
-        
     # Prepare completion variables
     task_variables = [
         {"name": "action", "value": action}
@@ -238,12 +372,14 @@ def complete_task(*, task_id, action, variables = None):
     }
         
     try:
-        response = requests.post(
-            url,
-            json=payload,
-            auth=settings.FLOWABLE_AUTH,
-            timeout=10
-        )
+        response = flowable_client.post(f"runtime/tasks/{task_id}", json=payload)
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Flowable task completion failed: {str(e)}")
+
+    if response.status_code == 404:
+        raise TaskNotFound(f"Flowable task {task_id} not found")
+
+    try:
         response.raise_for_status()
         
         return True
@@ -252,68 +388,37 @@ def complete_task(*, task_id, action, variables = None):
         raise Exception(f"Flowable task completion failed: {str(e)}")
 
 
-def record_offer_submission(*, task_id, offer_id, provider_id):
+def push_submitted_offers(*, task_id, submitted_offers):
     """
-    Record that a provider submitted an offer by updating process variables.
+    Mirror a request's submitted offers onto its process as the
+    `submitted_offers` variable. The list is built from the local
+    ServiceOffer table, so this is one write with no read-modify-write.
     This doesn't complete the task - just tracks submissions.
+
+    The whole list is sent, not just the new offer: Flowable replaces a
+    variable as a whole and has no append, so sending one offer would
+    mean reading the current list first, and two concurrent pushes would
+    drop each other's offer. A full list from the ledger is idempotent,
+    any push (or retry) carries every offer so far, and it holds one
+    small entry per offer.
     """
+    payload = {
+        "name": "submitted_offers",
+        "value": json.dumps(submitted_offers),
+        "type": "string",
+        "scope": "global",
+    }
+
     try:
-        # Get the process instance ID from the task
-        task_url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks/{task_id}"
-        response = requests.get(task_url, auth=settings.FLOWABLE_AUTH, timeout=10)
-        response.raise_for_status()
-        
-        task_data = response.json()
-        process_instance_id = task_data.get('processInstanceId')
-        
-        if not process_instance_id:
-            return False
-        
-        # Get existing submissions
-        variables_url = f"{settings.FLOWABLE_BASE_URL}/runtime/process-instances/{process_instance_id}/variables"
-        
-        try:
-            var_response = requests.get(
-                f"{variables_url}/submitted_offers",
-                auth=settings.FLOWABLE_AUTH,
-                timeout=10
-            )
-            if var_response.status_code == 200:
-                submitted_offers = var_response.json().get('value', '[]')
-                # Parse JSON string if needed
-                if isinstance(submitted_offers, str):
-                    submitted_offers = json.loads(submitted_offers)
-            else:
-                submitted_offers = []
-        except:
-            submitted_offers = []
-        
-        # Add new submission
-        submitted_offers.append({
-            'offer_id': offer_id,
-            'provider_id': provider_id,
-            'submitted_at': datetime.now().isoformat()
-        })
-        
-        # Update process variable
-        payload = [
-            {
-                "name": "submitted_offers",
-                "value": json.dumps(submitted_offers),
-                "type": "string"
-            }
-        ]
-        
-        response = requests.put(
-            variables_url,
-            json=payload,
-            auth=settings.FLOWABLE_AUTH,
-            timeout=10
-        )
+        response = flowable_client.put(f"runtime/tasks/{task_id}/variables/submitted_offers", json=payload)
+
+        # Processes started before the variable was seeded at start-up
+        if response.status_code == 404:
+            response = flowable_client.post(f"runtime/tasks/{task_id}/variables", json=[payload])
+
         response.raise_for_status()
-        
         return True
-        
+
     except Exception as e:
         print(f"Error recording offer in Flowable: {str(e)}")
-        return False
\ No newline at end of file
+        return False
@@ -1,12 +1,12 @@
 import requests
-from django.conf import settings
+
+from integrations.flowable_client import flowable_client
 
 
 class FlowableUserService:
     @staticmethod
     def create_user(username, first_name, last_name, email, password):
         """Create user in Flowable"""
-        url = f"{settings.FLOWABLE_BASE_URL}/identity/users"
         payload = {
             "id": username,
             "firstName": first_name,
@@ -16,7 +16,7 @@ class FlowableUserService:
         }
         
         try:
-            response = requests.post(url, json=payload, auth=settings.FLOWABLE_AUTH)
+            response = flowable_client.post("identity/users", json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -26,13 +26,12 @@ class FlowableUserService:
     @staticmethod
     def add_user_to_group(username, group_id):
         """Add user to a Flowable group"""
-        url = f"{settings.FLOWABLE_BASE_URL}/identity/groups/{group_id}/members"
         payload = {
             "userId": username
         }
         
         try:
-            response = requests.post(url, json=payload, auth=settings.FLOWABLE_AUTH)
+            response = flowable_client.post(f"identity/groups/{group_id}/members", json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -42,7 +41,6 @@ class FlowableUserService:
     @staticmethod
     def create_group_if_not_exists(group_id, group_name):
         """Create group in Flowable if it doesn't exist"""
-        url = f"{settings.FLOWABLE_BASE_URL}/identity/groups"
         payload = {
             "id": group_id,
             "name": group_name,
@@ -50,7 +48,7 @@ class FlowableUserService:
         }
         
         try:
-            response = requests.post(url, json=payload, auth=settings.FLOWABLE_AUTH)
+            response = flowable_client.post("identity/groups", json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
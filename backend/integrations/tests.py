@@ -0,0 +1,397 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from integrations import flowable_client as flowable
+from integrations.flowable_client import FlowableClient, flowable_client
+from integrations.third_party_service import ThirdPartyService
+
+
+class StubServer:
+    """
+    Local HTTP/1.1 server (keep-alive) that counts the TCP connections
+    opened to it. `routes` maps (method, path prefix) to a function
+    returning (status, body, delay in seconds).
+    """
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.connections = 0
+        self.requests = []
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub._lock:
+                    stub.requests.append((self.command, self.path, dict(self.headers), body))
+
+                for (method, prefix), route in stub.routes.items():
+                    if method == self.command and self.path.startswith(prefix):
+                        status, payload, delay = route(self.path)
+                        break
+                else:
+                    status, payload, delay = 404, {"message": "not found"}, 0
+
+                if delay:
+                    time.sleep(delay)
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (timeout)
+                    self.close_connection = True
+
+            do_GET = do_POST = do_PUT = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _flowable_routes():
+    tasks = [
+        {"id": f"task-{i}", "name": "Review", "processInstanceId": f"proc-{i}", "variables": []}
+        for i in range(3)
+    ]
+    return {
+        ("GET", "/flowable/runtime/tasks?"): lambda path: (200, {"data": tasks, "total": len(tasks)}, 0),
+        ("GET", "/flowable/runtime/tasks/"): lambda path: (200, [{"name": "request_id", "value": "r-1"}], 0),
+        ("PUT", "/flowable/runtime/tasks/"): lambda path: (200, {}, 0),
+        ("POST", "/flowable/runtime/tasks/"): lambda path: (200, {}, 0),
+        ("POST", "/flowable/runtime/process-instances"): lambda path: (201, {"id": "proc-new"}, 0),
+    }
+
+
+class FlowableClientTests(SimpleTestCase):
+    """Connections opened per request against a local stub Flowable server"""
+
+    def setUp(self):
+        flowable_client.close()
+        self.addCleanup(flowable_client.close)
+
+    def _call_helpers(self, rounds):
+        calls = 0
+        for _ in range(rounds):
+            flowable.get_tasks_by_group(group_id="supplier_rep")
+            flowable.get_task_variable(task_id="task-1")
+            flowable.complete_task(task_id="task-1", action="submit", variables={"offer_id": "o-1"})
+            flowable.push_submitted_offers(task_id="task-1", submitted_offers=[])
+            flowable.generate_request_task(request_id="r-1", offer_deadline=None)
+            calls += 5
+        return calls
+
+    def test_helpers_share_one_keep_alive_connection(self):
+        with StubServer(_flowable_routes()) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable"):
+                started = time.perf_counter()
+                calls = self._call_helpers(rounds=40)
+                pooled_seconds = time.perf_counter() - started
+                pooled_connections = stub.connections
+
+                # The same requests through bare requests.get/post, as before
+                stub.connections = 0
+                started = time.perf_counter()
+                for _ in range(calls):
+                    requests.get(f"{stub.url}/flowable/runtime/tasks/task-1/variables", timeout=5)
+                bare_seconds = time.perf_counter() - started
+                bare_connections = stub.connections
+
+        print(
+            f"\nFlowable client: {calls} calls, pooled {pooled_connections} connection(s) "
+            f"in {pooled_seconds * 1000:.0f} ms, bare requests {bare_connections} connections "
+            f"in {bare_seconds * 1000:.0f} ms"
+        )
+        self.assertEqual(pooled_connections, 1)
+        self.assertEqual(bare_connections, calls)
+
+    def test_pool_size_bounds_concurrent_connections(self):
+        routes = _flowable_routes()
+        routes[("GET", "/flowable/runtime/tasks/")] = lambda path: (200, [], 0.05)
+        client = FlowableClient(pool_size=4)
+        self.addCleanup(client.close)
+
+        with StubServer(routes) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable"):
+                threads = [
+                    threading.Thread(target=lambda: [client.get("runtime/tasks/t/variables") for _ in range(5)])
+                    for _ in range(4)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+        self.assertEqual(len(stub.requests), 20)
+        self.assertLessEqual(stub.connections, 4)
+
+    def test_retries_idempotent_verbs_only(self):
+        attempts = {"GET": 0, "POST": 0}
+
+        def flaky(method):
+            def route(path):
+                attempts[method] += 1
+                return (503, {}, 0) if attempts[method] == 1 else (200, {}, 0)
+            return route
+
+        routes = {
+            ("GET", "/flowable/runtime/tasks/"): flaky("GET"),
+            ("POST", "/flowable/runtime/tasks/"): flaky("POST"),
+        }
+        client = FlowableClient(max_retries=2)
+        self.addCleanup(client.close)
+
+        with StubServer(routes) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable"):
+                self.assertEqual(client.get("runtime/tasks/t/variables").status_code, 200)
+                self.assertEqual(client.post("runtime/tasks/t", json={}).status_code, 503)
+
+        self.assertEqual(attempts, {"GET": 2, "POST": 1})
+
+    def test_read_timeout_is_enforced(self):
+        routes = {("GET", "/flowable/runtime/tasks/"): lambda path: (200, [], 2)}
+        client = FlowableClient(read_timeout=0.2, max_retries=0)
+        self.addCleanup(client.close)
+
+        with StubServer(routes) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable"):
+                started = time.perf_counter()
+                with self.assertRaises(requests.exceptions.RequestException):
+                    client.get("runtime/tasks/t/variables")
+                self.assertLess(time.perf_counter() - started, 1)
+
+
+    @override_settings(FLOWABLE_POOL_SIZE=6, FLOWABLE_CONNECT_TIMEOUT=1.5, FLOWABLE_READ_TIMEOUT=7, FLOWABLE_MAX_RETRIES=2)
+    def test_only_unset_arguments_fall_back_to_settings(self):
+        defaults = FlowableClient()
+        self.assertEqual(
+            (defaults.pool_size, defaults.connect_timeout, defaults.read_timeout, defaults.max_retries),
+            (6, 1.5, 7, 2),
+        )
+
+        # Falsy values are still explicit
+        explicit = FlowableClient(pool_size=0, connect_timeout=0, read_timeout=0.0, max_retries=0)
+        self.assertEqual(
+            (explicit.pool_size, explicit.connect_timeout, explicit.read_timeout, explicit.max_retries),
+            (0, 0, 0.0, 0),
+        )
+
+
+class FlowableTaskPagingTests(SimpleTestCase):
+    """get_task_page / iter_tasks_by_group / list_tasks_by_group against a stub task list"""
+
+    def setUp(self):
+        flowable_client.close()
+        self.addCleanup(flowable_client.close)
+        self.tasks = [self._task(i) for i in range(7)]
+        # Called with the page just served, to change the list between pages
+        self.after_page = None
+
+    def _task(self, i):
+        return {"id": f"task-{i}", "name": "Review", "processInstanceId": f"proc-{i}", "variables": []}
+
+    def _page(self, path):
+        query = parse_qs(urlsplit(path).query)
+        start, size = int(query["start"][0]), int(query["size"][0])
+        page = {"data": self.tasks[start:start + size], "total": len(self.tasks), "start": start, "size": size}
+        if self.after_page:
+            self.after_page(start)
+        return 200, page, 0
+
+    def _served(self, stub):
+        """(start, size) of every page request"""
+        pages = []
+        for _, path, _, _ in stub.requests:
+            query = parse_qs(urlsplit(path).query)
+            pages.append((int(query["start"][0]), int(query["size"][0])))
+        return pages
+
+    def _run(self, action):
+        with StubServer({("GET", "/flowable/runtime/tasks?"): self._page}) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable", FLOWABLE_TASK_PAGE_SIZE=3):
+                result = action()
+        return result, stub
+
+    def _ids(self, tasks):
+        return [task["task_id"] for task in tasks]
+
+    def test_iterates_every_page(self):
+        tasks, stub = self._run(lambda: flowable.get_tasks_by_group(
+            group_id="supplier_rep", process_definition_key="serviceRequestProcess"
+        ))
+
+        self.assertEqual(self._ids(tasks), [f"task-{i}" for i in range(7)])
+        self.assertEqual(self._served(stub), [(0, 3), (3, 3), (6, 3)])
+        # Filters go to the server on every page
+        for _, path, _, _ in stub.requests:
+            query = parse_qs(urlsplit(path).query)
+            self.assertEqual(query["candidateGroup"], ["supplier_rep"])
+            self.assertEqual(query["processDefinitionKey"], ["serviceRequestProcess"])
+
+    def test_exact_multiple_of_the_page_size_needs_no_extra_request(self):
+        self.tasks = self.tasks[:6]
+        tasks, stub = self._run(lambda: flowable.get_tasks_by_group(group_id="supplier_rep"))
+
+        self.assertEqual(len(tasks), 6)
+        self.assertEqual(self._served(stub), [(0, 3), (3, 3)])
+
+    def test_cursor_round_trip(self):
+        def walk():
+            pages, cursor = [], None
+            while True:
+                tasks, cursor = flowable.list_tasks_by_group(group_id="supplier_rep", limit="2", cursor=cursor)
+                pages.append((self._ids(tasks), cursor))
+                if cursor is None:
+                    return pages
+
+        pages, stub = self._run(walk)
+
+        self.assertEqual(pages, [
+            (["task-0", "task-1"], "2"),
+            (["task-2", "task-3"], "4"),
+            (["task-4", "task-5"], "6"),
+            (["task-6"], None),
+        ])
+        self.assertEqual(len(stub.requests), 4)
+
+    def test_limit_is_capped_at_the_page_size(self):
+        (tasks, cursor), stub = self._run(lambda: flowable.list_tasks_by_group(group_id="supplier_rep", limit="100"))
+
+        self.assertEqual((len(tasks), cursor), (3, "3"))
+        self.assertEqual(self._served(stub), [(0, 3)])
+
+    def test_without_a_limit_every_page_is_drained(self):
+        (tasks, cursor), stub = self._run(lambda: flowable.list_tasks_by_group(group_id="supplier_rep"))
+
+        self.assertEqual((len(tasks), cursor), (7, None))
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_stops_when_tasks_are_completed_between_pages(self):
+        def complete_two(start):
+            if start == 0:
+                del self.tasks[:2]
+
+        self.after_page = complete_two
+        tasks, stub = self._run(lambda: flowable.get_tasks_by_group(group_id="supplier_rep"))
+
+        # Offsets shift with the list: task-3 and task-4 move onto the page already read
+        self.assertEqual(self._ids(tasks), ["task-0", "task-1", "task-2", "task-5", "task-6"])
+        self.assertEqual(self._served(stub), [(0, 3), (3, 3)])
+
+    def test_follows_tasks_created_between_pages(self):
+        def create_one(start):
+            if len(self.tasks) < 10:
+                self.tasks.append(self._task(len(self.tasks)))
+
+        self.after_page = create_one
+        tasks, stub = self._run(lambda: flowable.get_tasks_by_group(group_id="supplier_rep"))
+
+        # task-9 is created after the last page, whose total said 9
+        self.assertEqual(self._ids(tasks), [f"task-{i}" for i in range(9)])
+        self.assertEqual(self._served(stub), [(0, 3), (3, 3), (6, 3)])
+
+    def test_stops_on_an_empty_page_despite_a_stale_total(self):
+        def stale_total(path):
+            status, page, delay = self._page(path)
+            page["total"] = 100
+            return status, page, delay
+
+        with StubServer({("GET", "/flowable/runtime/tasks?"): stale_total}) as stub:
+            with override_settings(FLOWABLE_BASE_URL=f"{stub.url}/flowable", FLOWABLE_TASK_PAGE_SIZE=3):
+                tasks = flowable.get_tasks_by_group(group_id="supplier_rep")
+
+        self.assertEqual(len(tasks), 7)
+        self.assertEqual(self._served(stub), [(0, 3), (3, 3), (6, 3), (7, 3)])
+
+
+class ThirdPartyServiceTests(SimpleTestCase):
+    """Latency ceiling of call_api / call_many against a stub partner that sleeps"""
+
+    routes = {
+        ("POST", "/fast"): lambda path: (201, {}, 0),
+        ("POST", "/slow"): lambda path: (201, {}, 2),
+        ("POST", "/error"): lambda path: (500, {"error": "boom"}, 0),
+    }
+
+    def setUp(self):
+        self.service = ThirdPartyService(read_timeout=0.3, max_workers=12)
+        self.addCleanup(self.service.close)
+
+    def test_read_timeout_bounds_a_hung_endpoint(self):
+        with StubServer(self.routes) as stub:
+            started = time.perf_counter()
+            with self.assertRaisesMessage(Exception, "timed out"):
+                self.service.call_api(f"{stub.url}/slow", {"n": 1})
+            elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 1)
+
+    def test_call_many_holds_the_ceiling_with_slow_calls_in_the_batch(self):
+        with StubServer(self.routes) as stub:
+            calls = [{"url": f"{stub.url}/fast", "payload": {"n": i}, "idempotency_key": f"k{i}"} for i in range(8)]
+            calls += [{"url": f"{stub.url}/slow", "payload": {"n": i}} for i in range(4)]
+            calls.append({"url": f"{stub.url}/error", "payload": {}})
+
+            started = time.perf_counter()
+            results = self.service.call_many(calls)
+            elapsed = time.perf_counter() - started
+
+        print(f"\nThird party call_many: {len(calls)} calls (4 hung) in {elapsed * 1000:.0f} ms")
+        self.assertLess(elapsed, 1)
+
+        self.assertTrue(all(result.status_code == 201 for result in results[:8]))
+        self.assertTrue(all("timed out" in str(result) for result in results[8:12]))
+        self.assertIn("500", str(results[12]))
+
+        headers = [request[2] for request in stub.requests if request[1] == "/fast"]
+        self.assertEqual(sorted(header["Idempotency-Key"] for header in headers), sorted(f"k{i}" for i in range(8)))
+
+        stats = self.service.latency_stats()
+        fast = stats[f"{stub.url.removeprefix('http://')}/fast"]
+        slow = stats[f"{stub.url.removeprefix('http://')}/slow"]
+        self.assertEqual((fast["count"], slow["count"]), (8, 4))
+        self.assertLess(slow["max"], 1)
+        self.assertEqual(slow["buckets"]["le_inf"], 4)
+        self.assertEqual(fast["buckets"]["le_0.25"], 8)
+
+    def test_keeps_connections_alive(self):
+        service = ThirdPartyService(max_workers=2)
+        self.addCleanup(service.close)
+
+        with StubServer(self.routes) as stub:
+            for i in range(20):
+                service.call_api(f"{stub.url}/fast", {"n": i})
+
+        self.assertEqual(stub.connections, 1)
@@ -2,23 +2,130 @@
 Third Party API Service
 Replace with your actual 3rd party API implementation
 """
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 # import logging
 
 # logger = logging.getLogger(__name__)
 
 
+class LatencyHistogram:
+    """Thread-safe bucketed latency histogram (seconds)"""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            # Cumulative: le_X counts every call that took at most X seconds
+            buckets, running = {}, 0
+            for bound, count in zip(self.BUCKETS + ("inf",), self.counts):
+                running += count
+                buckets[f"le_{bound}"] = running
+            return {
+                "count": self.count,
+                "avg": self.total / self.count if self.count else 0.0,
+                "max": self.max,
+                "buckets": buckets,
+            }
+
+
 class ThirdPartyService:
-    """Service to interact with 3rd party contract API"""
-    
-    def call_api(self, url, payload):
+    """
+    Service to interact with 3rd party contract API.
+
+    Holds one pooled keep-alive session per process and bounds every call
+    with connect/read timeouts, so a hung partner endpoint cannot pin a
+    worker. POSTs are not retried here; the outbox owns retries.
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, max_workers=None):
+        self.pool_size = pool_size or getattr(settings, "THIRD_PARTY_POOL_SIZE", 10)
+        self.connect_timeout = connect_timeout or getattr(settings, "THIRD_PARTY_CONNECT_TIMEOUT", 3.05)
+        self.read_timeout = read_timeout or getattr(settings, "THIRD_PARTY_READ_TIMEOUT", 10)
+        self.max_workers = max_workers or getattr(settings, "THIRD_PARTY_MAX_WORKERS", 8)
+
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @property
+    def session(self):
+        # Sessions must not be shared across forked workers
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+        return self._session
+
+    def _build_session(self):
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=0,
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _observe(self, url, seconds):
+        parts = urlsplit(url)
+        endpoint = f"{parts.netloc}{parts.path}"
+
+        histogram = self._histograms.get(endpoint)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(endpoint, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def latency_stats(self):
+        """Per-endpoint latency histograms for every call made by this process"""
+        return {endpoint: histogram.snapshot() for endpoint, histogram in list(self._histograms.items())}
+
+    def call_api(self, url, payload, idempotency_key=None):
         headers = {
             'content-type': 'application/json'
         }
 
+        # Lets the partner drop duplicates when the outbox retries a call
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+
+        started = time.monotonic()
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            
+            response = self.session.post(
+                url,
+                json=payload,
+                headers=headers,
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+
             # If the request was successful (status code 200)
             if response.status_code in [200, 201]:
                 return response
@@ -27,19 +134,55 @@ class ThirdPartyService:
                 print(f"API Error: {response.status_code} - {response.text}")
                 # Raise exception so caller knows it failed
                 raise Exception(f"API returned status {response.status_code}: {response.text}")
-        
+
         except requests.exceptions.Timeout:
             print("Request timed out")
             raise Exception("Third party API request timed out")
-        
+
         except requests.exceptions.ConnectionError as e:
             print(f"Connection error: {e}")
             raise Exception(f"Failed to connect to third party API: {str(e)}")
-        
+
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {e}")
             raise Exception(f"Third party API request failed: {str(e)}")
 
+        finally:
+            self._observe(url, time.monotonic() - started)
+
+    def call_many(self, calls, max_workers=None):
+        """
+        Send a batch of calls concurrently on a bounded worker pool.
+
+        `calls` is an iterable of dicts with `url`, `payload` and an optional
+        `idempotency_key`. Returns one entry per call, in input order: the
+        response on success or the raised Exception on failure.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        def send(call):
+            try:
+                return self.call_api(
+                    url=call["url"],
+                    payload=call["payload"],
+                    idempotency_key=call.get("idempotency_key"),
+                )
+            except Exception as e:
+                return e
+
+        workers = min(max_workers or self.max_workers, len(calls))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(send, calls))
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
 
 # Singleton instance
-third_party_service = ThirdPartyService()
\ No newline at end of file
+third_party_service = ThirdPartyService()
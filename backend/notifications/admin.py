@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, BroadcastNotification
 
 
 @admin.register(Notification)
@@ -7,4 +7,12 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['id', 'title', 'message', 'is_read', 'entity_type', 'created_at']
     list_filter = ['is_read', 'entity_type']
     search_fields = ['title', 'message', 'entity_type',]
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'role', 'provider', 'entity_type', 'created_at']
+    list_filter = ['role', 'entity_type']
+    search_fields = ['title', 'message', 'entity_type',]
+    ordering = ['-created_at']
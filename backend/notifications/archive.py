@@ -0,0 +1,56 @@
+import heapq
+from datetime import datetime
+
+from config.retention import Archive
+from . import counters
+from .models import Notification, BroadcastNotification
+
+# Old feed items moved out of the tables by `manage.py archive_notifications`
+notification_archive = Archive(
+    "notifications",
+    Notification,
+    fields=["id", "created_at", "user_id", "title", "message", "is_read", "entity_type", "entity_id"],
+)
+broadcast_archive = Archive(
+    "broadcast_notifications",
+    BroadcastNotification,
+    fields=["id", "created_at", "role", "provider_id", "title", "message", "entity_type", "entity_id"],
+)
+
+
+def archive_before(cutoff, *, limit=None):
+    """
+    Archive personal notifications and broadcasts created before `cutoff`.
+    Returns (notifications moved, broadcasts moved).
+    """
+    personal = notification_archive.archive_before(cutoff, limit=limit)
+    broadcasts = broadcast_archive.archive_before(cutoff, limit=limit)
+
+    # Archived unread items no longer count towards anyone's unread total
+    if personal or broadcasts:
+        counters.reconcile()
+    return personal, broadcasts
+
+
+def archived_feed(user, *, start=None, end=None):
+    """`user`'s archived feed items created on days `start` to `end`, oldest first"""
+    user_id = str(user.pk)
+    provider_id = str(user.provider_id) if user.provider_id else None
+
+    def visible(row):
+        return (
+            row["role"] == user.role
+            and row["provider_id"] in (None, provider_id)
+            # As in the live feed, broadcasts from before the account existed are not shown
+            and datetime.fromisoformat(row["created_at"]) >= user.date_joined
+        )
+
+    personal = (
+        {**row, "kind": "personal"}
+        for row in notification_archive.read(start=start, end=end, where=lambda row: row["user_id"] == user_id)
+    )
+    broadcasts = (
+        {**row, "kind": "broadcast", "is_read": None}
+        for row in broadcast_archive.read(start=start, end=end, where=visible)
+    )
+    return heapq.merge(personal, broadcasts, key=lambda row: datetime.fromisoformat(row["created_at"]))
@@ -0,0 +1,205 @@
+"""
+Maintained unread counts, so GET unread-count costs the same however much
+history a user has.
+
+Broadcasts are one row per event (see notifications.feed), so rather than
+touching every recipient's counter, notify_roles() bumps one tally per
+channel (the pubsub channel names, e.g. "role:SUPPLIER_REP"):
+
+    unread = UnreadCounter.personal
+             + sum(BroadcastTally.total of the user's broadcast channels)
+             - UnreadCounter.broadcasts_seen
+
+broadcasts_seen covers broadcasts the user has read, plus those sent
+before they joined. Rows are updated with F() expressions in the writing
+transaction. Values are read through the cache. Each write deletes the
+cache entry once it commits, so the next reader falls back to the row.
+Missing rows, or a user whose channels changed (role or provider
+update), are computed exactly from the notification tables.
+`manage.py reconcile_unread_counters` recomputes everything to fix drift.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import feed, pubsub
+from .models import BroadcastNotification, BroadcastTally, UnreadCounter
+
+
+def _user_key(user_id):
+    return f"notifications:unread:user:{user_id}"
+
+
+def _tally_key(channel):
+    return f"notifications:unread:tally:{channel}"
+
+
+def _invalidate_on_commit(*keys):
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# ---- tallies ----
+
+def _count_channel(channel):
+    role, _, provider_id = channel.removeprefix("role:").partition(":provider:")
+    broadcasts = BroadcastNotification.objects.filter(role=role)
+    if provider_id:
+        return broadcasts.filter(provider_id=provider_id).count()
+    return broadcasts.filter(provider__isnull=True).count()
+
+
+def _tallies(channels):
+    """{channel: total}, creating missing tally rows from an exact count"""
+    totals = dict(BroadcastTally.objects.filter(channel__in=channels).values_list("channel", "total"))
+    for channel in channels:
+        if channel not in totals:
+            tally, _ = BroadcastTally.objects.get_or_create(
+                channel=channel, defaults={"total": _count_channel(channel)}
+            )
+            totals[channel] = tally.total
+    return totals
+
+
+def broadcast_added(broadcast):
+    channel = pubsub.channel_of(broadcast)
+    # No row yet: it is created from an exact count on first read
+    BroadcastTally.objects.filter(channel=channel).update(total=F("total") + 1)
+    _invalidate_on_commit(_tally_key(channel))
+
+
+# ---- per-user counters ----
+
+def _signature(channels):
+    return ",".join(channels)
+
+
+def _row(user):
+    return UnreadCounter.objects.filter(user=user).values_list("personal", "broadcasts_seen", "channels").first()
+
+
+def _rebuild(user, channels):
+    """
+    Exact counter row for `user`, from the notification tables.
+    Returns ((personal, broadcasts_seen, channels), tallies).
+    """
+    # One transaction, so the tallies and the counts see the same rows
+    with transaction.atomic():
+        tallies = _tallies(channels)
+        personal, broadcasts = feed.exact_unread(user)
+        counter, _ = UnreadCounter.objects.update_or_create(
+            user=user,
+            defaults={
+                "personal": personal,
+                "broadcasts_seen": sum(tallies.values()) - broadcasts,
+                "channels": _signature(channels),
+            },
+        )
+    return (counter.personal, counter.broadcasts_seen, counter.channels), tallies
+
+
+def _update(user, **changes):
+    if UnreadCounter.objects.filter(user=user).update(**changes):
+        _invalidate_on_commit(_user_key(user.pk))
+
+
+def personal_added(user):
+    _update(user, personal=F("personal") + 1)
+
+
+def personal_read(user):
+    _update(user, personal=F("personal") - 1)
+
+
+def broadcast_read(user):
+    _update(user, broadcasts_seen=F("broadcasts_seen") + 1)
+
+
+def all_read(user):
+    channels = pubsub.broadcast_channels_for(user)
+    tallies = _tallies(channels)
+    UnreadCounter.objects.update_or_create(
+        user=user,
+        defaults={
+            "personal": 0,
+            "broadcasts_seen": sum(tallies.values()),
+            "channels": _signature(channels),
+        },
+    )
+    _invalidate_on_commit(_user_key(user.pk))
+
+
+def rebuild(user):
+    """Recompute `user`'s counter exactly; returns True when it had drifted"""
+    before = _row(user)
+    after, _ = _rebuild(user, pubsub.broadcast_channels_for(user))
+    _invalidate_on_commit(_user_key(user.pk))
+    return before != after
+
+
+def rebuild_tallies():
+    """Recompute every tally from the broadcast table; returns how many had drifted"""
+    exact = {}
+    rows = BroadcastNotification.objects.values_list("role", "provider_id").annotate(total=Count("id")).order_by()
+    for role, provider_id, total in rows:
+        exact[f"role:{role}:provider:{provider_id}" if provider_id else f"role:{role}"] = total
+
+    drifted = 0
+    with transaction.atomic():
+        current = dict(BroadcastTally.objects.values_list("channel", "total"))
+        for channel in current.keys() | exact.keys():
+            total = exact.get(channel, 0)
+            if current.get(channel) != total:
+                BroadcastTally.objects.update_or_create(channel=channel, defaults={"total": total})
+                drifted += 1
+        _invalidate_on_commit(*[_tally_key(channel) for channel in current.keys() | exact.keys()])
+    return drifted
+
+
+def reconcile():
+    """
+    Recompute every tally and existing counter from the notification tables.
+    Returns (tallies fixed, counters fixed, counters checked).
+    """
+    tallies = rebuild_tallies()
+
+    checked = drifted = 0
+    rows = UnreadCounter.objects.select_related("user").order_by("pk")
+    for counter in rows.iterator(chunk_size=500):
+        checked += 1
+        drifted += rebuild(counter.user)
+
+    return tallies, drifted, checked
+
+
+# ---- reading ----
+
+def unread_count(user):
+    channels = pubsub.broadcast_channels_for(user)
+    signature = _signature(channels)
+    user_key = _user_key(user.pk)
+    tally_keys = {channel: _tally_key(channel) for channel in channels}
+
+    cached = cache.get_many([user_key, *tally_keys.values()])
+    fresh = {}
+
+    counter = cached.get(user_key)
+    tallies = {channel: cached.get(key) for channel, key in tally_keys.items()}
+
+    if counter is None or counter[2] != signature:
+        counter = _row(user)
+        if counter is None or counter[2] != signature:
+            # First read, or the user's role / provider changed since
+            counter, tallies = _rebuild(user, channels)
+            fresh.update({tally_keys[channel]: total for channel, total in tallies.items()})
+        fresh[user_key] = counter
+
+    if None in tallies.values():
+        tallies = _tallies(channels)
+        fresh.update({tally_keys[channel]: total for channel, total in tallies.items()})
+
+    if fresh:
+        cache.set_many(fresh, settings.NOTIFICATION_UNREAD_CACHE_TTL)
+
+    personal, seen, _ = counter
+    return max(personal, 0) + max(sum(tallies.values()) - seen, 0)
@@ -0,0 +1,155 @@
+"""
+A user's notification feed: their personal Notification rows merged with
+the BroadcastNotification rows addressed to their role (and provider).
+
+Both sources are read newest first on their own (user, created_at) and
+(role, created_at) indexes, LIMIT page size + 1 each, and merged in
+Python, so a page costs two index range scans whatever the table sizes.
+Pages are keyed by (created_at, id) of the last item returned.
+"""
+import base64
+import heapq
+import uuid
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
+from django.utils import timezone
+
+from . import counters
+from .models import Notification, BroadcastNotification, BroadcastReadCursor, BroadcastReceipt
+
+
+def _read_before(user):
+    cursor = BroadcastReadCursor.objects.filter(user=user).values_list("read_before", flat=True).first()
+    # Broadcasts from before the account existed are never shown, as with per-user rows
+    return max(cursor, user.date_joined) if cursor else user.date_joined
+
+
+def personal_for(user):
+    return Notification.objects.filter(user=user)
+
+
+def _visible_broadcasts(user):
+    return (
+        BroadcastNotification.objects.filter(role=user.role, created_at__gte=user.date_joined)
+        .filter(Q(provider__isnull=True) | Q(provider_id=user.provider_id))
+    )
+
+
+def _receipt(user):
+    return Exists(BroadcastReceipt.objects.filter(user=user, broadcast=OuterRef("pk")))
+
+
+def broadcasts_for(user):
+    """Broadcasts visible to `user`, annotated with is_read"""
+    return _visible_broadcasts(user).annotate(is_read=ExpressionWrapper(
+        Q(created_at__lte=_read_before(user)) | Q(_receipt(user)),
+        output_field=BooleanField(),
+    ))
+
+
+def encode_cursor(item):
+    raw = f"{item.created_at.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(token):
+    """(created_at, id) from encode_cursor(), or None when malformed"""
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(item_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def _before(queryset, position):
+    if position is None:
+        return queryset
+    created_at, item_id = position
+    # A range on the created_at index plus a residual check for ties
+    return queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=item_id)
+
+
+def page(user, *, limit, position=None):
+    """
+    Up to `limit` feed items older than `position`, newest first.
+    Returns (items, has_more).
+    """
+    ordering = ("-created_at", "-id")
+    sources = [
+        _before(personal_for(user), position).order_by(*ordering)[:limit + 1],
+        _before(broadcasts_for(user), position).order_by(*ordering)[:limit + 1],
+    ]
+
+    merged = heapq.merge(*sources, key=lambda item: (item.created_at, item.id), reverse=True)
+    items = [item for _, item in zip(range(limit + 1), merged)]
+    return items[:limit], len(items) > limit
+
+
+def _after(queryset, position):
+    created_at, item_id = position
+    return queryset.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=item_id)
+
+
+def since(user, position, *, limit):
+    """
+    Up to `limit` feed items newer than `position`, oldest first (used to
+    replay what a reconnecting stream missed). Returns (items, has_more).
+    """
+    ordering = ("created_at", "id")
+    sources = [
+        _after(personal_for(user), position).order_by(*ordering)[:limit + 1],
+        _after(broadcasts_for(user), position).order_by(*ordering)[:limit + 1],
+    ]
+
+    merged = heapq.merge(*sources, key=lambda item: (item.created_at, item.id))
+    items = [item for _, item in zip(range(limit + 1), merged)]
+    return items[:limit], len(items) > limit
+
+
+def get_item(user, item_id):
+    """One feed item by id, or None"""
+    return (
+        personal_for(user).filter(pk=item_id).first()
+        or broadcasts_for(user).filter(pk=item_id).first()
+    )
+
+
+def exact_unread(user):
+    """(unread personal, unread broadcasts) counted from the tables"""
+    personal = personal_for(user).filter(is_read=False).count()
+    broadcasts = (
+        _visible_broadcasts(user)
+        .filter(created_at__gt=_read_before(user))
+        .exclude(_receipt(user))
+        .count()
+    )
+    return personal, broadcasts
+
+
+def unread_count(user):
+    return counters.unread_count(user)
+
+
+@transaction.atomic
+def mark_read(user, item):
+    if isinstance(item, Notification):
+        # Conditional UPDATE so a repeated mark_read decrements once
+        if personal_for(user).filter(pk=item.pk, is_read=False).update(is_read=True):
+            counters.personal_read(user)
+        item.is_read = True
+    elif not item.is_read:
+        _, created = BroadcastReceipt.objects.get_or_create(user=user, broadcast=item)
+        if created:
+            counters.broadcast_read(user)
+
+
+@transaction.atomic
+def mark_all_read(user):
+    now = timezone.now()
+    personal_for(user).filter(is_read=False).update(is_read=True)
+    BroadcastReadCursor.objects.update_or_create(user=user, defaults={"read_before": now})
+    # Receipts at or before the cursor are implied by it
+    BroadcastReceipt.objects.filter(user=user, broadcast__created_at__lte=now).delete()
+    counters.all_read(user)
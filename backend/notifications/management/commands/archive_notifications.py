@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications import archive
+
+
+class Command(BaseCommand):
+    help = "Move notifications older than the retention period to compressed archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+        parser.add_argument("--limit", type=int, default=None, help="Move at most LIMIT rows per table this run")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        personal, broadcasts = archive.archive_before(cutoff, limit=options["limit"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {personal} notifications and {broadcasts} broadcasts older than {cutoff:%Y-%m-%d %H:%M}"
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached unread notification counters from the notification tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0, help="Repeat every INTERVAL seconds (default: run once)")
+
+    def handle(self, *args, **options):
+        while True:
+            tallies, drifted, checked = counters.reconcile()
+            self.stdout.write(self.style.SUCCESS(
+                f"Fixed {tallies} broadcast tallies and {drifted} of {checked} unread counters"
+            ))
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+            # Between runs only, so a single run leaves the caller's connection alone
+            close_old_connections()
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_unread_counters'),
+        ('providers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(fields=['created_at'], name='notificatio_created_aeeb0b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notificatio_created_46ad24_idx'),
+        ),
+    ]
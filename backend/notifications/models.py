@@ -24,4 +24,86 @@ class Notification(models.Model):
     created_at  = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ["-created_at"]
\ No newline at end of file
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["user", "is_read"]),
+            # Retention scans (archive_notifications)
+            models.Index(fields=["created_at"]),
+        ]
+
+    @property
+    def kind(self):
+        return "personal"
+
+
+class BroadcastNotification(models.Model):
+    """
+    One row per event addressed to every user with `role`, optionally only
+    those of `provider`. Users read it through the merged feed in
+    notifications.feed; read state lives in BroadcastReadCursor/BroadcastReceipt.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    role     = models.CharField(max_length=32)
+    # null: every provider
+    provider = models.ForeignKey(
+        "providers.Provider",
+        on_delete=models.CASCADE,
+        related_name="broadcast_notifications",
+        null=True, blank=True
+    )
+
+    title       = models.CharField(max_length=255)
+    message     = models.TextField()
+
+    entity_type = models.CharField(max_length=64, blank=True)
+    entity_id   = models.CharField(max_length=64, blank=True)
+
+    created_at  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["role", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    @property
+    def kind(self):
+        return "broadcast"
+
+
+class BroadcastReadCursor(models.Model):
+    """Every broadcast created at or before `read_before` counts as read for `user`"""
+    user        = models.OneToOneField("accounts.User", on_delete=models.CASCADE, related_name="broadcast_cursor")
+    read_before = models.DateTimeField()
+
+
+class BroadcastReceipt(models.Model):
+    """A broadcast newer than the user's cursor that the user has read"""
+    user      = models.ForeignKey("accounts.User", on_delete=models.CASCADE, related_name="broadcast_receipts")
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name="receipts")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "broadcast"], name="unique_broadcast_receipt"),
+        ]
+
+
+class BroadcastTally(models.Model):
+    """How many broadcasts were ever sent on a pubsub channel ("role:<role>" or "role:<role>:provider:<id>")"""
+    channel = models.CharField(max_length=128, primary_key=True)
+    total   = models.PositiveBigIntegerField(default=0)
+
+
+class UnreadCounter(models.Model):
+    """
+    Maintained unread count of `user` (see notifications.counters):
+    unread personal notifications, and how much of the tallies of
+    `channels` (the user's broadcast channels) is read or predates them.
+    """
+    user            = models.OneToOneField("accounts.User", on_delete=models.CASCADE, related_name="unread_counter")
+    personal        = models.IntegerField(default=0)
+    broadcasts_seen = models.BigIntegerField(default=0)
+    channels        = models.CharField(max_length=255)
@@ -0,0 +1,166 @@
+"""
+Publish/subscribe for live notifications.
+
+notify_user() and notify_roles() publish every new feed item once its
+transaction commits, and each open notification stream
+(notifications.stream) holds one subscription. Items are routed by
+channel, so a publish only touches the connections that should see it:
+
+    user:<id>                   personal notifications
+    role:<role>                 broadcasts to a role
+    role:<role>:provider:<id>   broadcasts to one provider's users in a role
+
+The backend is the class named by NOTIFICATION_PUBSUB_BACKEND.
+InProcessBackend only reaches streams served by the publishing process,
+which covers a single ASGI worker; other deployments plug in a backend
+with the same subscribe() / unsubscribe() / publish() methods. A stream
+that misses items anyway (overflow, reconnect) catches up from the
+database with Last-Event-ID.
+"""
+import asyncio
+import functools
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Notification
+
+
+class Subscription:
+    """
+    One stream's queue. Items arrive as event dicts; None means the stream
+    fell too far behind and should end so the client resumes from the database.
+    """
+
+    def __init__(self, channels, loop, max_size):
+        self.channels = tuple(channels)
+        self.loop = loop
+        self.max_size = max_size
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    def put(self, event):
+        # Runs on the subscription's event loop
+        if self.closed:
+            return
+        if self.queue.qsize() >= self.max_size:
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+def _deliver(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.put(event)
+
+
+class InProcessBackend:
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.NOTIFICATION_STREAM_QUEUE_SIZE
+        self._lock = threading.Lock()
+        self._channels = defaultdict(set)
+
+    def subscribe(self, channels):
+        """Must be called from the event loop that will read the subscription"""
+        subscription = Subscription(channels, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channels, event):
+        """Thread-safe; may be called from sync code outside any event loop"""
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+
+        # One wakeup per event loop, however many streams it serves
+        by_loop = defaultdict(list)
+        for subscription in targets:
+            by_loop[subscription.loop].append(subscription)
+
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, event)
+            except RuntimeError:
+                # Loop already closed (server shutting down)
+                pass
+
+        return len(targets)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._channels.values()))
+
+
+@functools.cache
+def get_backend():
+    return import_string(settings.NOTIFICATION_PUBSUB_BACKEND)()
+
+
+def broadcast_channels_for(user):
+    """Channels carrying the broadcasts `user` can see"""
+    channels = [f"role:{user.role}"]
+    if user.provider_id:
+        channels.append(f"role:{user.role}:provider:{user.provider_id}")
+    return channels
+
+
+def channels_for(user):
+    """Channels carrying everything in `user`'s feed"""
+    return [f"user:{user.pk}"] + broadcast_channels_for(user)
+
+
+def channel_of(item):
+    if isinstance(item, Notification):
+        return f"user:{item.user_id}"
+    if item.provider_id:
+        return f"role:{item.role}:provider:{item.provider_id}"
+    return f"role:{item.role}"
+
+
+def event_for(item):
+    """The stream event for a feed item; `id` is its feed cursor"""
+    from . import feed
+    from .serializers import NotificationSerializer
+
+    if not hasattr(item, "is_read"):
+        # Fresh broadcasts are unread for everyone
+        item.is_read = False
+
+    return {
+        "id": feed.encode_cursor(item),
+        "position": (item.created_at, item.id),
+        "data": json.dumps(NotificationSerializer(item).data),
+    }
+
+
+def publish_on_commit(item):
+    """Push a newly created feed item to open streams once it is committed"""
+    def publish():
+        try:
+            get_backend().publish([channel_of(item)], event_for(item))
+        except Exception as e:
+            # Streams catch up from the database; never fail the write over a push
+            print(f"Notification publish failed: {e}")
+
+    transaction.on_commit(publish)
@@ -7,6 +7,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = [
             "id",
+            "kind",
             "title",
             "message",
             "is_read",
@@ -16,5 +17,6 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "id",
+            "kind",
             "created_at",
         ]
@@ -1,30 +1,32 @@
-from django.contrib.auth import get_user_model
-from .models import Notification
+from . import counters, pubsub
+from .models import Notification, BroadcastNotification
 
-User = get_user_model()
 
-
-def notify_roles(*, role, title, message, entity_type, entity_id):
-    users = User.objects.filter(role=role)
-
-    notifications = [
-        Notification(
-            user=user,
-            title=title,
-            message=message,
-            entity_type=entity_type,
-            entity_id=entity_id,
-        )
-        for user in users
-    ]
-    Notification.objects.bulk_create(notifications)
+def notify_roles(*, role, title, message, entity_type, entity_id, provider_id=None):
+    """
+    Notify every user with `role` (only those of `provider_id` when given).
+    Writes a single BroadcastNotification row however many users match.
+    """
+    broadcast = BroadcastNotification.objects.create(
+        role=role,
+        provider_id=provider_id,
+        title=title,
+        message=message,
+        entity_type=entity_type,
+        entity_id=entity_id,
+    )
+    counters.broadcast_added(broadcast)
+    pubsub.publish_on_commit(broadcast)
+    return broadcast
 
 
 def notify_user(*, user, title, message, entity_type, entity_id):
-    Notification.objects.create(
+    notification = Notification.objects.create(
         user=user,
         title=title,
         message=message,
         entity_type=entity_type,
         entity_id=entity_id,
     )
+    counters.personal_added(user)
+    pubsub.publish_on_commit(notification)
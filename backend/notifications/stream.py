@@ -0,0 +1,132 @@
+"""
+GET /api/notifications/notifications/stream/ - Server-Sent Events feed.
+
+An async view, so under the ASGI app (config/asgi.py) an idle connection
+is one suspended coroutine and a queue rather than a worker thread.
+
+- EventSource cannot send headers, so the access token may be passed as
+  ?token= (an "Authorization: Bearer" header works too). The stream ends
+  when the token expires; the client reconnects with a fresh one.
+- Every feed item is sent as a "notification" event whose id is its feed
+  cursor. On reconnect the browser sends Last-Event-ID (or pass
+  ?last_event_id=) and items created in between are replayed from the
+  database first. More than NOTIFICATION_STREAM_REPLAY_LIMIT missed items
+  sends a "resync" event instead: reload the list.
+- A comment line every NOTIFICATION_STREAM_HEARTBEAT seconds keeps
+  proxies from closing idle connections.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from accounts.authentication import CachedJWTAuthentication
+from . import feed, pubsub
+
+RETRY_MS = 3000
+
+
+def _raw_token(request):
+    token = request.GET.get("token")
+    if token:
+        return token.encode()
+
+    header = request.headers.get("Authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme == "Bearer" and token:
+        return token.encode()
+    return None
+
+
+@sync_to_async
+def _authenticate(raw_token):
+    try:
+        authentication = CachedJWTAuthentication()
+        validated = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated), validated["exp"]
+    finally:
+        # Django would only close it when the stream ends; don't hold a
+        # database connection per idle stream
+        connection.close()
+
+
+@sync_to_async
+def _backlog(user, position):
+    try:
+        items, has_more = feed.since(user, position, limit=settings.NOTIFICATION_STREAM_REPLAY_LIMIT)
+        return [pubsub.event_for(item) for item in items], has_more
+    finally:
+        connection.close()
+
+
+def _frame(event):
+    return f"id: {event['id']}\nevent: notification\ndata: {event['data']}\n\n"
+
+
+async def _events(user, position, expires_at):
+    backend = pubsub.get_backend()
+    # Subscribe before reading the backlog so nothing falls in between
+    subscription = backend.subscribe(pubsub.channels_for(user))
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        last_position = None
+        if position is not None:
+            backlog, has_more = await _backlog(user, position)
+            if has_more:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                for event in backlog:
+                    last_position = event["position"]
+                    yield _frame(event)
+
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                return
+
+            try:
+                event = await subscription.get(min(settings.NOTIFICATION_STREAM_HEARTBEAT, remaining))
+            except TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            if event is None:
+                # Fell behind; the client resumes from its Last-Event-ID
+                return
+            # Already sent by the replay
+            if last_position is not None and event["position"] <= last_position:
+                continue
+            yield _frame(event)
+    finally:
+        backend.unsubscribe(subscription)
+
+
+async def notification_stream(request):
+    # Step 1: Authenticate
+    raw_token = _raw_token(request)
+    if raw_token is None:
+        return JsonResponse({"error": "Authentication credentials were not provided"}, status=401)
+
+    try:
+        user, expires_at = await _authenticate(raw_token)
+    except (InvalidToken, AuthenticationFailed):
+        return JsonResponse({"error": "Invalid or expired token"}, status=401)
+
+    # Step 2: Parse the resume position
+    position = None
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    if last_event_id:
+        position = feed.decode_cursor(last_event_id)
+        if position is None:
+            return JsonResponse({"error": "Invalid Last-Event-ID"}, status=400)
+
+    # Step 3: Stream the backlog, then live items and heartbeats
+    response = StreamingHttpResponse(_events(user, position, expires_at), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
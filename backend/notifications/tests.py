@@ -1,3 +1,634 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import uvicorn
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.authentication import ClaimsTokenObtainPairSerializer
+from accounts.models import User
+from audit_log.tests import rss_bytes
+from config.asgi import application
+from providers.models import Provider
+from . import counters, feed, pubsub
+from .archive import archive_before, archived_feed
+from .models import (
+    BroadcastNotification, BroadcastReadCursor, BroadcastReceipt, BroadcastTally, Notification, UnreadCounter,
+)
+from .services import notify_roles, notify_user
+from .stream import notification_stream
+
+# Supplier reps sharing one role in the broadcast benchmark
+BROADCAST_BENCHMARK_USERS = int(os.getenv("BROADCAST_BENCHMARK_USERS", "10000"))
+# Idle streams held open against one ASGI worker in the load test
+STREAM_LOAD_CONNECTIONS = int(os.getenv("STREAM_LOAD_CONNECTIONS", "5000"))
+
+STREAM_URL = "/api/notifications/notifications/stream/"
+
+
+def broadcast(role="SUPPLIER_REP", provider=None, i=0):
+    return notify_roles(
+        role=role,
+        title=f"Broadcast {i}",
+        message="New service request",
+        entity_type="ServiceRequest",
+        entity_id=str(i),
+        provider_id=getattr(provider, "pk", None),
+    )
+
+
+def personal(user, i=0):
+    notify_user(user=user, title=f"Personal {i}", message="Offer accepted", entity_type="ServiceOffer", entity_id=str(i))
+    return Notification.objects.get(user=user, entity_id=str(i))
+
+
+def access_token(user):
+    return str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+
+
+class BroadcastFeedTests(TestCase):
+    url = "/api/notifications/notifications/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.other = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        joined = timezone.now() - timedelta(days=1)
+        cls.rep = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.acme, date_joined=joined)
+        cls.other_rep = User.objects.create(username="other", role="SUPPLIER_REP", provider=cls.other, date_joined=joined)
+        cls.admin = User.objects.create(username="admin", role="PROVIDER_ADMIN", provider=cls.acme, date_joined=joined)
+
+    def setUp(self):
+        # Unread counters are cached per user id, and the users outlive each test
+        cache.clear()
+
+    def committed(self):
+        # Cache invalidation and publishing wait for the commit
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def _titles(self, user, **params):
+        response = self._client(user).get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item["title"] for item in response.data["results"]]
+
+    def _unread(self, user):
+        return self._client(user).get(f"{self.url}unread-count/").data["unread_count"]
+
+    def test_one_row_per_event_whoever_it_reaches(self):
+        User.objects.bulk_create(
+            User(username=f"rep{i}", role="SUPPLIER_REP", provider=self.acme) for i in range(50)
+        )
+        with self.assertNumQueries(2):
+            broadcast()
+
+        self.assertEqual(BroadcastNotification.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_role_and_provider_scope(self):
+        with self.committed():
+            broadcast(i=0)
+            broadcast(provider=self.acme, i=1)
+            broadcast(provider=self.other, i=2)
+            broadcast(role="PROVIDER_ADMIN", i=3)
+
+        self.assertEqual(self._titles(self.rep), ["Broadcast 1", "Broadcast 0"])
+        self.assertEqual(self._titles(self.other_rep), ["Broadcast 2", "Broadcast 0"])
+        self.assertEqual(self._titles(self.admin), ["Broadcast 3"])
+
+    def test_broadcasts_before_joining_are_hidden(self):
+        with self.committed():
+            broadcast(i=0)
+            late = User.objects.create(username="late", role="SUPPLIER_REP", provider=self.acme)
+            broadcast(i=1)
+
+        self.assertEqual(self._titles(late), ["Broadcast 1"])
+        self.assertEqual(self._unread(late), 1)
+
+    def test_list_merges_both_sources_across_pages(self):
+        expected = []
+        for i in range(7):
+            if i % 2:
+                broadcast(i=i)
+                expected.append(("broadcast", f"Broadcast {i}"))
+            else:
+                personal(self.rep, i)
+                expected.append(("personal", f"Personal {i}"))
+
+        client = self._client(self.rep)
+        seen, url, params = [], self.url, {"page_size": 3}
+        while url:
+            response = client.get(url, params)
+            seen += [(item["kind"], item["title"]) for item in response.data["results"]]
+            url, params = response.data["next"], None
+
+        self.assertEqual(seen, expected[::-1])
+
+    def test_mark_read_keeps_read_state_per_user(self):
+        with self.committed():
+            item = broadcast()
+        client = self._client(self.rep)
+        self.assertEqual(self._unread(self.rep), 1)
+
+        for _ in range(2):
+            with self.committed():
+                response = client.post(f"{self.url}{item.pk}/mark_read/")
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(BroadcastReceipt.objects.filter(user=self.rep).count(), 1)
+        self.assertEqual(self._unread(self.rep), 0)
+        self.assertEqual(client.get(f"{self.url}{item.pk}/").data["is_read"], True)
+        # Nobody else's copy changed
+        self.assertEqual(self._unread(self.other_rep), 1)
+        self.assertEqual(self._client(self.other_rep).get(f"{self.url}{item.pk}/").data["is_read"], False)
+
+    def test_mark_all_read_moves_the_cursor(self):
+        with self.committed():
+            first = broadcast(i=0)
+            broadcast(i=1)
+            personal(self.rep)
+        self.assertEqual(self._unread(self.rep), 3)
+        with self.committed():
+            feed.mark_read(self.rep, feed.get_item(self.rep, first.pk))
+        self.assertEqual(self._unread(self.rep), 2)
+
+        with self.committed():
+            response = self._client(self.rep).post(f"{self.url}mark-all-read/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._unread(self.rep), 0)
+        self.assertTrue(BroadcastReadCursor.objects.filter(user=self.rep).exists())
+        # Covered by the cursor now
+        self.assertFalse(BroadcastReceipt.objects.filter(user=self.rep).exists())
+
+        with self.committed():
+            broadcast(i=2)
+        self.assertEqual(self._unread(self.rep), 1)
+        self.assertEqual(
+            [(item.title, item.is_read) for item in feed.page(self.rep, limit=2)[0]],
+            [("Broadcast 2", False), ("Personal 0", True)],
+        )
+
+    def test_unread_count_matches_the_tables(self):
+        self.assertEqual(self._unread(self.rep), 0)
+        with self.committed():
+            items = [broadcast(i=i) for i in range(4)]
+            personal(self.rep)
+            feed.mark_read(self.rep, feed.get_item(self.rep, items[2].pk))
+
+        self.assertEqual(self._unread(self.rep), sum(feed.exact_unread(self.rep)))
+        self.assertEqual(feed.exact_unread(self.rep), (1, 3))
+
+    def test_other_users_items_are_not_found(self):
+        personal(self.other_rep)
+        scoped = broadcast(provider=self.other)
+        client = self._client(self.rep)
+
+        for item_id in (Notification.objects.get().pk, scoped.pk):
+            self.assertEqual(client.get(f"{self.url}{item_id}/").status_code, 404)
+            self.assertEqual(client.post(f"{self.url}{item_id}/mark_read/").status_code, 404)
+
+    def test_malformed_cursor_is_rejected(self):
+        self.assertEqual(self._client(self.rep).get(self.url, {"cursor": "nope"}).status_code, 400)
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        joined = timezone.now() - timedelta(days=1)
+        cls.rep = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.acme, date_joined=joined)
+
+    def setUp(self):
+        cache.clear()
+
+    def committed(self):
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def _exact(self, user):
+        return sum(feed.exact_unread(user))
+
+    def test_warm_read_needs_no_query(self):
+        with self.committed():
+            broadcast()
+            personal(self.rep)
+        self.assertEqual(counters.unread_count(self.rep), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.unread_count(self.rep), 2)
+
+    def test_cache_is_cleared_when_the_write_commits(self):
+        self.assertEqual(counters.unread_count(self.rep), 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            personal(self.rep)
+            broadcast(provider=self.acme)
+            # Nothing committed yet: the cached count stands
+            self.assertEqual(counters.unread_count(self.rep), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(counters.unread_count(self.rep), 2)
+
+        with self.committed():
+            feed.mark_all_read(self.rep)
+        self.assertEqual(counters.unread_count(self.rep), 0)
+
+    def test_role_or_provider_change_rebuilds_the_counter(self):
+        other = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        with self.committed():
+            broadcast(i=0)
+            broadcast(role="PROVIDER_ADMIN", i=1)
+            broadcast(role="PROVIDER_ADMIN", provider=other, i=2)
+            broadcast(role="PROVIDER_ADMIN", provider=self.acme, i=3)
+        self.assertEqual(counters.unread_count(self.rep), 1)
+
+        # Cached under the old channels, so the stored signature no longer matches
+        self.rep.role = "PROVIDER_ADMIN"
+        self.assertEqual(counters.unread_count(self.rep), 2)
+        self.assertEqual(UnreadCounter.objects.get(user=self.rep).channels, "role:PROVIDER_ADMIN,role:PROVIDER_ADMIN:provider:" + str(self.acme.pk))
+
+        self.rep.provider = other
+        self.assertEqual(counters.unread_count(self.rep), self._exact(self.rep))
+        self.assertEqual(counters.unread_count(self.rep), 2)
+
+    def test_missing_tally_row_is_created_from_an_exact_count(self):
+        with self.committed():
+            for i in range(3):
+                broadcast(i=i)
+        # No row yet, so the increments were skipped
+        self.assertFalse(BroadcastTally.objects.exists())
+
+        self.assertEqual(counters.unread_count(self.rep), 3)
+        self.assertEqual(
+            dict(BroadcastTally.objects.values_list("channel", "total")),
+            {"role:SUPPLIER_REP": 3, f"role:SUPPLIER_REP:provider:{self.acme.pk}": 0},
+        )
+
+        with self.committed():
+            broadcast(i=3)
+        self.assertEqual(BroadcastTally.objects.get(channel="role:SUPPLIER_REP").total, 4)
+        self.assertEqual(counters.unread_count(self.rep), 4)
+
+    def test_reconcile_repairs_drift(self):
+        with self.committed():
+            broadcast()
+            personal(self.rep)
+        self.assertEqual(counters.unread_count(self.rep), 2)
+
+        UnreadCounter.objects.filter(user=self.rep).update(personal=50)
+        BroadcastTally.objects.filter(channel="role:SUPPLIER_REP").update(total=999)
+        output = io.StringIO()
+        with self.committed():
+            call_command("reconcile_unread_counters", stdout=output)
+
+        self.assertIn("Fixed 1 broadcast tallies and 1 of 1 unread counters", output.getvalue())
+        self.assertEqual(counters.unread_count(self.rep), 2)
+        self.assertEqual(counters.unread_count(self.rep), self._exact(self.rep))
+
+        # Nothing left to fix
+        self.assertEqual(counters.reconcile(), (0, 0, 1))
+
+
+class BroadcastBenchmark(TestCase):
+    """notify_roles and the feed reads with BROADCAST_BENCHMARK_USERS supplier reps"""
+
+    EVENTS = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        joined = timezone.now() - timedelta(days=1)
+        User.objects.bulk_create(
+            (
+                User(username=f"rep{i}", role="SUPPLIER_REP", provider=provider, date_joined=joined)
+                for i in range(BROADCAST_BENCHMARK_USERS)
+            ),
+            batch_size=5000,
+        )
+        cls.user = User.objects.filter(role="SUPPLIER_REP").first()
+
+    def setUp(self):
+        cache.clear()
+
+    def _timed(self, action):
+        timings = []
+        for i in range(self.EVENTS):
+            started = time.perf_counter()
+            action(i)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def test_write_and_read_cost_do_not_grow_with_recipients(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            write = self._timed(lambda i: broadcast(i=i))
+        self.assertEqual(BroadcastNotification.objects.count(), self.EVENTS)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        # The page is two index range scans (personal, broadcasts) plus the cursor lookup
+        with self.assertNumQueries(3):
+            client.get("/api/notifications/notifications/")
+        page = self._timed(lambda i: client.get("/api/notifications/notifications/"))
+        unread = self._timed(lambda i: client.get("/api/notifications/notifications/unread-count/"))
+        self.assertEqual(
+            client.get("/api/notifications/notifications/unread-count/").data["unread_count"], self.EVENTS
+        )
+
+        print(
+            f"\nBroadcasts to {BROADCAST_BENCHMARK_USERS} reps, {self.EVENTS} events: "
+            f"notify_roles {write * 1000:.2f} ms, list page {page * 1000:.2f} ms, "
+            f"unread-count {unread * 1000:.2f} ms (p50)"
+        )
+        # One row per event, where the per-user fan-out wrote BROADCAST_BENCHMARK_USERS
+        self.assertLess(write, 0.010)
+
+
+class NotificationStreamTests(TransactionTestCase):
+    """
+    The stream view, run in-process. TransactionTestCase: notifications
+    publish on commit, and the view closes its database connection.
+    """
+
+    def setUp(self):
+        cache.clear()
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.user = User.objects.create(username="rep", role="SUPPLIER_REP", provider=provider)
+        # A backend per test, so no subscription outlives it
+        self.backend = pubsub.InProcessBackend(queue_size=3)
+        patcher = mock.patch.object(pubsub, "get_backend", return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _open(self, *, last_event_id=None, token=None):
+        headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+        request = AsyncRequestFactory().get(STREAM_URL, {"token": token or access_token(self.user)}, headers=headers)
+        response = await notification_stream(request)
+        self.assertEqual(response.status_code, 200)
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await self._next(chunks)).startswith("retry:"))
+        return chunks
+
+    async def _next(self, chunks):
+        return (await asyncio.wait_for(anext(chunks), 5)).decode()
+
+    def _title(self, frame):
+        self.assertIn("event: notification\n", frame)
+        return json.loads(frame.split("data: ", 1)[1])["title"]
+
+    async def test_pushes_new_items_to_the_addressed_user(self):
+        chunks = await self._open()
+        await sync_to_async(broadcast)(role="PROVIDER_ADMIN")
+        await sync_to_async(personal)(self.user, 1)
+        await sync_to_async(broadcast)(i=2)
+
+        self.assertEqual([self._title(await self._next(chunks)) for _ in range(2)], ["Personal 1", "Broadcast 2"])
+        await chunks.aclose()
+
+    async def test_last_event_id_replays_what_was_missed(self):
+        first = await sync_to_async(personal)(self.user, 0)
+        await sync_to_async(broadcast)(i=1)
+        await sync_to_async(personal)(self.user, 2)
+
+        chunks = await self._open(last_event_id=feed.encode_cursor(first))
+        self.assertEqual([self._title(await self._next(chunks)) for _ in range(2)], ["Broadcast 1", "Personal 2"])
+
+        # Live items follow the replay
+        await sync_to_async(personal)(self.user, 3)
+        self.assertEqual(self._title(await self._next(chunks)), "Personal 3")
+        await chunks.aclose()
+
+    @override_settings(NOTIFICATION_STREAM_REPLAY_LIMIT=2)
+    async def test_too_many_missed_items_asks_for_a_resync(self):
+        first = await sync_to_async(personal)(self.user, 0)
+        for i in range(1, 4):
+            await sync_to_async(personal)(self.user, i)
+
+        chunks = await self._open(last_event_id=feed.encode_cursor(first))
+        self.assertEqual(await self._next(chunks), "event: resync\ndata: {}\n\n")
+        await chunks.aclose()
+
+    async def test_overflowing_stream_ends_and_releases_its_subscription(self):
+        chunks = await self._open()
+        for i in range(self.backend.queue_size + 1):
+            await sync_to_async(personal)(self.user, i)
+        # Let the queued deliveries run before the stream reads again
+        await asyncio.sleep(0)
+
+        titles = [self._title(await self._next(chunks)) for _ in range(self.backend.queue_size)]
+        self.assertEqual(titles, [f"Personal {i}" for i in range(self.backend.queue_size)])
+        with self.assertRaises(StopAsyncIteration):
+            await self._next(chunks)
+        self.assertEqual(self.backend.subscriber_count(), 0)
+
+    @override_settings(NOTIFICATION_STREAM_HEARTBEAT=0.05)
+    async def test_heartbeat_while_idle(self):
+        chunks = await self._open()
+        self.assertEqual(await self._next(chunks), ": heartbeat\n\n")
+        await chunks.aclose()
+
+    async def test_rejects_missing_token_and_bad_resume_id(self):
+        response = await notification_stream(AsyncRequestFactory().get(STREAM_URL))
+        self.assertEqual(response.status_code, 401)
+
+        response = await notification_stream(AsyncRequestFactory().get(STREAM_URL, {"token": "nope"}))
+        self.assertEqual(response.status_code, 401)
+
+        request = AsyncRequestFactory().get(STREAM_URL, {"token": access_token(self.user), "last_event_id": "nope"})
+        self.assertEqual((await notification_stream(request)).status_code, 400)
+
+
+@unittest.skipUnless(os.path.exists("/proc/self/statm"), "reads RSS from /proc")
+@override_settings(NOTIFICATION_STREAM_HEARTBEAT=2)
+class NotificationStreamLoadTest(TransactionTestCase):
+    """
+    STREAM_LOAD_CONNECTIONS idle streams against one uvicorn worker,
+    served from a thread of this process: every stream connects, gets
+    heartbeats, receives one broadcast, and releases its subscription on
+    disconnect. RSS covers both ends of the connections.
+    """
+
+    # Allowed RSS growth per open stream, client side included
+    RSS_PER_STREAM = 256 * 1024
+    # Connections opened at a time
+    CONNECT_CONCURRENCY = 200
+
+    def setUp(self):
+        cache.clear()
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        self.user = User.objects.create(username="rep", role="SUPPLIER_REP", provider=provider)
+
+        self.server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+        thread = threading.Thread(target=self.server.run, daemon=True)
+        thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+
+        def stop():
+            self.server.should_exit = True
+            thread.join(timeout=30)
+        self.addCleanup(stop)
+
+    async def _connect(self, request, limit):
+        async with limit:
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            writer.write(request)
+            await reader.readuntil(b"retry:")
+            return reader, writer
+
+    async def _load(self):
+        backend = pubsub.get_backend()
+        token = access_token(self.user)
+        request = (
+            f"GET {STREAM_URL}?token={token} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n"
+        ).encode()
+
+        baseline = rss_bytes()
+        started = time.perf_counter()
+        limit = asyncio.Semaphore(self.CONNECT_CONCURRENCY)
+        streams = await asyncio.gather(*(self._connect(request, limit) for _ in range(STREAM_LOAD_CONNECTIONS)))
+        connect_seconds = time.perf_counter() - started
+        growth = rss_bytes() - baseline
+        self.assertEqual(backend.subscriber_count(), STREAM_LOAD_CONNECTIONS)
+
+        await asyncio.gather(*(asyncio.wait_for(reader.readuntil(b": heartbeat"), 30) for reader, _ in streams))
+
+        started = time.perf_counter()
+        await sync_to_async(broadcast)()
+        await asyncio.gather(*(asyncio.wait_for(reader.readuntil(b"event: notification"), 60) for reader, _ in streams))
+        fan_out_seconds = time.perf_counter() - started
+
+        for _, writer in streams:
+            writer.close()
+        deadline = time.time() + 60
+        while backend.subscriber_count() and time.time() < deadline:
+            await asyncio.sleep(0.1)
+
+        print(
+            f"\nNotification stream, {STREAM_LOAD_CONNECTIONS} idle connections on one worker: "
+            f"connected in {connect_seconds:.1f} s, RSS +{growth / 2 ** 20:.0f} MiB "
+            f"({growth / STREAM_LOAD_CONNECTIONS / 1024:.0f} KiB per stream), "
+            f"one broadcast reached all in {fan_out_seconds:.2f} s"
+        )
+        self.assertEqual(backend.subscriber_count(), 0)
+        self.assertLess(growth, self.RSS_PER_STREAM * STREAM_LOAD_CONNECTIONS)
+
+    def test_idle_connections_on_one_worker(self):
+        asyncio.run(self._load())
+
+
+@override_settings(ARCHIVE_PAUSE=0)
+class NotificationArchiveTests(TestCase):
+    url = "/api/notifications/notifications/archive/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        other = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        day = lambda n, hour=12: datetime(2024, 3, n, hour, tzinfo=dt_timezone.utc)
+
+        cls.rep = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.acme, date_joined=day(1, 0))
+        cls.late = User.objects.create(username="late", role="SUPPLIER_REP", provider=cls.acme, date_joined=day(2, 0))
+        cls.other_rep = User.objects.create(username="other", role="SUPPLIER_REP", provider=other, date_joined=day(1, 0))
+
+        for created_at, item in (
+            (day(1), broadcast(i=1)),
+            (day(1, 13), personal(cls.rep, 2)),
+            (day(2), broadcast(provider=cls.acme, i=3)),
+            (day(2, 13), broadcast(provider=other, i=4)),
+            (day(3), broadcast(role="PROVIDER_ADMIN", i=5)),
+            (day(3, 13), personal(cls.other_rep, 6)),
+            (day(4), broadcast(i=7)),
+        ):
+            type(item).objects.filter(pk=item.pk).update(created_at=created_at)
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_patch = override_settings(ARCHIVE_DIR=directory)
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+
+    def _archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive_before(timezone.now())
+
+    def _titles(self, user, **days):
+        return [(row["kind"], row["title"]) for row in archived_feed(user, **days)]
+
+    def test_archived_feed_is_scoped_like_the_live_feed(self):
+        self.assertEqual(self._archive(), (2, 5))
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(BroadcastNotification.objects.exists())
+
+        self.assertEqual(self._titles(self.rep), [
+            ("broadcast", "Broadcast 1"),
+            ("personal", "Personal 2"),
+            ("broadcast", "Broadcast 3"),
+            ("broadcast", "Broadcast 7"),
+        ])
+        # Joined after Broadcast 1
+        self.assertEqual(self._titles(self.late), [("broadcast", "Broadcast 3"), ("broadcast", "Broadcast 7")])
+        self.assertEqual(self._titles(self.other_rep), [
+            ("broadcast", "Broadcast 1"),
+            ("broadcast", "Broadcast 4"),
+            ("personal", "Personal 6"),
+            ("broadcast", "Broadcast 7"),
+        ])
+        self.assertEqual(self._titles(self.rep, start=date(2024, 3, 2), end=date(2024, 3, 3)), [("broadcast", "Broadcast 3")])
+
+    def test_unread_counters_are_reconciled(self):
+        self.assertEqual(counters.unread_count(self.rep), 4)
+        self.assertEqual(counters.unread_count(self.other_rep), 4)
+
+        self._archive()
+
+        self.assertEqual(counters.unread_count(self.rep), 0)
+        self.assertEqual(counters.unread_count(self.other_rep), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast(i=8)
+        self.assertEqual(counters.unread_count(self.rep), 1)
+
+    def test_command_keeps_the_retention_period(self):
+        Notification.objects.filter(title="Personal 6").update(created_at=timezone.now())
+
+        call_command("archive_notifications", days=30, stdout=io.StringIO())
+
+        self.assertEqual(list(Notification.objects.values_list("title", flat=True)), ["Personal 6"])
+        self.assertFalse(BroadcastNotification.objects.exists())
+
+    def test_endpoint(self):
+        self._archive()
+        client = APIClient()
+        client.force_authenticate(self.rep)
+
+        for params, field in (({}, "start"), ({"start": "2024-03-05", "end": "2024-03-01"}, "end")):
+            response = client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(field, response.data)
+
+        response = client.get(self.url, {"start": "2024-03-01", "end": "2024-03-04", "as": "csv"})
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,kind,title,message,is_read,entity_type,entity_id,created_at")
+        self.assertEqual([line.split(",")[2] for line in lines[1:]], ["Broadcast 1", "Personal 2", "Broadcast 3", "Broadcast 7"])
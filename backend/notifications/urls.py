@@ -1,7 +1,12 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .stream import notification_stream
 from .views import NotificationViewSet
 
 router = DefaultRouter()
 router.register(r"notifications", NotificationViewSet, basename="notifications")
 
-urlpatterns = router.urls
+urlpatterns = [
+    # Before the router, whose detail route would take "stream" as a pk
+    path("notifications/stream/", notification_stream, name="notification-stream"),
+] + router.urls
@@ -1,8 +1,18 @@
+import uuid
+
+from django.conf import settings
+from django.http import Http404
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from config.exports import export_format, streaming_export
+from config.retention import requested_days
+from . import feed
+from .archive import archived_feed
 from .models import Notification
 from .serializers import NotificationSerializer
 from .permissions import IsNotificationOwner
@@ -13,6 +23,12 @@ class NotificationViewSet(
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
+    """
+    The caller's personal notifications merged with the broadcasts
+    addressed to their role (see notifications.feed).
+
+    list pages with ?cursor= (the `next` link) and ?page_size=.
+    """
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated,]
 
@@ -24,20 +40,73 @@ class NotificationViewSet(
             return [AllowAny(),]
         return super().get_permissions()
 
+    def get_object(self):
+        try:
+            item_id = uuid.UUID(str(self.kwargs["pk"]))
+        except ValueError:
+            raise Http404
+
+        item = feed.get_item(self.request.user, item_id)
+        if item is None:
+            raise Http404
+        return item
+
+    def list(self, request, *args, **kwargs):
+        page_size = request.query_params.get("page_size", str(settings.REST_FRAMEWORK["PAGE_SIZE"]))
+        if not page_size.isdigit() or not 1 <= int(page_size) <= settings.MAX_PAGE_SIZE:
+            raise ValidationError({"page_size": f"Must be an integer between 1 and {settings.MAX_PAGE_SIZE}"})
+
+        position = None
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            position = feed.decode_cursor(cursor)
+            if position is None:
+                raise ValidationError({"cursor": "Invalid cursor"})
+
+        items, has_more = feed.page(request.user, limit=int(page_size), position=position)
+
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", feed.encode_cursor(items[-1]))
+
+        return Response({
+            "next": next_url,
+            "previous": None,
+            "results": self.get_serializer(items, many=True).data,
+        })
+
     @action(detail=False, methods=["get"], url_path="unread-count")
     def unread_count(self, request):
-        count = self.get_queryset().filter(is_read=False).count()
+        count = feed.unread_count(request.user)
         return Response({"unread_count": count}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"])
     def mark_read(self, request, pk=None):
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        feed.mark_read(request.user, self.get_object())
 
         return Response({"status": "Notification marked as read"}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"], url_path="mark-all-read")
     def mark_all_read(self, request):
-        self.get_queryset().filter(is_read=False).update(is_read=True)
+        feed.mark_all_read(request.user)
         return Response({"status": "All notifications marked as read"}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"])
+    def archive(self, request):
+        """
+        The caller's archived notifications (see archive_notifications)
+        created between ?start= and ?end= (dates, inclusive), streamed as
+        ?as=ndjson|csv. is_read is null for broadcasts.
+        """
+        start, end = requested_days(request)
+        output_format = export_format(request)
+
+        fields = ["id", "kind", "title", "message", "is_read", "entity_type", "entity_id", "created_at"]
+        rows = archived_feed(request.user, start=start, end=end)
+
+        return streaming_export(
+            (tuple(row[field] for field in fields) for row in rows),
+            fields=fields,
+            export_format=output_format,
+            filename="notifications-archive",
+        )
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['idempotency_key', 'last_error']
+    ordering = ['-created_at']
@@ -0,0 +1,117 @@
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .handlers import HANDLERS
+from .models import OutboxMessage, OutboxStatus
+
+
+def _backoff(attempts):
+    """Exponential backoff with jitter, capped at OUTBOX_BACKOFF_MAX seconds"""
+    delay = min(settings.OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1), settings.OUTBOX_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to `batch_size` due messages for this dispatcher.
+    Messages stuck in PROCESSING past the lease are claimed again.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=OutboxStatus.PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboxStatus.PROCESSING, locked_at__lt=now - timedelta(seconds=settings.OUTBOX_LEASE_SECONDS))
+    )
+
+    candidate_ids = list(
+        OutboxMessage.objects.filter(due)
+        .order_by("next_attempt_at")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    # Re-check `due` in the UPDATE so concurrent dispatchers never share a message
+    token = uuid.uuid4()
+    OutboxMessage.objects.filter(due, id__in=candidate_ids).update(
+        status=OutboxStatus.PROCESSING,
+        locked_at=now,
+        claim_token=token,
+    )
+    return list(OutboxMessage.objects.filter(claim_token=token, status=OutboxStatus.PROCESSING))
+
+
+def _record(message, **fields):
+    """
+    Write the outcome of `message`, if this dispatcher still holds its claim.
+    A handler that outlived OUTBOX_LEASE_SECONDS may have had the message
+    claimed again; the newer claim owns the row then.
+    """
+    recorded = OutboxMessage.objects.filter(
+        pk=message.pk,
+        claim_token=message.claim_token,
+        status=OutboxStatus.PROCESSING,
+    ).update(attempts=message.attempts, locked_at=None, **fields)
+    if not recorded:
+        print(f"Outbox message {message.pk}: lease lost to another dispatcher, outcome not recorded")
+    return bool(recorded)
+
+
+def deliver(message):
+    """
+    Run the handler for one claimed message and record the outcome.
+    Returns True when the message was delivered and recorded as done.
+    """
+    handler = HANDLERS.get(message.kind)
+    message.attempts += 1
+
+    try:
+        if handler is None:
+            raise Exception(f"No outbox handler for kind {message.kind}")
+        handler(message)
+    except Exception as e:
+        if handler is None or message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            _record(message, status=OutboxStatus.DEAD, last_error=str(e))
+        else:
+            _record(
+                message,
+                status=OutboxStatus.PENDING,
+                last_error=str(e),
+                next_attempt_at=timezone.now() + _backoff(message.attempts),
+            )
+        return False
+
+    return _record(message, status=OutboxStatus.DONE, last_error="", processed_at=timezone.now())
+
+
+def _deliver_all(messages):
+    try:
+        for message in messages:
+            deliver(message)
+    finally:
+        # Each worker thread opened its own database connection
+        connections.close_all()
+
+
+def dispatch_batch(batch_size=None, workers=None):
+    """
+    Claim and deliver one batch of due messages, spread over up to
+    `workers` threads (OUTBOX_WORKERS) so slow endpoints overlap.
+    Returns the number of messages processed.
+    """
+    messages = claim_batch(batch_size or settings.OUTBOX_BATCH_SIZE)
+    workers = min(workers or settings.OUTBOX_WORKERS, len(messages))
+
+    if workers <= 1:
+        for message in messages:
+            deliver(message)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_deliver_all, [messages[i::workers] for i in range(workers)]))
+    return len(messages)
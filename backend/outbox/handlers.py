@@ -0,0 +1,81 @@
+from datetime import date
+
+from integrations.flowable_client import (
+    TaskNotFound,
+    generate_request_task,
+    start_contract_negotiation,
+    complete_task,
+    find_process_instance,
+    push_submitted_offers,
+)
+from integrations.third_party_service import third_party_service
+from service_requests.models import ServiceRequest
+from .models import OutboxKind
+
+
+def third_party_post(message):
+    third_party_service.call_api(
+        url=message.payload["url"],
+        payload=message.payload["body"],
+        idempotency_key=message.idempotency_key,
+    )
+
+
+# Deliveries are at-least-once: a call that reached Flowable but whose
+# response was lost (timeout) is sent again, so each handler first checks
+# whether its effect is already there.
+
+def flowable_start_request(message):
+    request_id = message.payload["request_id"]
+    if find_process_instance(business_key=request_id, process_definition_key="serviceRequestProcess"):
+        return
+
+    offer_deadline = message.payload.get("offer_deadline")
+    generate_request_task(
+        request_id=request_id,
+        offer_deadline=date.fromisoformat(offer_deadline) if offer_deadline else None,
+    )
+
+
+def flowable_start_negotiation(message):
+    # Messages queued before business keys were added have none
+    business_key = message.payload.get("business_key")
+    if business_key and find_process_instance(
+        business_key=business_key, process_definition_key="contractNegotiationProcess"
+    ):
+        return
+
+    start_contract_negotiation(contract_data=message.payload, business_key=business_key)
+
+
+def flowable_complete_task(message):
+    try:
+        complete_task(
+            task_id=message.payload["task_id"],
+            action=message.payload["action"],
+            variables=message.payload.get("variables"),
+        )
+    except TaskNotFound:
+        # Completed by an earlier attempt
+        pass
+
+
+def flowable_push_offers(message):
+    # Re-read the ledger so a delayed retry still pushes the current state
+    service_request = ServiceRequest.objects.get(id=message.payload["request_id"])
+
+    pushed = push_submitted_offers(
+        task_id=message.payload["task_id"],
+        submitted_offers=service_request.submitted_offers(),
+    )
+    if not pushed:
+        raise Exception("Flowable rejected the submitted_offers update")
+
+
+HANDLERS = {
+    OutboxKind.THIRD_PARTY_POST: third_party_post,
+    OutboxKind.FLOWABLE_START_REQUEST: flowable_start_request,
+    OutboxKind.FLOWABLE_START_NEGOTIATION: flowable_start_negotiation,
+    OutboxKind.FLOWABLE_COMPLETE_TASK: flowable_complete_task,
+    OutboxKind.FLOWABLE_PUSH_OFFERS: flowable_push_offers,
+}
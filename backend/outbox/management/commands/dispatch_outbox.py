@@ -0,0 +1,38 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from outbox.dispatcher import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox messages to Flowable and the third party API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the outbox once and exit")
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=settings.OUTBOX_WORKERS)
+        parser.add_argument("--interval", type=float, default=settings.OUTBOX_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping outbox dispatcher after the current batch...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping.is_set():
+            close_old_connections()
+            processed = dispatch_batch(options["batch_size"], options["workers"])
+
+            # Idle: exit in --once mode, otherwise poll again later
+            if not processed:
+                if options["once"]:
+                    break
+                stopping.wait(options["interval"])
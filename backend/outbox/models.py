@@ -0,0 +1,49 @@
+import uuid
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING    = "PENDING", "Pending"
+    PROCESSING = "PROCESSING", "Processing"
+    DONE       = "DONE", "Done"
+    DEAD       = "DEAD", "Dead-lettered"
+
+
+class OutboxKind(models.TextChoices):
+    THIRD_PARTY_POST           = "THIRD_PARTY_POST", "Third party POST"
+    FLOWABLE_START_REQUEST     = "FLOWABLE_START_REQUEST", "Flowable start service request process"
+    FLOWABLE_START_NEGOTIATION = "FLOWABLE_START_NEGOTIATION", "Flowable start contract negotiation"
+    FLOWABLE_COMPLETE_TASK     = "FLOWABLE_COMPLETE_TASK", "Flowable complete task"
+    FLOWABLE_PUSH_OFFERS       = "FLOWABLE_PUSH_OFFERS", "Flowable push submitted offers"
+
+
+class OutboxMessage(models.Model):
+    """
+    External side effect recorded in the same transaction as the domain
+    change, delivered later by the `dispatch_outbox` command.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    kind            = models.CharField(max_length=32, choices=OutboxKind.choices)
+    payload         = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=255, unique=True)
+
+    status          = models.CharField(max_length=16, choices=OutboxStatus.choices, default=OutboxStatus.PENDING)
+    attempts        = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at       = models.DateTimeField(null=True, blank=True)
+    claim_token     = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
+    last_error      = models.TextField(blank=True)
+
+    created_at      = models.DateTimeField(auto_now_add=True)
+    processed_at    = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status}) - {self.idempotency_key}"
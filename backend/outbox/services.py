@@ -0,0 +1,63 @@
+from django.utils import timezone
+
+from .models import OutboxMessage, OutboxStatus
+
+# Messages that are no longer waiting for delivery
+FINISHED = (OutboxStatus.DONE, OutboxStatus.DEAD)
+
+
+def _redeliver(idempotency_key, kind, payload):
+    # Conditional, so a message a dispatcher is working on is left alone
+    OutboxMessage.objects.filter(idempotency_key=idempotency_key, status__in=FINISHED).update(
+        kind=kind,
+        payload=payload,
+        status=OutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        last_error="",
+        processed_at=None,
+    )
+
+
+def enqueue(*, kind, payload, idempotency_key):
+    """
+    Record an external side effect. Call this inside the same
+    transaction.atomic() block as the domain change it belongs to.
+
+    `idempotency_key` names the business event, e.g.
+    "complete-task:<task id>", so a retried request enqueues nothing new
+    while its message is still waiting. A key whose message was already
+    delivered (or dead-lettered) is sent again with the new payload;
+    handlers check whether their effect already happened.
+    """
+    message, created = OutboxMessage.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={
+            "kind": kind,
+            "payload": payload,
+        },
+    )
+    if not created and message.status in FINISHED:
+        _redeliver(idempotency_key, kind, payload)
+    return message
+
+
+def enqueue_many(*, kind, messages):
+    """
+    Record one message of `kind` per (idempotency_key, payload) pair,
+    new keys with a single INSERT. Same rules as enqueue().
+    """
+    messages = dict(messages)
+    existing = dict(
+        OutboxMessage.objects.filter(idempotency_key__in=messages).values_list("idempotency_key", "status")
+    )
+
+    for idempotency_key, message_status in existing.items():
+        if message_status in FINISHED:
+            _redeliver(idempotency_key, kind, messages[idempotency_key])
+
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(kind=kind, payload=payload, idempotency_key=idempotency_key)
+        for idempotency_key, payload in messages.items()
+        if idempotency_key not in existing
+    ])
@@ -0,0 +1,316 @@
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from integrations.flowable_client import flowable_client
+from providers.models import Provider
+from service_requests.models import ServiceOffer, ServiceRequest
+from .dispatcher import claim_batch, deliver, dispatch_batch
+from .models import OutboxKind, OutboxMessage, OutboxStatus
+from .services import enqueue, enqueue_many
+
+
+def flowable_response(status, body=None):
+    response = requests.Response()
+    response.status_code = status
+    response.url = "http://flowable.test/"
+    response._content = json.dumps(body if body is not None else {}).encode()
+    return response
+
+
+class FakeFlowable:
+    """Stands in for flowable_client.request; `routes` maps (method, path) to a response"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def __call__(self, method, path, **kwargs):
+        self.calls.append((method, path, kwargs))
+        response = self.routes.get((method, path))
+        if isinstance(response, Exception):
+            raise response
+        # Response is falsy for error statuses
+        return response if response is not None else flowable_response(404)
+
+    def posts(self):
+        return [call for call in self.calls if call[0] == "POST"]
+
+
+class EnqueueTests(TestCase):
+    def test_key_still_waiting_is_not_enqueued_again(self):
+        first = enqueue(kind=OutboxKind.FLOWABLE_COMPLETE_TASK, payload={"n": 1}, idempotency_key="complete-task:t1")
+        second = enqueue(kind=OutboxKind.FLOWABLE_COMPLETE_TASK, payload={"n": 2}, idempotency_key="complete-task:t1")
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(OutboxMessage.objects.get().payload, {"n": 1})
+
+    def test_finished_key_is_sent_again(self):
+        message = enqueue(kind=OutboxKind.FLOWABLE_START_REQUEST, payload={"n": 1}, idempotency_key="start-request:r1")
+        OutboxMessage.objects.filter(pk=message.pk).update(status=OutboxStatus.DEAD, attempts=8, last_error="boom")
+
+        enqueue(kind=OutboxKind.FLOWABLE_START_REQUEST, payload={"n": 2}, idempotency_key="start-request:r1")
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), (OutboxStatus.PENDING, 0, ""))
+        self.assertEqual(message.payload, {"n": 2})
+
+    def test_enqueue_many(self):
+        enqueue(kind=OutboxKind.FLOWABLE_START_REQUEST, payload={"n": 1}, idempotency_key="start-request:waiting")
+        done = enqueue(kind=OutboxKind.FLOWABLE_START_REQUEST, payload={"n": 1}, idempotency_key="start-request:done")
+        OutboxMessage.objects.filter(pk=done.pk).update(status=OutboxStatus.DONE)
+
+        created = enqueue_many(
+            kind=OutboxKind.FLOWABLE_START_REQUEST,
+            messages=[
+                ("start-request:waiting", {"n": 2}),
+                ("start-request:done", {"n": 2}),
+                ("start-request:new", {"n": 2}),
+            ],
+        )
+
+        self.assertEqual([message.idempotency_key for message in created], ["start-request:new"])
+        self.assertEqual(
+            dict(OutboxMessage.objects.values_list("idempotency_key", "status")),
+            {
+                "start-request:waiting": OutboxStatus.PENDING,
+                "start-request:done": OutboxStatus.PENDING,
+                "start-request:new": OutboxStatus.PENDING,
+            },
+        )
+
+    def test_retried_generate_queues_one_process_start(self):
+        client = APIClient()
+        payload = {
+            "external_id": "SR-1", "title": "Developer", "role_name": "Developer", "technology": "Python",
+            "specialization": "Backend", "experience_level": "SENIOR", "task_description": "",
+            "word_mode": "Remote", "criteria_json": {}, "status": "OPEN",
+        }
+
+        for _ in range(2):
+            response = client.post("/api/requests/service-requests/generate/", payload, format="json")
+            self.assertEqual(response.status_code, 201, response.data)
+
+        message = OutboxMessage.objects.get(kind=OutboxKind.FLOWABLE_START_REQUEST)
+        self.assertEqual(message.idempotency_key, f"start-request:{response.data['request_id']}")
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_BACKOFF_BASE=1)
+class DispatchTests(TestCase):
+    def _dispatch(self, routes):
+        fake = FakeFlowable(routes)
+        with mock.patch.object(flowable_client, "request", side_effect=fake):
+            dispatch_batch(workers=1)
+        return fake
+
+    def _process_lookup(self, instances):
+        return (
+            ("GET", "runtime/process-instances"),
+            flowable_response(200, {"data": instances, "total": len(instances)}),
+        )
+
+    def test_start_request_creates_the_process(self):
+        message = enqueue(
+            kind=OutboxKind.FLOWABLE_START_REQUEST,
+            payload={"request_id": "r1", "offer_deadline": None},
+            idempotency_key="start-request:r1",
+        )
+
+        fake = self._dispatch(dict([
+            self._process_lookup([]),
+            (("POST", "runtime/process-instances"), flowable_response(201, {"id": "p1"})),
+        ]))
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.DONE, 1))
+        self.assertEqual(
+            fake.calls[0][2]["params"], {"businessKey": "r1", "processDefinitionKey": "serviceRequestProcess"}
+        )
+        self.assertEqual(fake.posts()[0][2]["json"]["businessKey"], "r1")
+
+    def test_start_request_already_created_is_not_started_twice(self):
+        # The first attempt reached Flowable, but its response timed out
+        message = enqueue(
+            kind=OutboxKind.FLOWABLE_START_REQUEST,
+            payload={"request_id": "r1", "offer_deadline": None},
+            idempotency_key="start-request:r1",
+        )
+        fake = self._dispatch({
+            ("GET", "runtime/process-instances"): flowable_response(200, {"data": [], "total": 0}),
+            ("POST", "runtime/process-instances"): requests.exceptions.ReadTimeout("read timed out"),
+        })
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.PENDING)
+        self.assertEqual(len(fake.posts()), 1)
+
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        fake = self._dispatch(dict([self._process_lookup([{"id": "p1"}])]))
+
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.DONE, 2))
+        self.assertEqual(fake.posts(), [])
+
+    def test_start_negotiation_uses_business_key(self):
+        enqueue(
+            kind=OutboxKind.FLOWABLE_START_NEGOTIATION,
+            payload={"contract_id": "c1", "business_key": "c1:2"},
+            idempotency_key="start-negotiation:c1:2",
+        )
+        fake = self._dispatch(dict([
+            self._process_lookup([]),
+            (("POST", "runtime/process-instances"), flowable_response(201, {"id": "p1"})),
+        ]))
+
+        self.assertEqual(
+            fake.calls[0][2]["params"], {"businessKey": "c1:2", "processDefinitionKey": "contractNegotiationProcess"}
+        )
+        self.assertEqual(fake.posts()[0][2]["json"]["businessKey"], "c1:2")
+        self.assertEqual(OutboxMessage.objects.get().status, OutboxStatus.DONE)
+
+    def test_completing_a_task_that_is_gone_succeeds(self):
+        enqueue(
+            kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+            payload={"task_id": "t1", "action": "accept"},
+            idempotency_key="complete-task:t1",
+        )
+        self._dispatch({("POST", "runtime/tasks/t1"): flowable_response(404)})
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts, message.last_error), (OutboxStatus.DONE, 1, ""))
+
+    def test_failures_back_off_then_dead_letter(self):
+        message = enqueue(
+            kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+            payload={"task_id": "t1", "action": "accept"},
+            idempotency_key="complete-task:t1",
+        )
+        routes = {("POST", "runtime/tasks/t1"): flowable_response(500)}
+
+        for attempt in (1, 2):
+            self._dispatch(routes)
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), (OutboxStatus.PENDING, attempt))
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            self.assertIn("500", message.last_error)
+
+            # Not due yet
+            self.assertEqual(claim_batch(10), [])
+            OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+
+        self._dispatch(routes)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.DEAD, 3))
+
+    def test_push_offers_sends_every_offer_in_the_ledger(self):
+        service_request = ServiceRequest.objects.create(title="Developer", role_name="Developer")
+        offers = []
+        for i in range(3):
+            provider = Provider.objects.create(name=f"Provider {i}", email=f"p{i}@example.com", phone=str(i))
+            offers.append(ServiceOffer(request=service_request, provider=provider, daily_rate=500, total_cost=5000))
+        path = "runtime/tasks/t1/variables/submitted_offers"
+        pushed = lambda fake: json.loads(fake.calls[-1][2]["json"]["value"])
+
+        offers[0].save()
+        offers[1].save()
+        message = enqueue(
+            kind=OutboxKind.FLOWABLE_PUSH_OFFERS,
+            payload={"task_id": "t1", "request_id": str(service_request.id)},
+            idempotency_key=f"push-offers:{offers[1].id}",
+        )
+        # The first attempt fails, and another offer comes in before the retry
+        fake = self._dispatch({("PUT", path): flowable_response(500)})
+        self.assertEqual([offer["offer_id"] for offer in pushed(fake)], [str(offers[0].id), str(offers[1].id)])
+
+        offers[2].save()
+        OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+        fake = self._dispatch({("PUT", path): flowable_response(200)})
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.DONE)
+        self.assertEqual(
+            [(offer["offer_id"], offer["provider_id"]) for offer in pushed(fake)],
+            [(str(offer.id), str(offer.provider_id)) for offer in offers],
+        )
+
+    @override_settings(OUTBOX_LEASE_SECONDS=60)
+    def test_claims_do_not_overlap_until_the_lease_expires(self):
+        for i in range(5):
+            enqueue(kind=OutboxKind.FLOWABLE_COMPLETE_TASK, payload={}, idempotency_key=f"complete-task:t{i}")
+
+        first = claim_batch(3)
+        second = claim_batch(3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(claim_batch(3), [])
+
+        OutboxMessage.objects.filter(pk=first[0].pk).update(locked_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual([message.pk for message in claim_batch(3)], [first[0].pk])
+
+
+    @override_settings(OUTBOX_LEASE_SECONDS=60)
+    def test_handler_that_outlives_its_lease_does_not_overwrite_the_new_claim(self):
+        message = enqueue(
+            kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+            payload={"task_id": "t1", "action": "accept"},
+            idempotency_key="complete-task:t1",
+        )
+        [stale] = claim_batch(1)
+        # The first handler overruns its lease, so a second dispatcher claims the message
+        OutboxMessage.objects.filter(pk=message.pk).update(locked_at=timezone.now() - timedelta(seconds=61))
+        [current] = claim_batch(1)
+
+        def deliver_with(claim, status):
+            with mock.patch.object(flowable_client, "request", side_effect=FakeFlowable({
+                ("POST", "runtime/tasks/t1"): flowable_response(status),
+            })):
+                return deliver(claim)
+
+        # The overrun handler finishes first: its outcome is dropped
+        self.assertFalse(deliver_with(stale, 500))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.claim_token), (OutboxStatus.PROCESSING, 0, current.claim_token))
+
+        self.assertTrue(deliver_with(current, 200))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), (OutboxStatus.DONE, 1, ""))
+
+        # Or last: the done message stays done
+        self.assertFalse(deliver_with(stale, 500))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboxStatus.DONE, 1))
+
+
+class ConcurrentDispatchTests(TransactionTestCase):
+    def test_parallel_dispatchers_deliver_each_message_once(self):
+        for i in range(40):
+            enqueue(
+                kind=OutboxKind.FLOWABLE_COMPLETE_TASK,
+                payload={"task_id": f"t{i}", "action": "accept"},
+                idempotency_key=f"complete-task:t{i}",
+            )
+
+        fake = FakeFlowable({("POST", f"runtime/tasks/t{i}"): flowable_response(200) for i in range(40)})
+
+        def dispatcher():
+            try:
+                while dispatch_batch(batch_size=5, workers=2):
+                    pass
+            finally:
+                connection.close()
+
+        with mock.patch.object(flowable_client, "request", side_effect=fake):
+            threads = [threading.Thread(target=dispatcher) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(call[1] for call in fake.posts()), sorted(f"runtime/tasks/t{i}" for i in range(40)))
+        self.assertEqual(OutboxMessage.objects.filter(status=OutboxStatus.DONE).count(), 40)
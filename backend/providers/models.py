@@ -3,6 +3,8 @@ import random
 import string
 from django.db import IntegrityError, models
 
+from accounts import user_cache
+
 
 class Provider(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -47,6 +49,14 @@ class Provider(models.Model):
                 else:
                     raise
 
+        # Users are cached with their provider attached
+        user_cache.invalidate_provider(self)
+
+    def delete(self, *args, **kwargs):
+        # Before the users are cascade-deleted
+        user_cache.invalidate_provider(self)
+        return super().delete(*args, **kwargs)
+
     @staticmethod
     def _generate_provider_code():
         """
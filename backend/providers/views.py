@@ -18,7 +18,7 @@ class ProviderViewSet(viewsets.ModelViewSet):
     CRUD API for managing Providers.
     Only Provider Admins can create or update.
     """
-    queryset = Provider.objects.all()
+    queryset = Provider.objects.order_by("-created_at")
     serializer_class = ProviderSerializer
 
     def get_permissions(self):
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_orders', '0004_remove_serviceorder_consumed_man_days'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='serviceorderextension',
+            index=models.Index(fields=['service_order', '-created_at'], name='service_ord_service_de8fca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceordersubstitution',
+            index=models.Index(fields=['service_order', '-created_at'], name='service_ord_service_cb5ea2_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_orders', '0005_serviceorderextension_service_ord_service_de8fca_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['status', 'current_end_date'], name='service_ord_status_df23c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['status', '-created_at'], name='service_ord_status_8c57b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['supplier_name', '-created_at'], name='service_ord_supplie_926ffe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['current_specialist_name'], name='service_ord_current_25e363_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorder',
+            index=models.Index(fields=['role', 'domain'], name='service_ord_role_a744d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceorderextension',
+            index=models.Index(fields=['status', '-created_at'], name='service_ord_status_86fa96_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serviceordersubstitution',
+            index=models.Index(fields=['status', '-created_at'], name='service_ord_status_dc3fba_idx'),
+        ),
+    ]
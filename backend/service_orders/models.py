@@ -1,8 +1,92 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, When, Value, F, Q, OuterRef, Subquery, FloatField, IntegerField
+from django.db.models.functions import Cast
 from django.core.validators import MinValueValidator
 from datetime import date
 import uuid
 
+from specialists import availability
+
+
+class DaysBetween(models.Func):
+    """Whole days from `start` to `end` (end - start) for two date expressions"""
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+class ServiceOrderQuerySet(models.QuerySet):
+    def with_burn_down(self, today=None):
+        """
+        Annotate consumed_man_days, remaining_man_days and consumed_ratio in SQL,
+        all computed against one reference date (defaults to today).
+        Mirrors the ServiceOrder.consumed_man_days property.
+        """
+        today = today or date.today()
+
+        consumed = Case(
+            When(
+                Q(start_date__isnull=True) | Q(current_end_date__isnull=True) | Q(current_man_days=0),
+                then=Value(0),
+            ),
+            # Not started yet: nothing consumed
+            When(start_date__gt=today, then=Value(0)),
+            # Past the end date: everything consumed
+            When(current_end_date__lte=today, then=F("current_man_days")),
+            # In progress: elapsed share of the period, floored
+            default=(
+                DaysBetween(Value(today), F("start_date")) * F("current_man_days")
+                / DaysBetween(F("current_end_date"), F("start_date"))
+            ),
+            output_field=IntegerField(),
+        )
+
+        return self.annotate(
+            consumed_man_days=consumed,
+            remaining_man_days=F("current_man_days") - F("consumed_man_days"),
+            consumed_ratio=Case(
+                When(
+                    current_man_days__gt=0,
+                    then=Cast("consumed_man_days", FloatField()) / F("current_man_days"),
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+
+    def with_pending_change_ids(self):
+        """
+        Annotate pending_extension_id / pending_substitution_id: the id of the
+        latest extension / substitution when it is still PENDING_SUPPLIER.
+        Resolved with correlated subqueries, so a page costs one query.
+        """
+        def latest_pending(model):
+            latest = (
+                model.objects.filter(service_order=OuterRef(OuterRef("pk")))
+                .order_by("-created_at")
+                .values("pk")[:1]
+            )
+            return Subquery(
+                model.objects.filter(pk=Subquery(latest), status="PENDING_SUPPLIER").values("pk")
+            )
+
+        return self.annotate(
+            pending_extension_id=latest_pending(ServiceOrderExtension),
+            pending_substitution_id=latest_pending(ServiceOrderSubstitution),
+        )
+
 
 class ServiceOrder(models.Model):
     STATUS_CHOICES = [
@@ -49,18 +133,59 @@ class ServiceOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ServiceOrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # Back the filterset_fields / ordering_fields of ServiceOrderViewSet
+        indexes = [
+            models.Index(fields=['status', 'current_end_date']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['supplier_name', '-created_at']),
+            models.Index(fields=['current_specialist_name']),
+            models.Index(fields=['role', 'domain']),
+        ]
 
     def __str__(self):
         return f"{self.title}"
+
+    # Values ServiceOrderQuerySet.with_burn_down() / with_pending_change_ids()
+    # attach to a loaded row; they describe the row as it was read
+    QUERY_ANNOTATIONS = (
+        "_consumed_man_days",
+        "_remaining_man_days",
+        "_consumed_ratio",
+        "pending_extension_id",
+        "pending_substitution_id",
+    )
+
+    def forget_annotations(self):
+        for name in self.QUERY_ANNOTATIONS:
+            self.__dict__.pop(name, None)
+
+    def save(self, *args, **kwargs):
+        # Keep the specialist's availability calendar in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            availability.sync_order(self)
+        # The properties and serializer lookups recompute from the saved row
+        self.forget_annotations()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.forget_annotations()
     
     @property
     def is_active(self):
         return self.status == 'ACTIVE'
     
+    # consumed_man_days / remaining_man_days are set directly when the row was
+    # loaded through ServiceOrderQuerySet.with_burn_down()
     @property
     def consumed_man_days(self) -> int:
+        if "_consumed_man_days" in self.__dict__:
+            return self.__dict__["_consumed_man_days"]
+
         if not self.start_date or not self.current_end_date or not self.current_man_days:
             return 0
 
@@ -82,16 +207,40 @@ class ServiceOrder(models.Model):
 
         elapsed_days = (today - self.start_date).days
         
-        # Calculate consumed man days proportionally
-        consumed = int((elapsed_days / total_days) * self.current_man_days)
+        # Calculate consumed man days proportionally (integer maths, same as SQL)
+        consumed = elapsed_days * self.current_man_days // total_days
         
         return consumed
 
+    @consumed_man_days.setter
+    def consumed_man_days(self, value):
+        self.__dict__["_consumed_man_days"] = value
+
     @property
     def remaining_man_days(self) -> int:
+        if "_remaining_man_days" in self.__dict__:
+            return self.__dict__["_remaining_man_days"]
+
         if not self.current_man_days:
             return 0
         return max(0, self.current_man_days - self.consumed_man_days)
+
+    @remaining_man_days.setter
+    def remaining_man_days(self, value):
+        self.__dict__["_remaining_man_days"] = value
+
+    @property
+    def consumed_ratio(self) -> float:
+        if "_consumed_ratio" in self.__dict__:
+            return self.__dict__["_consumed_ratio"]
+
+        if not self.current_man_days:
+            return 0.0
+        return self.consumed_man_days / self.current_man_days
+
+    @consumed_ratio.setter
+    def consumed_ratio(self, value):
+        self.__dict__["_consumed_ratio"] = value
     
     @property
     def has_been_extended(self):
@@ -132,6 +281,10 @@ class ServiceOrderExtension(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['service_order', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def approve(self):
         self.status = 'APPROVED'
@@ -202,6 +355,10 @@ class ServiceOrderSubstitution(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['service_order', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+        ]
     
     def approve(self):
         self.status = 'APPROVED'
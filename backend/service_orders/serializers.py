@@ -8,6 +8,7 @@ from .models import *
 class ServiceOrderDetailSerializer(serializers.ModelSerializer):
     consumed_man_days = serializers.ReadOnlyField()
     remaining_man_days = serializers.ReadOnlyField()
+    consumed_ratio = serializers.ReadOnlyField()
     has_been_extended = serializers.ReadOnlyField()
     has_been_substituted = serializers.ReadOnlyField()
     is_active = serializers.ReadOnlyField()
@@ -26,7 +27,12 @@ class ServiceOrderDetailSerializer(serializers.ModelSerializer):
     def get_can_request_substitution(self, obj):
         return obj.can_request_substitution()
     
+    # Rows from ServiceOrderQuerySet.with_pending_change_ids() carry the ids
+    # already; the per-object lookups are the fallback for anything else
     def get_pending_extension_id(self, obj):
+        if hasattr(obj, 'pending_extension_id'):
+            return obj.pending_extension_id
+
         latest_extension = obj.extensions.order_by('-created_at').first()
         
         if latest_extension and latest_extension.status == 'PENDING_SUPPLIER':
@@ -35,6 +41,9 @@ class ServiceOrderDetailSerializer(serializers.ModelSerializer):
         return None
 
     def get_pending_substitution_id(self, obj):
+        if hasattr(obj, 'pending_substitution_id'):
+            return obj.pending_substitution_id
+
         latest_subs = obj.substitutions.order_by('-created_at').first()
         
         if latest_subs and latest_subs.status == 'PENDING_SUPPLIER':
@@ -1,3 +1,284 @@
-from django.test import TestCase
+import os
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from config.filters import DeclaredOrderingFilter, GuardedSearchFilter
+from .models import ServiceOrder, ServiceOrderExtension
+from .serializers import ServiceOrderDetailSerializer
+
+# Orders seeded for the benchmark; SERVICE_ORDER_BENCHMARK_ROWS=1000000 for a bigger run
+BENCHMARK_ROWS = int(os.getenv("SERVICE_ORDER_BENCHMARK_ROWS", "100000"))
+
+
+def make_order(i=0, *, start=None, end=None, man_days=20, **fields):
+    """An unsaved order; bulk_create it to skip the availability sync"""
+    return ServiceOrder(
+        service_request_id=f"SR-{i}",
+        winning_offer_id=f"OF-{i}",
+        title=f"Order {i}",
+        start_date=start,
+        original_end_date=end,
+        current_end_date=end,
+        supplier_name="Acme",
+        current_specialist_id=f"S-{i}",
+        current_specialist_name="Specialist",
+        original_specialist_id=f"S-{i}",
+        original_specialist_name="Specialist",
+        role="Developer",
+        domain="Backend",
+        original_man_days=man_days,
+        current_man_days=man_days,
+        daily_rate=Decimal("500.00"),
+        original_contract_value=Decimal("500.00") * man_days,
+        current_contract_value=Decimal("500.00") * man_days,
+        **fields,
+    )
+
+
+class BurnDownTests(TestCase):
+    url = "/api/orders/service-orders/"
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.orders = ServiceOrder.objects.bulk_create([
+            # Not started yet
+            make_order(0, start=today + timedelta(days=5), end=today + timedelta(days=30)),
+            # Ended
+            make_order(1, start=today - timedelta(days=30), end=today - timedelta(days=1)),
+            # Ends today
+            make_order(2, start=today - timedelta(days=10), end=today),
+            # In progress, uneven split: 7 * 20 // 30 = 4
+            make_order(3, start=today - timedelta(days=7), end=today + timedelta(days=23)),
+            # In progress, nearly exhausted: 28 * 20 // 30 = 18
+            make_order(4, start=today - timedelta(days=28), end=today + timedelta(days=2)),
+            # Starts today
+            make_order(5, start=today, end=today + timedelta(days=10), man_days=7),
+            # Dates not set
+            make_order(6),
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_annotation_matches_property(self):
+        annotated = {order.pk: order for order in ServiceOrder.objects.with_burn_down()}
+
+        for order in ServiceOrder.objects.all():
+            row = annotated[order.pk]
+            self.assertEqual(
+                (row.consumed_man_days, row.remaining_man_days),
+                (order.consumed_man_days, order.remaining_man_days),
+                order.title,
+            )
+            self.assertAlmostEqual(row.consumed_ratio, order.consumed_ratio)
+
+    def test_reference_date(self):
+        order = self.orders[3]
+        later = ServiceOrder.objects.with_burn_down(today=order.current_end_date).get(pk=order.pk)
+        self.assertEqual((later.consumed_man_days, later.remaining_man_days, later.consumed_ratio), (20, 0, 1.0))
+
+        earlier = ServiceOrder.objects.with_burn_down(today=order.start_date).get(pk=order.pk)
+        self.assertEqual((earlier.consumed_man_days, earlier.remaining_man_days), (0, 20))
+
+    def test_list_filters_and_orders_on_burn_down(self):
+        response = self.client.get(
+            self.url, {"remaining_man_days__lte": 2, "consumed_ratio__gte": 0.5, "ordering": "-consumed_ratio,start_date"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["title"] for row in response.data["results"]], ["Order 1", "Order 2", "Order 4"])
+        self.assertEqual(response.data["results"][2]["remaining_man_days"], 2)
+
+    def test_malformed_filter_is_rejected(self):
+        response = self.client.get(self.url, {"consumed_ratio__lte": "half"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("consumed_ratio__lte", response.data)
+
+
+def make_extension(order, status="PENDING_SUPPLIER"):
+    return ServiceOrderExtension.objects.create(
+        service_order=order,
+        status=status,
+        additional_man_days=5,
+        new_end_date=order.current_end_date + timedelta(days=5),
+        additional_cost=Decimal("2500.00"),
+        reason="More work",
+    )
+
+
+class PendingChangeTests(TestCase):
+    url = "/api/orders/service-orders/"
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        orders = ServiceOrder.objects.bulk_create(
+            make_order(i, start=today - timedelta(days=10), end=today + timedelta(days=20)) for i in range(60)
+        )
+        for i, order in enumerate(orders):
+            make_extension(order, status="REJECTED")
+            if i % 2:
+                make_extension(order)
+        cls.order = orders[0]
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        client = APIClient()
+        for page_size in (5, 50):
+            # count + page
+            with self.assertNumQueries(2):
+                response = client.get(self.url, {"page_size": page_size})
+            self.assertEqual(len(response.data["results"]), page_size)
+
+    def test_annotated_ids_match_the_per_order_lookup(self):
+        for order in ServiceOrder.objects.with_pending_change_ids():
+            expected = ServiceOrderDetailSerializer(ServiceOrder.objects.get(pk=order.pk)).data
+            data = ServiceOrderDetailSerializer(order).data
+            self.assertEqual(
+                (data["pending_extension_id"], data["pending_substitution_id"]),
+                (expected["pending_extension_id"], expected["pending_substitution_id"]),
+            )
+
+    def test_refresh_drops_annotations_read_before(self):
+        order = ServiceOrder.objects.with_pending_change_ids().get(pk=self.order.pk)
+        self.assertIsNone(order.pending_extension_id)
+        extension = make_extension(order)
+
+        order.refresh_from_db()
+        self.assertEqual(ServiceOrderDetailSerializer(order).data["pending_extension_id"], extension.id)
+
+    def test_save_drops_burn_down_read_before(self):
+        order = ServiceOrder.objects.with_burn_down().get(pk=self.order.pk)
+        self.assertEqual(order.remaining_man_days, 14)
+
+        order.current_end_date = date.today()
+        order.save()
+        self.assertEqual((order.consumed_man_days, order.remaining_man_days, order.consumed_ratio), (20, 0, 1.0))
+
+
+class ListFilterTests(TestCase):
+    """The global search and ordering backends (config.filters), on the order list"""
+
+    url = "/api/orders/service-orders/"
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        orders = []
+        for i in range(12):
+            order = make_order(i, start=today - timedelta(days=i), end=today + timedelta(days=i))
+            order.supplier_name = "Globex" if i % 3 == 0 else "Acme"
+            orders.append(order)
+        ServiceOrder.objects.bulk_create(orders)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _request(self, **params):
+        return Request(RequestFactory().get("/", params))
+
+    def test_declared_ordering_is_applied(self):
+        response = self.client.get(self.url, {"ordering": "-current_end_date"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["title"], "Order 11")
+
+    def test_undeclared_ordering_is_rejected(self):
+        for ordering in ("title", "-created_at,-title", "supplier_name"):
+            response = self.client.get(self.url, {"ordering": ordering})
+            self.assertEqual(response.status_code, 400, ordering)
+            self.assertIn("ordering", response.data)
+
+    def test_view_without_ordering_fields_cannot_be_reordered(self):
+        view = SimpleNamespace(ordering=["-created_at"])
+        backend = DeclaredOrderingFilter()
+
+        with self.assertRaises(ValidationError):
+            backend.filter_queryset(self._request(ordering="title"), ServiceOrder.objects.all(), view)
+        ordered = backend.filter_queryset(self._request(), ServiceOrder.objects.all(), view)
+        self.assertEqual(ordered.query.order_by, ("-created_at",))
+
+    def test_search_is_refused_above_the_scan_limit(self):
+        with override_settings(SEARCH_MAX_SCAN_ROWS=12):
+            self.assertEqual(self.client.get(self.url, {"search": "Order"}).status_code, 200)
+
+        with override_settings(SEARCH_MAX_SCAN_ROWS=11):
+            response = self.client.get(self.url, {"search": "Order"})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("search", response.data)
+
+            # Narrowed by an indexed filter first: 4 rows left
+            response = self.client.get(self.url, {"search": "Order", "supplier_name": "Globex"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["count"], 4)
+
+    def test_search_adds_one_bounded_count(self):
+        # Page count and page
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"search": "Globex"})
+        self.assertEqual(response.data["count"], 4)
+
+    def test_prefixed_search_fields_skip_the_count(self):
+        backend = GuardedSearchFilter()
+        request = self._request(search="Order")
+
+        with override_settings(SEARCH_MAX_SCAN_ROWS=0):
+            with self.assertNumQueries(0):
+                searched = backend.filter_queryset(request, ServiceOrder.objects.all(), SimpleNamespace(search_fields=["^title"]))
+            self.assertEqual(searched.count(), 12)
+
+            with self.assertRaises(ValidationError):
+                backend.filter_queryset(request, ServiceOrder.objects.all(), SimpleNamespace(search_fields=["^title", "supplier_name"]))
+
+
+class BurnDownBenchmark(TestCase):
+    """The "nearly exhausted, most consumed first" list in SQL against the property"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        ServiceOrder.objects.bulk_create(
+            (
+                make_order(
+                    i,
+                    start=today - timedelta(days=i % 60),
+                    end=today + timedelta(days=1 + i % 45),
+                    man_days=5 + i % 40,
+                )
+                for i in range(BENCHMARK_ROWS)
+            ),
+            batch_size=5000,
+        )
+
+    def test_annotated_path_beats_the_property(self):
+        started = time.perf_counter()
+        annotated = list(
+            ServiceOrder.objects.with_burn_down()
+            .filter(remaining_man_days__lte=5)
+            .order_by("-consumed_ratio", "pk")
+            .values_list("pk", "consumed_ratio")[:25]
+        )
+        annotated_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        nearly_exhausted = [order for order in ServiceOrder.objects.all() if order.remaining_man_days <= 5]
+        nearly_exhausted.sort(key=lambda order: (-order.consumed_ratio, order.pk))
+        in_python = [(order.pk, order.consumed_ratio) for order in nearly_exhausted[:25]]
+        property_seconds = time.perf_counter() - started
+
+        self.assertEqual([pk for pk, _ in annotated], [pk for pk, _ in in_python])
+        print(
+            f"\nService order burn-down over {BENCHMARK_ROWS} orders, top 25 nearly exhausted: "
+            f"SQL {annotated_seconds * 1000:.1f} ms, property {property_seconds * 1000:.1f} ms"
+        )
+        self.assertLess(annotated_seconds, property_seconds)
@@ -1,5 +1,6 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.utils import timezone
@@ -7,12 +8,13 @@ from django.utils import timezone
 from .models import *
 from .serializers import *
 from audit_log.models import AuditLog
+from config.exports import ExportMixin
 
 
 # ====================
 # SERVICE ORDER VIEWSET
 # ====================
-class ServiceOrderViewSet(viewsets.ModelViewSet):
+class ServiceOrderViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = ServiceOrder.objects.all()
     permission_classes = [AllowAny]
     
@@ -34,9 +36,52 @@ class ServiceOrderViewSet(viewsets.ModelViewSet):
     ]
     
     # Ordering
-    ordering_fields = ['start_date', 'current_end_date', 'created_at']
+    ordering_fields = [
+        'start_date',
+        'current_end_date',
+        'created_at',
+        'consumed_man_days',
+        'remaining_man_days',
+        'consumed_ratio',
+    ]
     ordering = ['-created_at']
+
+    # Columns of GET /export/, including the burn-down annotations
+    export_fields = [
+        'id', 'title', 'status', 'service_request_id', 'contract_id',
+        'supplier_name', 'current_specialist_id', 'current_specialist_name', 'role', 'domain',
+        'start_date', 'original_end_date', 'current_end_date', 'actual_end_date',
+        'original_man_days', 'current_man_days', 'consumed_man_days', 'remaining_man_days', 'consumed_ratio',
+        'daily_rate', 'original_contract_value', 'current_contract_value',
+        'created_at', 'updated_at',
+    ]
+    export_filename = 'service-orders'
+
+    # Burn-down range filters, applied to the SQL annotations
+    burn_down_filters = {
+        'remaining_man_days__lte': int,
+        'remaining_man_days__gte': int,
+        'consumed_ratio__lte': float,
+        'consumed_ratio__gte': float,
+    }
     
+    def get_queryset(self):
+        # One reference date for every row in this request, and the pending
+        # extension/substitution ids resolved in the same query
+        queryset = ServiceOrder.objects.with_burn_down().with_pending_change_ids()
+
+        filters = {}
+        for param, cast in self.burn_down_filters.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                filters[param] = cast(value)
+            except ValueError:
+                raise ValidationError({param: f'Must be a number, got "{value}"'})
+
+        return queryset.filter(**filters)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return ServiceOrderCreateSerializer
@@ -94,7 +139,7 @@ class ServiceOrderExtensionViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     
     # Filterable fields
-    filterset_fields = ['status', 'initiated_by', 'service_order']
+    filterset_fields = ['status', 'service_order']
     
     # Ordering
     ordering_fields = ['created_at']
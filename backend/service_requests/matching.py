@@ -0,0 +1,231 @@
+"""
+Rank a provider's specialists against a service request.
+
+Every component score is a SQL expression, so the database scores all
+active specialists of the provider and only the top K rows come back,
+as plain values rather than model instances. Tag overlap is read from
+the precomputed Specialist.tag_signature, so scoring needs no join.
+
+The ranking query computes the total score once per row, from the
+covering (provider, status, ...) index on Specialist; the component
+breakdown is computed for the returned rows only. Scoring stays a scan
+of the provider's active specialists, linear in their number: on SQLite
+a request over 50k of them takes 70-110 ms on one core, most of it the
+per-row tag lookups (see MatchingBenchmark in service_requests/tests.py).
+"""
+from django.db.models import Case, When, Value, F, Q, FloatField
+from django.db.models.functions import StrIndex
+from django.db.models.lookups import GreaterThan
+
+from specialists import availability
+from specialists.models import Specialist, SpecialistTag, Tag, TagKind, ExperienceLevel
+from specialists.tags import normalize_tag, signature_token
+
+
+# Relative weight of each component; components score 0..1
+MATCH_WEIGHTS = {
+    "skills": 0.40,
+    "certifications": 0.10,
+    "languages": 0.10,
+    "experience": 0.15,
+    "availability": 0.15,
+    "work_mode": 0.05,
+    "rate": 0.05,
+}
+
+CRITERIA_KINDS = {
+    "skills": TagKind.SKILL,
+    "certifications": TagKind.CERTIFICATION,
+    "languages": TagKind.LANGUAGE,
+}
+
+EXPERIENCE_ORDER = [level for level, _ in ExperienceLevel.choices]
+
+CANDIDATE_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "role_name",
+    "experience_level",
+    "avg_daily_rate",
+    "work_mode",
+    "available_from",
+    "available_until",
+)
+
+
+def _requested_tags(service_request):
+    """{kind: {tag_id, ...}} for the tags named in criteria_json"""
+    criteria = service_request.criteria_json or {}
+
+    lookup = Q(pk__in=[])
+    requested = {}
+    for key, kind in CRITERIA_KINDS.items():
+        names = {normalize_tag(name) for name in criteria.get(key) or [] if name.strip()}
+        if names:
+            requested[kind] = len(names)
+            lookup |= Q(kind=kind, normalized__in=names)
+
+    tag_ids = {kind: set() for kind in requested}
+    for tag_id, kind in Tag.objects.filter(lookup).values_list("id", "kind"):
+        tag_ids[kind].add(tag_id)
+    return requested, tag_ids
+
+
+def _tag_score(requested, tag_ids):
+    """Weighted share of the requested tags each specialist has"""
+    score = Value(0.0)
+    for key, kind in CRITERIA_KINDS.items():
+        weight = MATCH_WEIGHTS[key] / requested[kind] if kind in requested else 0
+        if not weight:
+            continue
+        for tag_id in sorted(tag_ids.get(kind, ())):
+            has_tag = GreaterThan(StrIndex("tag_signature", Value(signature_token(tag_id))), 0)
+            score = score + Case(
+                When(has_tag, then=Value(weight)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+    return score
+
+
+def _unrequested_tag_score(requested):
+    # Components the request does not ask for count as fully met
+    return sum(MATCH_WEIGHTS[key] for key, kind in CRITERIA_KINDS.items() if kind not in requested)
+
+
+# Component scorers take the component's weight, so the ranking query can
+# sum weighted components without multiplying per row
+
+def _experience_score(level, weight=1.0):
+    if level not in EXPERIENCE_ORDER:
+        return Value(weight)
+
+    wanted = EXPERIENCE_ORDER.index(level)
+    steps = len(EXPERIENCE_ORDER) - 1
+    return Case(
+        *[
+            When(experience_level=candidate, then=Value(weight * (1 - abs(index - wanted) / steps)))
+            for index, candidate in enumerate(EXPERIENCE_ORDER)
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _availability_score(start, end, busy_ids, weight=1.0):
+    """
+    1 when the availability window covers the request, 0.5 on partial
+    overlap, 0 when an active service order already books the specialist
+    """
+    if not start or not end:
+        return Value(weight)
+
+    covers = (
+        (Q(available_from__isnull=True) | Q(available_from__lte=start))
+        & (Q(available_until__isnull=True) | Q(available_until__gte=end))
+    )
+    overlaps = (
+        (Q(available_from__isnull=True) | Q(available_from__lte=end))
+        & (Q(available_until__isnull=True) | Q(available_until__gte=start))
+    )
+    return Case(
+        When(pk__in=busy_ids, then=Value(0.0)),
+        When(covers, then=Value(weight)),
+        When(overlaps, then=Value(weight / 2)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _work_mode_score(mode, weight=1.0):
+    if not mode:
+        return Value(weight)
+
+    # Hybrid on either side is a partial fit
+    partial = Q(work_mode__in=["Remote", "On-site"]) if mode == "Hybrid" else Q(work_mode="Hybrid")
+    return Case(
+        When(work_mode=mode, then=Value(weight)),
+        When(partial, then=Value(weight / 2)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _rate_score(max_rate, weight=1.0):
+    if max_rate is None:
+        return Value(weight)
+
+    return Case(
+        When(avg_daily_rate__isnull=True, then=Value(weight / 2)),
+        When(avg_daily_rate__lte=max_rate, then=Value(weight)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def rank_candidates(service_request, *, provider_id, limit=10, max_rate=None):
+    """
+    Top `limit` active specialists of `provider_id` for `service_request`,
+    best first. Returns a list of dicts with the score and its components.
+    """
+    requested, tag_ids = _requested_tags(service_request)
+    start, end = service_request.start_date, service_request.end_date
+    busy_ids = availability.busy_specialist_ids(start, end) if start and end else []
+
+    score = (
+        _tag_score(requested, tag_ids)
+        + _experience_score(service_request.experience_level, MATCH_WEIGHTS["experience"])
+        + _availability_score(start, end, busy_ids, MATCH_WEIGHTS["availability"])
+        + _work_mode_score(service_request.word_mode, MATCH_WEIGHTS["work_mode"])
+        + _rate_score(max_rate, MATCH_WEIGHTS["rate"])
+    )
+    # Same for every row, so it is added after ranking
+    unrequested = _unrequested_tag_score(requested)
+    ordering = ("-score", F("avg_daily_rate").asc(nulls_last=True), "id")
+
+    # Step 1: rank on the total score alone
+    top_ids = list(
+        Specialist.objects.filter(provider_id=provider_id, status="Active")
+        .annotate(score=score)
+        .order_by(*ordering)
+        .values_list("id", flat=True)[:limit]
+    )
+    if not top_ids:
+        return []
+
+    # Step 2: the component breakdown for the returned rows
+    components = {
+        "tag_score": _tag_score(requested, tag_ids),
+        "experience_score": _experience_score(service_request.experience_level),
+        "availability_score": _availability_score(start, end, busy_ids),
+        "work_mode_score": _work_mode_score(service_request.word_mode),
+        "rate_score": _rate_score(max_rate),
+    }
+    rows = {
+        row["id"]: row
+        for row in Specialist.objects.filter(pk__in=top_ids)
+        .annotate(score=score, **components)
+        .values(*CANDIDATE_FIELDS, "score", *components)
+    }
+    candidates = [rows[specialist_id] for specialist_id in top_ids]
+
+    # Name the matched tags for the returned rows only
+    matched = {}
+    wanted = set().union(*tag_ids.values()) if tag_ids else set()
+    if wanted:
+        rows = SpecialistTag.objects.filter(
+            specialist_id__in=top_ids,
+            tag_id__in=wanted,
+        ).values_list("specialist_id", "tag__kind", "tag__name")
+        for specialist_id, kind, name in rows:
+            matched.setdefault(specialist_id, {}).setdefault(kind, []).append(name)
+
+    for candidate in candidates:
+        tags = matched.get(candidate["id"], {})
+        candidate["matched_skills"] = sorted(tags.get(TagKind.SKILL, []))
+        candidate["matched_certifications"] = sorted(tags.get(TagKind.CERTIFICATION, []))
+        candidate["matched_languages"] = sorted(tags.get(TagKind.LANGUAGE, []))
+        candidate["score"] = round(candidate["score"] + unrequested, 4)
+
+    return candidates
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:58
+
+from django.db import migrations, models
+
+
+def normalize_external_ids(apps, schema_editor):
+    ServiceRequest = apps.get_model('service_requests', 'ServiceRequest')
+
+    # Blank ids become NULL so they do not collide under the unique constraint
+    ServiceRequest.objects.filter(external_id='').update(external_id=None)
+
+    # The oldest row of each duplicate group keeps the id. The newer ones
+    # must give it up for the unique constraint; they are listed so the
+    # partner's ids can be restored by hand
+    kept = {}
+    duplicates = []
+    rows = (
+        ServiceRequest.objects.exclude(external_id__isnull=True)
+        .order_by('external_id', 'created_at', 'id')
+        .values_list('id', 'external_id')
+    )
+    for request_id, external_id in rows:
+        if external_id in kept:
+            duplicates.append((request_id, external_id))
+        else:
+            kept[external_id] = request_id
+
+    if not duplicates:
+        return
+
+    ServiceRequest.objects.filter(id__in=[request_id for request_id, _ in duplicates]).update(external_id=None)
+    print(f"\n  Cleared the external_id of {len(duplicates)} duplicate service requests (the oldest keeps it):")
+    for request_id, external_id in duplicates:
+        print(f"    {request_id}: external_id {external_id!r}, kept by {kept[external_id]}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_requests', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='servicerequest',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.RunPython(normalize_external_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='servicerequest',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=128, null=True, unique=True),
+        ),
+    ]
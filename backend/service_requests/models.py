@@ -14,7 +14,7 @@ class RequestStatus(models.TextChoices):
 class ServiceRequest(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
-    external_id = models.CharField(max_length=128, blank=True) # imported from 3rd party
+    external_id = models.CharField(max_length=128, unique=True, null=True, blank=True) # imported from 3rd party, upsert key
 
     title               = models.CharField(max_length=128)
     role_name           = models.CharField(max_length=128) # requested role
@@ -33,6 +33,20 @@ class ServiceRequest(models.Model):
     created_at          = models.DateTimeField(auto_now_add=True)
     updated_at          = models.DateTimeField(auto_now=True)
 
+    def submitted_offers(self):
+        """
+        Offers submitted for this request, read from the local ServiceOffer table
+        """
+        offers = self.offers.order_by("created_at").values_list("id", "provider_id", "created_at")
+        return [
+            {
+                "offer_id": str(offer_id),
+                "provider_id": str(provider_id),
+                "submitted_at": created_at.isoformat(),
+            }
+            for offer_id, provider_id, created_at in offers
+        ]
+
 
 class OfferStatus(models.TextChoices):
     SUBMITTED = "SUBMITTED", "Submitted"
@@ -104,6 +104,7 @@ class ServiceOfferViewSet(
             message=f"Offer status changed to {offer.status}.",
             entity_type="ServiceOffer",
             entity_id=offer.id,
+            provider_id=offer.provider_id,
         )
 
         return Response({"status": "WITHDRAWN"})
@@ -145,6 +146,7 @@ class ServiceOfferViewSet(
             message=f"Offer status changed to {offer.status}.",
             entity_type="ServiceOffer",
             entity_id=offer.id,
+            provider_id=offer.provider_id,
         )
         
         return Response(
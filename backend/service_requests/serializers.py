@@ -36,4 +36,50 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
                     f"'{key}' must be a list of strings"
                 )
         
-        return value
\ No newline at end of file
+        return value
+
+
+class ServiceRequestImportSerializer(ServiceRequestSerializer):
+    """
+    Partner payload for the generate endpoints. external_id is the upsert
+    key there, so an existing id is an update rather than a conflict.
+    """
+    class Meta(ServiceRequestSerializer.Meta):
+        extra_kwargs = {
+            "external_id": {"validators": []},
+        }
+
+    def validate_external_id(self, value):
+        return value or None
+
+
+class ServiceRequestTaskSerializer(serializers.ModelSerializer):
+    """
+    Service request payload embedded in the Flowable task list.
+    Pass `fields` to return only a subset of the columns.
+    """
+    class Meta:
+        model = ServiceRequest
+        fields = [
+            "id",
+            "external_id",
+            "title",
+            "role_name",
+            "technology",
+            "specialization",
+            "experience_level",
+            "start_date",
+            "end_date",
+            "expected_man_days",
+            "criteria_json",
+            "task_description",
+            "offer_deadline",
+            "word_mode",
+        ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - {"id"}:
+                self.fields.pop(name)
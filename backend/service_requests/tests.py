@@ -1,3 +1,441 @@
-from django.test import TestCase
+import contextlib
+import io
+import os
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from notifications.models import BroadcastNotification
+from outbox.models import OutboxKind, OutboxMessage
+from providers.models import Provider
+from service_orders.models import ServiceOrder
+from specialists.models import Specialist, Tag, TagKind
+from specialists.tags import normalize_tag, split_tags, tag_signature
+from specialists.tests import make_specialist
+from .matching import EXPERIENCE_ORDER, MATCH_WEIGHTS, rank_candidates
+from .models import ServiceOffer, ServiceRequest
+
+# Active specialists of one provider in the matching benchmark
+MATCHING_BENCHMARK_ROWS = int(os.getenv("MATCHING_BENCHMARK_ROWS", "50000"))
+
+
+class GetTasksTests(TestCase):
+    url = "/api/requests/service-requests/tasks/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _tasks(self, count, format_id=str):
+        tasks = []
+        for i in range(count):
+            service_request = ServiceRequest.objects.create(title=f"Request {i}", role_name="Developer")
+            ServiceOffer.objects.create(
+                request=service_request, provider=self.provider, daily_rate=500, total_cost=5000
+            )
+            tasks.append({
+                "task_id": f"task-{i}",
+                "task_name": "Submit offer",
+                "created_time": None,
+                "variables": {"request_id": format_id(service_request.id)},
+            })
+        return tasks
+
+    def _get(self, tasks, **params):
+        with mock.patch("service_requests.views.list_tasks_by_group", return_value=(tasks, None)):
+            return self.client.get(self.url, params)
+
+    def test_query_count_is_constant_in_task_count(self):
+        for count in (5, 50):
+            tasks = self._tasks(count)
+            # Service requests and offers, one query each
+            with self.assertNumQueries(2):
+                response = self._get(tasks)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["count"], count)
+            for task in response.data["tasks"]:
+                self.assertEqual(task["provider_ids"], [str(self.provider.id)])
+
+    def test_matches_request_ids_in_any_uuid_form(self):
+        tasks = self._tasks(2, format_id=lambda id: id.hex.upper())
+        tasks.append({"task_id": "bad", "task_name": "", "created_time": None, "variables": {"request_id": "nope"}})
+
+        response = self._get(tasks)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task["task_id"] for task in response.data["tasks"]], ["task-0", "task-1"])
+        self.assertEqual(response.data["tasks"][0]["provider_ids"], [str(self.provider.id)])
+
+    def test_fields_selector_skips_large_columns(self):
+        response = self._get(self._tasks(1), fields="title")
+
+        self.assertEqual(set(response.data["tasks"][0]["service_request"]), {"id", "title"})
+
+
+def bulk_item(i, **fields):
+    return {
+        "external_id": f"EXT-{i}",
+        "title": f"Request {i}",
+        "role_name": "Developer",
+        "offer_deadline": "2030-01-31",
+        **fields,
+    }
+
+
+class GenerateBulkTests(TestCase):
+    url = "/api/requests/service-requests/generate-bulk/"
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _post(self, items):
+        return self.client.post(self.url, items, format="json")
+
+    def test_creates_all_and_queues_one_start_per_request(self):
+        response = self._post([bulk_item(i) for i in range(3)])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data["created"], response.data["updated"], response.data["failed"]), (3, 0, 0))
+        requests = {str(pk): external_id for pk, external_id in ServiceRequest.objects.values_list("id", "external_id")}
+        self.assertEqual(
+            [(result["index"], result["status"], requests[result["request_id"]]) for result in response.data["results"]],
+            [(i, "created", f"EXT-{i}") for i in range(3)],
+        )
+
+        messages = OutboxMessage.objects.filter(kind=OutboxKind.FLOWABLE_START_REQUEST)
+        self.assertEqual(
+            {message.idempotency_key: message.payload for message in messages},
+            {f"start-request:{pk}": {"request_id": pk, "offer_deadline": "2030-01-31"} for pk in requests},
+        )
+        # One notification for the batch
+        self.assertEqual(list(BroadcastNotification.objects.values_list("role", "message")), [
+            ("SUPPLIER_REP", "3 new service requests have been created."),
+        ])
+
+    def test_reimport_updates_in_place(self):
+        first = self._post([bulk_item(0), bulk_item(1)])
+        ServiceRequest.objects.filter(external_id="EXT-0").update(status="CLOSED")
+
+        response = self._post([bulk_item(0, title="Renamed"), bulk_item(2)])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["updated", "created"])
+        self.assertEqual(response.data["results"][0]["request_id"], first.data["results"][0]["request_id"])
+        self.assertEqual(ServiceRequest.objects.count(), 3)
+        updated = ServiceRequest.objects.get(external_id="EXT-0")
+        self.assertEqual((updated.title, updated.status), ("Renamed", "OPEN"))
+        # The still-pending start of EXT-0 is not queued twice
+        self.assertEqual(OutboxMessage.objects.filter(kind=OutboxKind.FLOWABLE_START_REQUEST).count(), 3)
+
+    def test_partial_failure_is_207(self):
+        response = self._post([
+            bulk_item(0),
+            bulk_item(1, external_id=""),
+            bulk_item(2, status="CLOSED"),
+            bulk_item(0, title="Again"),
+            bulk_item(4, role_name=""),
+        ])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 4))
+        errors = {result["index"]: result.get("errors") for result in response.data["results"]}
+        self.assertIsNone(errors[0])
+        self.assertIn("external_id", errors[1])
+        self.assertIn("status", errors[2])
+        self.assertEqual(errors[3], {"external_id": ["Duplicate of item 0"]})
+        self.assertIn("role_name", errors[4])
+        self.assertEqual(ServiceRequest.objects.count(), 1)
+
+    def test_nothing_valid_is_400(self):
+        response = self._post([bulk_item(0, status="CLOSED")])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ServiceRequest.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertFalse(BroadcastNotification.objects.exists())
+
+        for body in ([], {"external_id": "EXT-0"}):
+            self.assertEqual(self._post(body).status_code, 400)
+
+    @override_settings(GENERATE_BULK_MAX_ITEMS=2)
+    def test_batch_size_is_capped(self):
+        response = self._post([bulk_item(i) for i in range(3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At most 2", response.data["error"])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        counts = []
+        for first, size in ((0, 2), (100, 20)):
+            with CaptureQueriesContext(connection) as queries:
+                response = self._post([bulk_item(i) for i in range(first, first + size)])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ExternalIdMigrationTests(TransactionTestCase):
+    """0002 makes external_id unique; existing duplicates keep it on their oldest row"""
+
+    before = [("service_requests", "0001_initial")]
+    after = [("service_requests", "0002_servicerequest_external_id_unique")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_duplicates_keep_the_id_on_the_oldest_row(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        OldServiceRequest = executor.loader.project_state(self.before).apps.get_model("service_requests", "ServiceRequest")
+
+        rows = {}
+        for name, external_id, day in (
+            ("newest", "EXT-1", 3), ("oldest", "EXT-1", 1), ("middle", "EXT-1", 2),
+            ("single", "EXT-2", 1), ("blank", "", 1), ("blank too", "", 2),
+        ):
+            row = OldServiceRequest.objects.create(title=name, role_name="Developer", external_id=external_id)
+            OldServiceRequest.objects.filter(pk=row.pk).update(created_at=datetime(2024, 1, day, tzinfo=dt_timezone.utc))
+            rows[name] = row.pk
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            executor = MigrationExecutor(connection)
+            executor.migrate(self.after)
+
+        NewServiceRequest = executor.loader.project_state(self.after).apps.get_model("service_requests", "ServiceRequest")
+        self.assertEqual(
+            dict(NewServiceRequest.objects.values_list("title", "external_id")),
+            {"oldest": "EXT-1", "middle": None, "newest": None, "single": "EXT-2", "blank": None, "blank too": None},
+        )
+        # The cleared ids are reported, with the row that kept them
+        log = output.getvalue()
+        self.assertIn("Cleared the external_id of 2 duplicate service requests", log)
+        for name in ("middle", "newest"):
+            self.assertIn(f"{rows[name]}: external_id 'EXT-1', kept by {rows['oldest']}", log)
+
+
+def reference_score(specialist, service_request, *, busy=False, max_rate=None):
+    """rank_candidates' scoring rules, evaluated in Python for one specialist"""
+    criteria = service_request.criteria_json
+    score = 0.0
+    for key, field in (("skills", "skills"), ("certifications", "certifications"), ("languages", "languages_spoken")):
+        wanted = {normalize_tag(name) for name in criteria.get(key, [])}
+        have = {normalize_tag(name) for name in split_tags(getattr(specialist, field))}
+        score += MATCH_WEIGHTS[key] * (len(wanted & have) / len(wanted) if wanted else 1)
+
+    wanted_level = EXPERIENCE_ORDER.index(service_request.experience_level)
+    distance = abs(EXPERIENCE_ORDER.index(specialist.experience_level) - wanted_level)
+    score += MATCH_WEIGHTS["experience"] * (1 - distance / (len(EXPERIENCE_ORDER) - 1))
+
+    start, end = service_request.start_date, service_request.end_date
+    starts_by = lambda day: specialist.available_from is None or specialist.available_from <= day
+    lasts_until = lambda day: specialist.available_until is None or specialist.available_until >= day
+    if busy:
+        availability = 0
+    elif starts_by(start) and lasts_until(end):
+        availability = 1
+    elif starts_by(end) and lasts_until(start):
+        availability = 0.5
+    else:
+        availability = 0
+    score += MATCH_WEIGHTS["availability"] * availability
+
+    mode = service_request.word_mode
+    if specialist.work_mode == mode:
+        work_mode = 1
+    elif "Hybrid" in (mode, specialist.work_mode):
+        work_mode = 0.5
+    else:
+        work_mode = 0
+    score += MATCH_WEIGHTS["work_mode"] * work_mode
+
+    if max_rate is None:
+        rate = 1
+    elif specialist.avg_daily_rate is None:
+        rate = 0.5
+    else:
+        rate = 1 if specialist.avg_daily_rate <= max_rate else 0
+    return score + MATCH_WEIGHTS["rate"] * rate
+
+
+class CandidatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        other = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        cls.user = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.provider)
+
+        today = date.today()
+        cls.service_request = ServiceRequest.objects.create(
+            title="Backend developer",
+            role_name="Developer",
+            experience_level="SENIOR",
+            start_date=today + timedelta(days=30),
+            end_date=today + timedelta(days=90),
+            word_mode="Remote",
+            criteria_json={
+                "skills": ["Python", "Django", "PostgreSQL", "AWS"],
+                "certifications": ["AWS Solutions Architect"],
+                "languages": ["English", "German"],
+            },
+        )
+
+        rnd = random.Random(16)
+        skills = ["Python", "Django", "PostgreSQL", "AWS", "React", "Java", "Go"]
+        cls.specialists = []
+        for i in range(30):
+            specialist = make_specialist(
+                cls.provider,
+                i,
+                experience_level=rnd.choice(EXPERIENCE_ORDER),
+                skills=", ".join(rnd.sample(skills, rnd.randint(1, 5))),
+                certifications=rnd.choice(["", "AWS Solutions Architect", "Scrum Master"]),
+                languages_spoken=rnd.choice(["English", "English, German", "French"]),
+                work_mode=rnd.choice(["Remote", "On-site", "Hybrid"]),
+                avg_daily_rate=rnd.choice([None, 400, 600, 800]),
+                available_from=rnd.choice([None, today, today + timedelta(days=60), today + timedelta(days=120)]),
+                available_until=rnd.choice([None, today + timedelta(days=70), today + timedelta(days=365)]),
+            )
+            specialist.save()
+            cls.specialists.append(specialist)
+
+        make_specialist(other, 100, skills="Python, Django, PostgreSQL, AWS").save()
+        make_specialist(cls.provider, 101, skills="Python, Django, PostgreSQL, AWS", status="Inactive").save()
+
+        # Booked across the whole request window
+        cls.busy = cls.specialists[0]
+        ServiceOrder.objects.create(
+            service_request_id="SR-0", winning_offer_id="OF-0", title="Busy",
+            start_date=today, original_end_date=today + timedelta(days=200), current_end_date=today + timedelta(days=200),
+            supplier_name="Acme", current_specialist_id=str(cls.busy.pk), current_specialist_name="Busy",
+            original_specialist_id=str(cls.busy.pk), original_specialist_name="Busy",
+            role="Developer", domain="Backend", original_man_days=100, current_man_days=100,
+            daily_rate=500, original_contract_value=50000, current_contract_value=50000,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _candidates(self, **params):
+        response = self.client.get(f"/api/requests/service-requests/{self.service_request.pk}/candidates/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["candidates"]
+
+    def _reference(self, max_rate=None):
+        return {
+            specialist.pk: round(
+                reference_score(
+                    specialist, self.service_request, busy=specialist == self.busy, max_rate=max_rate
+                ),
+                4,
+            )
+            for specialist in self.specialists
+        }
+
+    def test_ranking_matches_brute_force_scoring(self):
+        for max_rate in (None, 600):
+            params = {"limit": 10} if max_rate is None else {"limit": 10, "max_rate": max_rate}
+            candidates = self._candidates(**params)
+            expected = self._reference(max_rate)
+
+            self.assertEqual(len(candidates), 10)
+            for candidate in candidates:
+                self.assertAlmostEqual(candidate["score"], expected[candidate["id"]], places=3)
+            # Best first, and nobody left out scores higher than the last one returned
+            scores = [candidate["score"] for candidate in candidates]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+            self.assertEqual(scores, sorted(expected.values(), reverse=True)[:10])
+
+    def test_only_active_specialists_of_the_callers_provider(self):
+        ids = {candidate["id"] for candidate in self._candidates(limit=50)}
+        self.assertEqual(ids, {specialist.pk for specialist in self.specialists})
+
+    def test_breakdown_and_matched_tags(self):
+        candidates = {candidate["id"]: candidate for candidate in self._candidates(limit=50)}
+
+        self.assertEqual(candidates[self.busy.pk]["availability_score"], 0)
+        for specialist in self.specialists:
+            candidate = candidates[specialist.pk]
+            wanted = {"python", "django", "postgresql", "aws"}
+            self.assertEqual(
+                {normalize_tag(name) for name in candidate["matched_skills"]},
+                wanted & {normalize_tag(name) for name in split_tags(specialist.skills)},
+            )
+            self.assertTrue(0 <= candidate["experience_score"] <= 1)
+
+    def test_limit_is_validated(self):
+        response = self.client.get(f"/api/requests/service-requests/{self.service_request.pk}/candidates/", {"limit": 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class MatchingBenchmark(TestCase):
+    """rank_candidates over MATCHING_BENCHMARK_ROWS active specialists of one provider"""
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(7)
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        tag_ids = {}
+        for kind, count in ((TagKind.SKILL, 60), (TagKind.CERTIFICATION, 12), (TagKind.LANGUAGE, 8)):
+            Tag.objects.bulk_create(Tag(kind=kind, name=f"{kind} {i}", normalized=f"{kind} {i}".lower()) for i in range(count))
+            tag_ids[kind] = list(Tag.objects.filter(kind=kind).values_list("id", flat=True))
+
+        today = date.today()
+        specialists = []
+        for i in range(MATCHING_BENCHMARK_ROWS):
+            tags = (
+                rnd.sample(tag_ids[TagKind.SKILL], rnd.randint(3, 8))
+                + rnd.sample(tag_ids[TagKind.CERTIFICATION], rnd.randint(0, 2))
+                + rnd.sample(tag_ids[TagKind.LANGUAGE], rnd.randint(1, 2))
+            )
+            specialists.append(make_specialist(
+                cls.provider,
+                i,
+                experience_level=rnd.choice(EXPERIENCE_ORDER),
+                work_mode=rnd.choice(["Remote", "On-site", "Hybrid"]),
+                avg_daily_rate=rnd.randint(300, 900),
+                available_from=today + timedelta(days=rnd.randint(-100, 100)),
+                available_until=None if i % 3 else today + timedelta(days=rnd.randint(50, 400)),
+                tag_signature=tag_signature(tags),
+            ))
+        Specialist.objects.bulk_create(specialists, batch_size=5000)
+
+        cls.service_request = ServiceRequest.objects.create(
+            title="Backend developer",
+            role_name="Developer",
+            experience_level="SENIOR",
+            start_date=today + timedelta(days=30),
+            end_date=today + timedelta(days=120),
+            criteria_json={
+                "skills": ["skill 1", "skill 5", "skill 9", "skill 20", "skill 33"],
+                "certifications": ["certification 2"],
+                "languages": ["language 1"],
+            },
+        )
+
+    def test_top_ten_under_150_ms(self):
+        # Measured at the default 50k rows: 70-110 ms p50 on one core
+        timings = []
+        for _ in range(11):
+            started = time.perf_counter()
+            candidates = rank_candidates(self.service_request, provider_id=self.provider.pk, limit=10)
+            timings.append(time.perf_counter() - started)
+
+        self.assertEqual(len(candidates), 10)
+        p50 = statistics.median(timings)
+        print(f"\nCandidates over {MATCHING_BENCHMARK_ROWS} specialists: top 10 in {p50 * 1000:.1f} ms (p50)")
+        self.assertLess(p50, 0.150)
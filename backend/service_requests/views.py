@@ -1,4 +1,7 @@
-import json
+import uuid
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
 from django.db.models import Count
 from django.conf import settings
 from rest_framework import viewsets, mixins, status
@@ -7,16 +10,27 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
 from .models import ServiceRequest, RequestStatus, ServiceOffer
-from .serializers import ServiceRequestSerializer
+from .serializers import ServiceRequestSerializer, ServiceRequestImportSerializer, ServiceRequestTaskSerializer
 from .offer_serializers import ServiceOfferCreateSerializer
 from .permissions import IsSupplierRep
+from .matching import rank_candidates
 from audit_log.models import AuditLog
 from audit_log.utils import serialize_for_json
 from integrations.flowable_client import *
 from notifications.services import notify_roles
 from providers.models import Provider
+from specialists import availability
 from specialists.models import Specialist
-from integrations.third_party_service import third_party_service
+from outbox.models import OutboxKind
+from outbox.services import enqueue, enqueue_many
+
+
+def _canonical_id(value):
+    """`value` as a canonical (lowercase, hyphenated) UUID string, or None"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
 
 
 class ServiceRequestViewSet(
@@ -47,12 +61,14 @@ class ServiceRequestViewSet(
         return qs
 
     def get_permissions(self):
-        if self.action in ["generate", "close_offers"]:
+        if self.action in ["generate", "generate_bulk", "close_offers"]:
             return [AllowAny(),]
         elif self.action in ["create", "update", "partial_update"]:
             return [IsAuthenticated(), IsSupplierRep()]
         elif self.action in ["list", "retrieve"]:
             return [AllowAny()]
+        elif self.action == "candidates":
+            return [IsAuthenticated()]
         return [AllowAny()]
 
 
@@ -69,7 +85,7 @@ class ServiceRequestViewSet(
         """
     
         # Step 1: Validate input data
-        serializer = ServiceRequestSerializer(data=request.data)
+        serializer = ServiceRequestImportSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
@@ -84,62 +100,65 @@ class ServiceRequestViewSet(
             )
 
         try:
-            # Step 2: Get or create service request
-            service_request, created = ServiceRequest.objects.get_or_create(
-                external_id=external_id,
-                defaults={
-                    'title': validated_data.get('title'),
-                    'role_name': validated_data.get('role_name'),
-                    'technology': validated_data.get('technology'),
-                    'specialization': validated_data.get('specialization'),
-                    'experience_level': validated_data.get('experience_level'),
-                    'start_date': validated_data.get('start_date'),
-                    'end_date': validated_data.get('end_date'),
-                    'expected_man_days': validated_data.get('expected_man_days'),
-                    'criteria_json': validated_data.get('criteria_json'),
-                    'task_description': validated_data.get('task_description'),
-                    'offer_deadline': validated_data.get('offer_deadline'),
-                    'word_mode': validated_data.get('word_mode'),
-                }
-            )
+            with transaction.atomic():
+                # Step 2: Get or create service request (requests without an external id are always new)
+                lookup = {'external_id': external_id} if external_id else {'id': uuid.uuid4()}
+                service_request, created = ServiceRequest.objects.get_or_create(
+                    **lookup,
+                    defaults={
+                        'title': validated_data.get('title'),
+                        'role_name': validated_data.get('role_name'),
+                        'technology': validated_data.get('technology'),
+                        'specialization': validated_data.get('specialization'),
+                        'experience_level': validated_data.get('experience_level'),
+                        'start_date': validated_data.get('start_date'),
+                        'end_date': validated_data.get('end_date'),
+                        'expected_man_days': validated_data.get('expected_man_days'),
+                        'criteria_json': validated_data.get('criteria_json'),
+                        'task_description': validated_data.get('task_description'),
+                        'offer_deadline': validated_data.get('offer_deadline'),
+                        'word_mode': validated_data.get('word_mode'),
+                    }
+                )
             
-            # If service_request already exists, update it
-            if not created:
-                service_request.title = validated_data.get('title')
-                service_request.role_name =validated_data.get('role_name')
-                service_request.technology = validated_data.get('technology')
-                service_request.specialization = validated_data.get('specialization')
-                service_request.experience_level = validated_data.get('experience_level')
-                service_request.start_date = validated_data.get('start_date')
-                service_request.end_date = validated_data.get('end_date')
-                service_request.expected_man_days = validated_data.get('expected_man_days')
-                service_request.criteria_json = validated_data.get('criteria_json')
-                service_request.task_description = validated_data.get('task_description')
-                service_request.offer_deadline = validated_data.get('offer_deadline')
-                service_request.word_mode = validated_data.get('word_mode')
+                # If service_request already exists, update it
+                if not created:
+                    service_request.title = validated_data.get('title')
+                    service_request.role_name =validated_data.get('role_name')
+                    service_request.technology = validated_data.get('technology')
+                    service_request.specialization = validated_data.get('specialization')
+                    service_request.experience_level = validated_data.get('experience_level')
+                    service_request.start_date = validated_data.get('start_date')
+                    service_request.end_date = validated_data.get('end_date')
+                    service_request.expected_man_days = validated_data.get('expected_man_days')
+                    service_request.criteria_json = validated_data.get('criteria_json')
+                    service_request.task_description = validated_data.get('task_description')
+                    service_request.offer_deadline = validated_data.get('offer_deadline')
+                    service_request.word_mode = validated_data.get('word_mode')
             
-            service_request.status = 'OPEN'
-            service_request.save()
+                service_request.status = 'OPEN'
+                service_request.save()
 
-            # Step 4: Create Flowable task
-            try:
-                flowable_result = generate_request_task(
-                    request_id=str(service_request.id),
-                    offer_deadline=service_request.offer_deadline
+                # Step 4: Queue the Flowable process start for the outbox dispatcher
+                offer_deadline = service_request.offer_deadline
+                enqueue(
+                    kind=OutboxKind.FLOWABLE_START_REQUEST,
+                    payload={
+                        'request_id': str(service_request.id),
+                        'offer_deadline': offer_deadline.isoformat() if offer_deadline else None,
+                    },
+                    idempotency_key=f"start-request:{service_request.id}",
                 )
-                
-            except Exception as e:
-                raise Exception(f"Failed to create Flowable task: {str(e)}")
-            
-            # Notification Create 
-            notify_roles(
-                role="SUPPLIER_REP",
-                title="New Service Request",
-                message="A new service request has been created.",
-                entity_type="ServiceRequest",
-                entity_id=service_request.id,
-            )
             
+                # Notification Create 
+                notify_roles(
+                    role="SUPPLIER_REP",
+                    title="New Service Request",
+                    message="A new service request has been created.",
+                    entity_type="ServiceRequest",
+                    entity_id=service_request.id,
+                )
+
             # Step 5: Return success response
             return Response({
                 'message': 'Service Request and task created successfully',
@@ -153,66 +172,236 @@ class ServiceRequestViewSet(
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    # Columns an upsert from generate-bulk overwrites on an existing request
+    bulk_upsert_fields = [
+        'title',
+        'role_name',
+        'technology',
+        'specialization',
+        'experience_level',
+        'start_date',
+        'end_date',
+        'expected_man_days',
+        'criteria_json',
+        'task_description',
+        'offer_deadline',
+        'word_mode',
+        'status',
+        'updated_at',
+    ]
+
+    @action(detail=False, methods=["post"], url_path="generate-bulk")
+    def generate_bulk(self, request):
+        """
+        Create or update many Service Requests in one call
+
+        Body: a list of service request payloads, as accepted by `generate`.
+        Every item needs an external_id, which is the upsert key.
+        Returns one result per item, in input order.
+
+        Steps:
+        1. Validate every item, collecting per-item errors
+        2. Upsert the valid items by external_id in one statement
+        3. Queue one Flowable process start per request
+        4. Notify supplier reps once for the whole batch
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of service requests'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(items) > settings.GENERATE_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.GENERATE_BULK_MAX_ITEMS} service requests per call'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Step 1: Validate every item
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = ServiceRequestImportSerializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+                continue
+
+            validated_data = serializer.validated_data
+            external_id = validated_data.get('external_id')
+            request_status = validated_data.get('status', RequestStatus.OPEN)
+
+            errors = None
+            if not external_id:
+                errors = {'external_id': ['This field is required.']}
+            elif request_status.lower() != 'open':
+                errors = {'status': ['Only Open Service Requests are accepted']}
+            elif external_id in valid:
+                errors = {'external_id': [f'Duplicate of item {valid[external_id][0]}']}
+
+            if errors:
+                results[index] = {'index': index, 'external_id': external_id, 'status': 'error', 'errors': errors}
+            else:
+                valid[external_id] = (index, validated_data)
+
+        if valid:
+            try:
+                with transaction.atomic():
+                    external_ids = list(valid)
+                    existing = set(
+                        ServiceRequest.objects.filter(external_id__in=external_ids)
+                        .values_list('external_id', flat=True)
+                    )
+
+                    # Step 2: Upsert by external_id
+                    ServiceRequest.objects.bulk_create(
+                        [
+                            ServiceRequest(**{**validated_data, 'status': RequestStatus.OPEN})
+                            for _, validated_data in valid.values()
+                        ],
+                        update_conflicts=True,
+                        unique_fields=['external_id'],
+                        update_fields=self.bulk_upsert_fields,
+                    )
+
+                    # Existing rows keep their id, so read the ids back
+                    saved = {
+                        external_id: (request_id, offer_deadline)
+                        for external_id, request_id, offer_deadline in ServiceRequest.objects.filter(
+                            external_id__in=external_ids
+                        ).values_list('external_id', 'id', 'offer_deadline')
+                    }
+
+                    # Step 3: Queue the Flowable process starts; the dispatcher delivers them concurrently
+                    enqueue_many(
+                        kind=OutboxKind.FLOWABLE_START_REQUEST,
+                        messages=[
+                            (
+                                f"start-request:{request_id}",
+                                {
+                                    'request_id': str(request_id),
+                                    'offer_deadline': offer_deadline.isoformat() if offer_deadline else None,
+                                },
+                            )
+                            for request_id, offer_deadline in saved.values()
+                        ],
+                    )
+
+                    # Step 4: One notification for the whole batch
+                    notify_roles(
+                        role="SUPPLIER_REP",
+                        title="New Service Requests",
+                        message=f"{len(saved)} new service requests have been created.",
+                        entity_type="ServiceRequest",
+                        entity_id=str(saved[external_ids[0]][0]) if len(saved) == 1 else "",
+                    )
+
+            except Exception as e:
+                return Response(
+                    {'error': f'Failed to generate requests: {str(e)}'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+            for external_id, (index, _) in valid.items():
+                results[index] = {
+                    'index': index,
+                    'external_id': external_id,
+                    'status': 'updated' if external_id in existing else 'created',
+                    'request_id': str(saved[external_id][0]),
+                }
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        if failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response({
+            'created': sum(1 for result in results if result['status'] == 'created'),
+            'updated': sum(1 for result in results if result['status'] == 'updated'),
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
+
 
     @action(detail=False, methods=['get'], url_path='tasks')
     def get_tasks(self, request):
         """
         Get all negotiation tasks for supplier_rep group
+
+        Query params:
+        - limit: return a single page of at most `limit` tasks
+        - cursor: `next_cursor` from the previous page
+        - fields: comma-separated service request fields to include
         """
         group_id = 'supplier_rep'
         
+        limit = request.query_params.get('limit')
+        cursor = request.query_params.get('cursor')
+
+        if limit is not None and (not limit.isdigit() or int(limit) == 0):
+            return Response(
+                {'error': 'limit must be a positive integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if cursor is not None and not cursor.isdigit():
+            return Response(
+                {'error': 'Invalid cursor'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fields = ServiceRequestTaskSerializer.Meta.fields
+        fields_param = request.query_params.get('fields')
+        if fields_param:
+            requested = {name.strip() for name in fields_param.split(',')}
+            fields = [name for name in fields if name in requested or name == 'id']
+        
         try:
             # Step 1: Get tasks from Flowable
-            flowable_tasks = get_tasks_by_group(group_id=group_id)
+            flowable_tasks, next_cursor = list_tasks_by_group(
+                group_id=group_id,
+                limit=limit,
+                cursor=cursor,
+                process_definition_key='serviceRequestProcess',
+            )
             
-            # Step 2: Enrich with contract details from local database
+            # Step 2: Load all referenced service requests in one query
+            request_ids = {_canonical_id(task['variables'].get('request_id')) for task in flowable_tasks}
+            request_ids.discard(None)
+
+            service_requests = ServiceRequest.objects.filter(id__in=request_ids).only(*fields)
+            serializer = ServiceRequestTaskSerializer(service_requests, many=True, fields=fields)
+            requests_by_id = {_canonical_id(item['id']): item for item in serializer.data}
+
+            # Providers that already submitted, from the ServiceOffer (request, status) index
+            provider_ids_by_request = defaultdict(list)
+            offers = ServiceOffer.objects.filter(request_id__in=request_ids).values_list('request_id', 'provider_id')
+            for offer_request_id, provider_id in offers:
+                provider_ids_by_request[str(offer_request_id)].append(str(provider_id))
+
+            # Step 3: Enrich tasks from the in-memory map
             tasks_with_request = []
             
             for task in flowable_tasks:
-                request_id = task['variables'].get('request_id')
-                
-                if not request_id:
-                    continue
+                service_request = requests_by_id.get(_canonical_id(task['variables'].get('request_id')))
                 
-                try:
-                    # Get contract from database
-                    service_request = ServiceRequest.objects.get(id=request_id)
-                    submitted_offers_str = task['variables'].get('submitted_offers')
-                    provider_ids = []
-                    if submitted_offers_str:
-                        submitted_offers = json.loads(submitted_offers_str)
-                        provider_ids = [offer["provider_id"] for offer in submitted_offers]
-
-                    task_data = {
-                        'task_id': task['task_id'],
-                        'task_name': task['task_name'],
-                        'created_time': task['created_time'],
-                        'provider_ids': provider_ids,
-                        'service_request': {
-                            'id': service_request.id,
-                            'external_id': service_request.external_id,
-                            'title': service_request.title,
-                            'role_name': service_request.role_name,
-                            'technology': service_request.technology,
-                            'specialization': service_request.specialization,
-                            'experience_level': service_request.experience_level,
-                            'start_date': service_request.start_date,
-                            'end_date': service_request.end_date,
-                            'expected_man_days': service_request.expected_man_days,
-                            'criteria_json': service_request.criteria_json,
-                            'task_description': service_request.task_description,
-                            'offer_deadline': service_request.offer_deadline,
-                            'word_mode': service_request.word_mode,
-                        }
-                    }
-                    
-                    tasks_with_request.append(task_data)
-                    
-                except ServiceRequest.DoesNotExist:
+                if not service_request:
                     continue
+
+                tasks_with_request.append({
+                    'task_id': task['task_id'],
+                    'task_name': task['task_name'],
+                    'created_time': task['created_time'],
+                    'provider_ids': provider_ids_by_request[_canonical_id(service_request['id'])],
+                    'service_request': service_request,
+                })
                         
             return Response({
                 'count': len(tasks_with_request),
+                'next_cursor': next_cursor,
                 'tasks': tasks_with_request
             }, status=status.HTTP_200_OK)
             
@@ -283,6 +472,15 @@ class ServiceRequestViewSet(
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if (
+            service_request.start_date and service_request.end_date
+            and availability.is_booked(specialist.pk, service_request.start_date, service_request.end_date)
+        ):
+            return Response(
+                {'error': 'Specialist is already booked on an active service order in the requested period'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         # Check if this supplier already submitted an offer
         existing_offer = ServiceOffer.objects.filter(
             request=service_request,
@@ -296,70 +494,67 @@ class ServiceRequestViewSet(
             )
         
         try:
-            offer = ServiceOffer.objects.create(
-                request=service_request,
-                provider=provider,
-                proposed_specialist=specialist,
-                daily_rate=validated_data['daily_rate'],
-                travel_cost=validated_data['travel_cost'],
-                total_cost=validated_data['total_cost'],
-                notes=validated_data['notes'],
-            )
+            with transaction.atomic():
+                offer = ServiceOffer.objects.create(
+                    request=service_request,
+                    provider=provider,
+                    proposed_specialist=specialist,
+                    daily_rate=validated_data['daily_rate'],
+                    travel_cost=validated_data['travel_cost'],
+                    total_cost=validated_data['total_cost'],
+                    notes=validated_data['notes'],
+                )
 
-            # Step 3: Submit offer to third party
-            third_party_api_url = f"{settings.THIRD_PARTY_API_BASE}/api/requests/service-offers/"
-            payload = {
-                "external_id": str(offer.id),
-                "service_request": str(service_request.external_id),
-                "provider_id": str(provider.id),
-                "provider_name": provider.name,
-                "specialist_id": str(specialist.id),
-                "specialist_name": specialist.full_name,
-                "status": "SUBMITTED",
-                "daily_rate": validated_data['daily_rate'],
-                "travel_cost": validated_data['travel_cost'],
-                "total_cost": validated_data['total_cost'],
-                "notes": validated_data['notes']
-            }
-            
-            try:
-                third_party_service.call_api(url=third_party_api_url, payload=serialize_for_json(payload))
-            except Exception as e:
-                print(f"Failed to update 3rd party API: {str(e)}")
-                raise Exception(f"Failed to update 3rd party API: {str(e)}")
-            
-            # Step 4: Record the submission in Flowable (but don't complete the task)
-            try:
-                # complete_task(
-                #     task_id=task_id,
-                #     action='submit_offer',
-                #     variables={
-                #         'offer_id': str(offer.id),
-                #     }
-                # )
-                record_offer_submission(
-                    task_id=task_id,
-                    offer_id=str(offer.id),
-                    provider_id=str(provider.id)
+                # Step 3: Queue the offer for the third party API
+                third_party_api_url = f"{settings.THIRD_PARTY_API_BASE}/api/requests/service-offers/"
+                payload = {
+                    "external_id": str(offer.id),
+                    "service_request": str(service_request.external_id),
+                    "provider_id": str(provider.id),
+                    "provider_name": provider.name,
+                    "specialist_id": str(specialist.id),
+                    "specialist_name": specialist.full_name,
+                    "status": "SUBMITTED",
+                    "daily_rate": validated_data['daily_rate'],
+                    "travel_cost": validated_data['travel_cost'],
+                    "total_cost": validated_data['total_cost'],
+                    "notes": validated_data['notes']
+                }
+                enqueue(
+                    kind=OutboxKind.THIRD_PARTY_POST,
+                    payload={
+                        'url': third_party_api_url,
+                        'body': serialize_for_json(payload),
+                    },
+                    idempotency_key=f"service-offer-submitted:{offer.id}",
+                )
+
+                # Step 4: Queue the Flowable mirror of submitted offers (but don't complete the task)
+                if settings.FLOWABLE_SYNC_SUBMITTED_OFFERS:
+                    enqueue(
+                        kind=OutboxKind.FLOWABLE_PUSH_OFFERS,
+                        payload={
+                            'task_id': task_id,
+                            'request_id': str(service_request.id),
+                        },
+                        idempotency_key=f"push-offers:{offer.id}",
+                    )
+
+                AuditLog.log_action(
+                    user=request.user,
+                    action_type='OFFER_SUBMITTED',
+                    action_category='OFFER_MANAGEMENT',
+                    description=f'Offer submitted for request ID {service_request.id}',
+                    entity_type='ServiceOffer',
+                    entity_id=str(offer.id),
+                    metadata={
+                        'offer_id': str(offer.id),
+                        'status': offer.status,
+                        'specialist': offer.proposed_specialist.full_name,
+                        'daily_rate': str(offer.daily_rate),
+                    },
+                    request=request
                 )
-            except Exception as e:
-                raise Exception(f"Failed to complete task: {str(e)}")
-
-            AuditLog.log_action(
-                user=request.user,
-                action_type='OFFER_SUBMITTED',
-                action_category='OFFER_MANAGEMENT',
-                description=f'Offer submitted for request ID {service_request.id}',
-                entity_type='ServiceOffer',
-                entity_id=str(offer.id),
-                metadata={
-                    'offer_id': str(offer.id),
-                    'status': offer.status,
-                    'specialist': offer.proposed_specialist.full_name,
-                    'daily_rate': str(offer.daily_rate),
-                },
-                request=request
-            )
             
             # Step 6: Return success response
             return Response({
@@ -377,6 +572,55 @@ class ServiceRequestViewSet(
             )
 
 
+    @action(detail=True, methods=['get'])
+    def candidates(self, request, pk=None):
+        """
+        Rank the caller's provider's active specialists for this request
+
+        Query params:
+        - limit: number of candidates to return (default 10, max 50)
+        - max_rate: daily rate budget; specialists above it score lower
+        """
+        service_request = self.get_object()
+
+        if not request.user.provider_id:
+            return Response(
+                {'error': 'Only users of a provider can list candidates'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        limit = request.query_params.get('limit', '10')
+        if not limit.isdigit() or not 1 <= int(limit) <= 50:
+            return Response(
+                {'error': 'limit must be an integer between 1 and 50'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_rate = request.query_params.get('max_rate')
+        if max_rate is not None:
+            try:
+                max_rate = Decimal(max_rate)
+                if not max_rate.is_finite():
+                    raise InvalidOperation
+            except InvalidOperation:
+                return Response(
+                    {'error': 'max_rate must be a number'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        candidates = rank_candidates(
+            service_request,
+            provider_id=request.user.provider_id,
+            limit=int(limit),
+            max_rate=max_rate,
+        )
+
+        return Response({
+            'request_id': str(service_request.id),
+            'count': len(candidates),
+            'candidates': candidates,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='close-offers')
     def close_offers(self, request, pk=None):
         """
@@ -386,18 +630,12 @@ class ServiceRequestViewSet(
         
         try:
             # Find active tasks for this service request
-            tasks_url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks"
             params = {
                 'processInstanceBusinessKey': str(service_request.id),
                 'taskDefinitionKey': 'reviewServiceRequestTask'
             }
             
-            response = requests.get(
-                tasks_url,
-                params=params,
-                auth=settings.FLOWABLE_AUTH,
-                timeout=10
-            )
+            response = flowable_client.get("runtime/tasks", params=params)
             response.raise_for_status()
             
             tasks = response.json().get('data', [])
@@ -410,18 +648,11 @@ class ServiceRequestViewSet(
             
             # Complete the task (this will end the process)
             task_id = tasks[0]['id']
-            complete_url = f"{settings.FLOWABLE_BASE_URL}/runtime/tasks/{task_id}"
-            
             payload = {
                 "action": "complete"
             }
             
-            response = requests.post(
-                complete_url,
-                json=payload,
-                auth=settings.FLOWABLE_AUTH,
-                timeout=10
-            )
+            response = flowable_client.post(f"runtime/tasks/{task_id}", json=payload)
             response.raise_for_status()
             
             # Update service request status
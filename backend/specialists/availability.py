@@ -0,0 +1,145 @@
+"""
+Specialist availability calendar.
+
+Every service order that still occupies its specialist is mirrored into
+one SpecialistBooking row (specialist, start_date, end_date).
+ServiceOrder.save() keeps the row in sync and
+`manage.py rebuild_specialist_bookings` rebuilds the table from scratch.
+
+Overlap lookups stay index range scans. Bookings are bucketed by span
+class (span_days.bit_length(), so class c holds spans below 2 ** c days).
+A booking of class c overlapping [start, end] must begin within
+[start - (2 ** c - 1), end], so each class is one narrow range of the
+(span_class, start_date) index, and a few very long bookings only widen
+the scan of their own class.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db.models import Max, Q
+
+from .models import Specialist, SpecialistBooking
+
+
+# Service order statuses that keep the specialist busy
+BOOKED_STATUSES = ("ACTIVE", "SUSPENDED", "PENDING_EXTENSION", "PENDING_SUBSTITUTION")
+
+
+def _specialist_pk(value):
+    # ServiceOrder stores the specialist id as free text
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def span_class(span_days):
+    """Bucket of a booking span: spans of class c are shorter than 2 ** c days"""
+    return span_days.bit_length()
+
+
+def _booking_for(order):
+    """(specialist_id, start, end) the order books, or None"""
+    if order.status not in BOOKED_STATUSES:
+        return None
+    if not order.start_date or not order.current_end_date:
+        return None
+    if order.current_end_date < order.start_date:
+        return None
+
+    specialist_id = _specialist_pk(order.current_specialist_id)
+    if specialist_id is None:
+        return None
+    return specialist_id, order.start_date, order.current_end_date
+
+
+def sync_order(order):
+    """Create, move or drop the booking of one service order"""
+    booking = _booking_for(order)
+    if booking and Specialist.objects.filter(pk=booking[0]).exists():
+        specialist_id, start, end = booking
+        SpecialistBooking.objects.update_or_create(
+            service_order_id=order.pk,
+            defaults={
+                "specialist_id": specialist_id,
+                "start_date": start,
+                "end_date": end,
+                "span_days": (end - start).days,
+                "span_class": span_class((end - start).days),
+            },
+        )
+    else:
+        SpecialistBooking.objects.filter(service_order_id=order.pk).delete()
+
+
+def rebuild_bookings(order_model=None, booking_model=None, specialist_model=None):
+    """
+    Repopulate the bookings table from the service orders table.
+    Returns the number of bookings written.
+    """
+    if order_model is None:
+        from service_orders.models import ServiceOrder as order_model
+    booking_model = booking_model or SpecialistBooking
+    specialist_model = specialist_model or Specialist
+
+    specialist_ids = set(specialist_model.objects.values_list("id", flat=True))
+    orders = order_model.objects.filter(status__in=BOOKED_STATUSES).only(
+        "id", "status", "start_date", "current_end_date", "current_specialist_id"
+    )
+
+    bookings = []
+    for order in orders.iterator(chunk_size=2000):
+        booking = _booking_for(order)
+        if booking and booking[0] in specialist_ids:
+            specialist_id, start, end = booking
+            bookings.append(booking_model(
+                service_order_id=order.pk,
+                specialist_id=specialist_id,
+                start_date=start,
+                end_date=end,
+                span_days=(end - start).days,
+                span_class=span_class((end - start).days),
+            ))
+
+    booking_model.objects.all().delete()
+    booking_model.objects.bulk_create(bookings, batch_size=1000)
+    return len(bookings)
+
+
+def overlapping(bookings, start, end):
+    """Restrict a SpecialistBooking queryset to bookings overlapping [start, end]"""
+    widest = bookings.model.objects.aggregate(widest=Max("span_class"))["widest"]
+    if widest is None:
+        return bookings.none()
+
+    # One start_date range per span class, each only as wide as its class
+    in_range = Q()
+    for bucket in range(widest + 1):
+        in_range |= Q(
+            span_class=bucket,
+            start_date__gte=start - timedelta(days=2 ** bucket - 1),
+            start_date__lte=end,
+        )
+    return bookings.filter(in_range, end_date__gte=start)
+
+
+def busy_specialist_ids(start, end):
+    """Ids of specialists booked on any day of [start, end], as a subquery"""
+    return overlapping(SpecialistBooking.objects.all(), start, end).values("specialist_id")
+
+
+def free_in_window(queryset, start, end):
+    """
+    Restrict a Specialist queryset to specialists whose availability
+    window covers [start, end] and who have no booking inside it.
+    """
+    covers = (
+        (Q(available_from__isnull=True) | Q(available_from__lte=start))
+        & (Q(available_until__isnull=True) | Q(available_until__gte=end))
+    )
+    return queryset.filter(covers).exclude(pk__in=busy_specialist_ids(start, end))
+
+
+def is_booked(specialist_id, start, end):
+    bookings = SpecialistBooking.objects.filter(specialist_id=specialist_id)
+    return overlapping(bookings, start, end).exists()
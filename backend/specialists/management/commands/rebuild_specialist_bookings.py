@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from specialists import availability
+
+
+class Command(BaseCommand):
+    help = "Rebuild the specialist availability calendar from active service orders"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            booked = availability.rebuild_bookings()
+
+        self.stdout.write(self.style.SUCCESS(f"Booked {booked} service orders"))
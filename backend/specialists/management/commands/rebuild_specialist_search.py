@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from specialists import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the specialist full-text search index (SQLite FTS5)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = search.rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} specialists"))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:40
+
+from django.db import migrations
+
+from specialists import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    search.rebuild_index(model=apps.get_model('specialists', 'Specialist'))
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
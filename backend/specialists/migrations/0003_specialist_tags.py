@@ -0,0 +1,81 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from specialists.tags import normalize_tag, split_tags
+
+
+TAG_FIELDS = {
+    'skills': 'SKILL',
+    'certifications': 'CERTIFICATION',
+    'languages_spoken': 'LANGUAGE',
+}
+
+
+def backfill_tags(apps, schema_editor):
+    Specialist = apps.get_model('specialists', 'Specialist')
+    Tag = apps.get_model('specialists', 'Tag')
+    SpecialistTag = apps.get_model('specialists', 'SpecialistTag')
+
+    rows = list(Specialist.objects.values_list('id', *TAG_FIELDS))
+
+    tags = {}
+    links = []
+    for specialist_id, *values in rows:
+        for value, kind in zip(values, TAG_FIELDS.values()):
+            for name in split_tags(value):
+                key = (kind, normalize_tag(name))
+                tags.setdefault(key, name)
+                links.append((specialist_id, key))
+
+    Tag.objects.bulk_create(
+        [Tag(kind=kind, normalized=normalized, name=name) for (kind, normalized), name in tags.items()],
+        batch_size=1000,
+    )
+    tag_ids = {(kind, normalized): tag_id for tag_id, kind, normalized in Tag.objects.values_list('id', 'kind', 'normalized')}
+
+    SpecialistTag.objects.bulk_create(
+        [SpecialistTag(specialist_id=specialist_id, tag_id=tag_ids[key]) for specialist_id, key in links],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0002_specialist_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SKILL', 'Skill'), ('CERTIFICATION', 'Certification'), ('LANGUAGE', 'Language')], max_length=20)),
+                ('name', models.CharField(help_text='Display spelling, e.g. PostgreSQL', max_length=100)),
+                ('normalized', models.CharField(editable=False, help_text='Case-folded lookup key', max_length=100)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'normalized'), name='unique_tag_per_kind')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecialistTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialist_tags', to='specialists.specialist')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialist_tags', to='specialists.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='specialist',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='specialists', through='specialists.SpecialistTag', to='specialists.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='specialisttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'specialist'), name='unique_specialist_tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:52
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from specialists.tags import tag_signature
+
+
+def backfill_signatures(apps, schema_editor):
+    Specialist = apps.get_model('specialists', 'Specialist')
+    SpecialistTag = apps.get_model('specialists', 'SpecialistTag')
+
+    tags_by_specialist = defaultdict(list)
+    for specialist_id, tag_id in SpecialistTag.objects.values_list('specialist_id', 'tag_id'):
+        tags_by_specialist[specialist_id].append(tag_id)
+
+    specialists = [
+        Specialist(id=specialist_id, tag_signature=tag_signature(tag_ids))
+        for specialist_id, tag_ids in tags_by_specialist.items()
+    ]
+    Specialist.objects.bulk_update(specialists, ['tag_signature'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('specialists', '0003_specialist_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialist',
+            name='tag_signature',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_signatures, migrations.RunPython.noop),
+    ]
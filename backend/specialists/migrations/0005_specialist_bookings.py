@@ -0,0 +1,30 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_orders', '0006_serviceorder_service_ord_status_df23c2_idx_and_more'),
+        ('specialists', '0004_specialist_tag_signature'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialistBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('span_days', models.PositiveIntegerField()),
+                ('service_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='service_orders.serviceorder')),
+                ('specialist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='specialists.specialist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['start_date', 'end_date'], name='specialists_start_d_647520_idx'), models.Index(fields=['specialist', 'start_date'], name='specialists_special_598413_idx'), models.Index(fields=['span_days'], name='specialists_span_da_de493e_idx')],
+            },
+        ),
+        # Bookings are backfilled by 0007, once span_class exists
+    ]
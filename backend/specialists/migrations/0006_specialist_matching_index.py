@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+        ('specialists', '0005_specialist_bookings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['provider', 'status', 'experience_level', 'work_mode', 'available_from', 'available_until', 'avg_daily_rate', 'tag_signature', 'id'], name='specialists_provide_0103bb_idx'),
+        ),
+    ]
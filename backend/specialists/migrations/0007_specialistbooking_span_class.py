@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 05:23
+
+from django.db import migrations, models
+
+from specialists.availability import rebuild_bookings
+
+
+def backfill_bookings(apps, schema_editor):
+    rebuild_bookings(
+        order_model=apps.get_model('service_orders', 'ServiceOrder'),
+        booking_model=apps.get_model('specialists', 'SpecialistBooking'),
+        specialist_model=apps.get_model('specialists', 'Specialist'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service_orders', '0006_serviceorder_service_ord_status_df23c2_idx_and_more'),
+        ('specialists', '0006_specialist_matching_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='specialistbooking',
+            name='specialists_span_da_de493e_idx',
+        ),
+        migrations.AddField(
+            model_name='specialistbooking',
+            name='span_class',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_bookings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='specialistbooking',
+            index=models.Index(fields=['span_class', 'start_date', 'end_date', 'specialist'], name='specialists_span_cl_34a9d1_idx'),
+        ),
+    ]
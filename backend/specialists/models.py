@@ -1,9 +1,12 @@
 import uuid
 import random
 import string
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from . import search
+from .tags import normalize_tag, split_tags, tag_signature
+
 
 WORK_MODE_CHOICES = [
     ('Remote', 'Remote'),
@@ -33,6 +36,101 @@ class TechnologyLevel(models.TextChoices):
     L5 = "L5", "L5"
 
 
+class TagKind(models.TextChoices):
+    SKILL         = "SKILL", "Skill"
+    CERTIFICATION = "CERTIFICATION", "Certification"
+    LANGUAGE      = "LANGUAGE", "Language"
+
+
+class TagQuerySet(models.QuerySet):
+    def _existing(self, keys):
+        lookup = models.Q()
+        for kind, normalized in keys:
+            lookup |= models.Q(kind=kind, normalized=normalized)
+        return {
+            (kind, normalized): tag_id
+            for tag_id, kind, normalized in self.filter(lookup).values_list("id", "kind", "normalized")
+        }
+
+    def ensure(self, wanted):
+        """
+        Ids of the tags in `wanted` ({(kind, normalized): display name}),
+        creating any that do not exist yet
+        """
+        if not wanted:
+            return []
+
+        found = self._existing(wanted)
+        missing = [
+            Tag(kind=kind, name=wanted[(kind, normalized)], normalized=normalized)
+            for kind, normalized in wanted
+            if (kind, normalized) not in found
+        ]
+        if missing:
+            # ignore_conflicts: a concurrent save may have created the same tag
+            self.bulk_create(missing, ignore_conflicts=True)
+            found = self._existing(wanted)
+        return list(found.values())
+
+
+class Tag(models.Model):
+    kind       = models.CharField(max_length=20, choices=TagKind.choices)
+    name       = models.CharField(max_length=100, help_text="Display spelling, e.g. PostgreSQL")
+    normalized = models.CharField(max_length=100, editable=False, help_text="Case-folded lookup key")
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "normalized"], name="unique_tag_per_kind"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized = normalize_tag(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
+
+
+class SpecialistQuerySet(models.QuerySet):
+    def _tag_ids(self, kind, names):
+        return list(
+            Tag.objects.filter(kind=kind, normalized__in=[normalize_tag(name) for name in names])
+            .values_list("id", flat=True)
+        )
+
+    def with_any_tags(self, kind, names):
+        """Specialists having at least one of `names` (tag kind `kind`)"""
+        tag_ids = self._tag_ids(kind, names)
+        return self.filter(
+            id__in=SpecialistTag.objects.filter(tag_id__in=tag_ids).values("specialist_id")
+        )
+
+    def with_all_tags(self, kind, names):
+        """
+        Specialists having every one of `names`. Answered from the
+        (tag, specialist) index: the posting lists of the requested tags
+        are merged and only specialists present in all of them are kept.
+        """
+        wanted = {normalize_tag(name) for name in names}
+        if not wanted:
+            return self
+        tag_ids = self._tag_ids(kind, wanted)
+        if len(tag_ids) < len(wanted):
+            # At least one tag is unknown, so nobody can have all of them
+            return self.none()
+
+        matching = (
+            SpecialistTag.objects.filter(tag_id__in=tag_ids)
+            .values("specialist_id")
+            .annotate(matched=models.Count("tag_id"))
+            .filter(matched=len(tag_ids))
+            .values("specialist_id")
+        )
+        return self.filter(id__in=matching)
+
+
 class Specialist(models.Model):
     id       = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     provider = models.ForeignKey(
@@ -71,9 +169,33 @@ class Specialist(models.Model):
     languages_spoken = models.CharField(max_length=200, help_text="Comma-separated languages (e.g., English, Spanish)")
     notes = models.TextField(blank=True, null=True, help_text="Internal notes")
 
+    # Normalized mirror of skills / certifications / languages_spoken
+    tags = models.ManyToManyField(Tag, through="SpecialistTag", related_name="specialists", blank=True)
+    # Sorted tag ids as ",3,17,42," so one row can be scored against a tag
+    # set without a join (see service_requests.matching)
+    tag_signature = models.TextField(blank=True, default="", editable=False)
+
     created_at        = models.DateTimeField(auto_now_add=True)
     updated_at        = models.DateTimeField(auto_now=True)
 
+    objects = SpecialistQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers the scoring scan of service_requests.matching.rank_candidates
+            models.Index(fields=[
+                "provider", "status", "experience_level", "work_mode",
+                "available_from", "available_until", "avg_daily_rate", "tag_signature", "id",
+            ]),
+        ]
+
+    # Text field -> tag kind it is mirrored into
+    TAG_FIELDS = {
+        "skills": TagKind.SKILL,
+        "certifications": TagKind.CERTIFICATION,
+        "languages_spoken": TagKind.LANGUAGE,
+    }
+
     def save(self, *args, **kwargs):
         if not self.specialist_code:
             self.specialist_code = self._generate_specialist_code()
@@ -81,7 +203,11 @@ class Specialist(models.Model):
         max_attempts = 10
         for attempt in range(max_attempts):
             try:
-                super().save(*args, **kwargs)
+                # Keep the full-text search row in the same transaction
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                    search.index_specialist(self)
+                    self.sync_tags()
                 break
             except IntegrityError as e:
                 if 'specialist_code' in str(e) and attempt < max_attempts - 1:
@@ -90,6 +216,32 @@ class Specialist(models.Model):
                 else:
                     raise
 
+    def delete(self, *args, **kwargs):
+        specialist_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            search.unindex_specialist(specialist_id)
+        return result
+
+    def sync_tags(self):
+        """Mirror the comma-separated text fields into SpecialistTag rows"""
+        wanted = {}
+        for field, kind in self.TAG_FIELDS.items():
+            for name in split_tags(getattr(self, field)):
+                wanted[(kind, normalize_tag(name))] = name
+
+        tag_ids = Tag.objects.ensure(wanted)
+        SpecialistTag.objects.filter(specialist=self).exclude(tag_id__in=tag_ids).delete()
+        SpecialistTag.objects.bulk_create(
+            [SpecialistTag(specialist=self, tag_id=tag_id) for tag_id in tag_ids],
+            ignore_conflicts=True,
+        )
+
+        signature = tag_signature(tag_ids)
+        if signature != self.tag_signature:
+            self.tag_signature = signature
+            Specialist.objects.filter(pk=self.pk).update(tag_signature=signature)
+
     @staticmethod
     def _generate_specialist_code():
         """
@@ -113,4 +265,44 @@ class Specialist(models.Model):
         """Returns certifications as a list"""
         if not self.certifications:
             return []
-        return [cert.strip() for cert in self.certifications.split(',') if cert.strip()]
\ No newline at end of file
+        return [cert.strip() for cert in self.certifications.split(',') if cert.strip()]
+
+
+class SpecialistTag(models.Model):
+    specialist = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name="specialist_tags")
+    tag        = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="specialist_tags")
+
+    class Meta:
+        constraints = [
+            # (tag, specialist) order makes this the inverted index for tag lookups
+            models.UniqueConstraint(fields=["tag", "specialist"], name="unique_specialist_tag"),
+        ]
+
+
+class SpecialistBooking(models.Model):
+    """
+    Interval during which an active service order occupies a specialist.
+    Maintained from ServiceOrder.save(); see specialists.availability.
+    """
+    specialist    = models.ForeignKey(Specialist, on_delete=models.CASCADE, related_name="bookings")
+    service_order = models.OneToOneField(
+        "service_orders.ServiceOrder",
+        on_delete=models.CASCADE,
+        related_name="booking",
+    )
+    start_date = models.DateField()
+    end_date   = models.DateField()
+    # end_date - start_date
+    span_days  = models.PositiveIntegerField()
+    # span_days.bit_length(); bounds the start_date range scanned per class
+    span_class = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_date", "end_date"]),
+            models.Index(fields=["specialist", "start_date"]),
+            models.Index(fields=["span_class", "start_date", "end_date", "specialist"]),
+        ]
+
+    def __str__(self):
+        return f"{self.specialist_id}: {self.start_date} - {self.end_date}"
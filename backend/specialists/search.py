@@ -0,0 +1,164 @@
+"""
+Full-text skill search for specialists.
+
+SQLite: an FTS5 table (`specialists_specialist_fts`) holding one row per
+specialist. Specialist.save()/delete() keep it in sync and
+`manage.py rebuild_specialist_search` rebuilds it from scratch.
+
+PostgreSQL: a GIN index on the to_tsvector() expression below. Postgres
+maintains it by itself, so the sync hooks are no-ops there.
+"""
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import Q
+
+
+SEARCH_FIELDS = (
+    "role_name",
+    "experience_level",
+    "skills",
+    "languages_spoken",
+    "specialization",
+    "certifications",
+)
+
+FTS_TABLE = "specialists_specialist_fts"
+SPECIALIST_TABLE = "specialists_specialist"
+
+PG_INDEX = "specialists_specialist_search_gin"
+
+
+def _pg_document(qualifier=""):
+    # Queries must repeat the indexed expression for the GIN index to apply
+    return "to_tsvector('simple', {})".format(
+        " || ' ' || ".join(f"coalesce({qualifier}{field}, '')" for field in SEARCH_FIELDS)
+    )
+
+
+def _fts_rowid(specialist_id):
+    # Stable 63-bit integer key derived from the UUID, so updates and
+    # deletes hit the FTS rowid index instead of scanning
+    return uuid.UUID(str(specialist_id)).int >> 65
+
+
+def create_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        columns = ", ".join(SEARCH_FIELDS)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"specialist_id UNINDEXED, {columns}, "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {SPECIALIST_TABLE} USING GIN (({_pg_document()}))"
+        )
+
+
+def drop_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+def index_specialist(specialist):
+    """Insert or refresh one specialist's search row"""
+    if connection.vendor != "sqlite":
+        return
+
+    columns = ", ".join(SEARCH_FIELDS)
+    placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 2))
+    values = [getattr(specialist, field) or "" for field in SEARCH_FIELDS]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [_fts_rowid(specialist.pk)])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, specialist_id, {columns}) VALUES ({placeholders})",
+            [_fts_rowid(specialist.pk), specialist.pk.hex, *values],
+        )
+
+
+def unindex_specialist(specialist_id):
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [_fts_rowid(specialist_id)])
+
+
+def rebuild_index(model=None):
+    """
+    Repopulate the FTS table from the specialists table.
+    Returns the number of indexed rows.
+    """
+    if connection.vendor != "sqlite":
+        return 0
+
+    if model is None:
+        from .models import Specialist as model
+
+    columns = ", ".join(SEARCH_FIELDS)
+    placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 2))
+    rows = (
+        [_fts_rowid(row[0]), row[0].hex, *[value or "" for value in row[1:]]]
+        for row in model.objects.values_list("id", *SEARCH_FIELDS).iterator(chunk_size=2000)
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, specialist_id, {columns}) VALUES ({placeholders})",
+            rows,
+        )
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def search_terms(text):
+    """Lower-cased word tokens of a free-text query"""
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def search(queryset, text):
+    """
+    Restrict `queryset` to specialists matching every word of `text`
+    (each word as a prefix), ordered best match first.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f"{FTS_TABLE}.specialist_id = {SPECIALIST_TABLE}.id",
+                f"{FTS_TABLE} MATCH %s",
+            ],
+            params=[match],
+            select={"search_rank": f"{FTS_TABLE}.rank"},
+        ).order_by("search_rank")
+
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        document = _pg_document(f"{SPECIALIST_TABLE}.")
+        return queryset.extra(
+            where=[f"{document} @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+            select={"search_rank": f"ts_rank({document}, to_tsquery('simple', %s))"},
+            select_params=[tsquery],
+        ).order_by("-search_rank")
+
+    # Other backends: fall back to substring matching on every field
+    for term in terms:
+        term_filter = Q()
+        for field in SEARCH_FIELDS:
+            term_filter |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(term_filter)
+    return queryset
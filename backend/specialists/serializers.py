@@ -7,5 +7,5 @@ class SpecialistSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Specialist
-        fields = '__all__'
+        exclude = ['tags', 'tag_signature']
         read_only_fields = ["id", "specialist_code", "created_at", "updated_at", "provider"]
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+Helpers for the normalized skill / certification / language tags.
+
+The comma-separated text fields on Specialist stay the write interface;
+Specialist.sync_tags() mirrors them into Tag / SpecialistTag rows.
+"""
+
+
+def normalize_tag(name):
+    """Canonical lookup key: whitespace collapsed and case-folded"""
+    return " ".join(name.split()).casefold()
+
+
+def split_tags(text):
+    """
+    Split a comma-separated field into display names, dropping blanks and
+    case-insensitive duplicates (the first spelling wins)
+    """
+    names = {}
+    for part in (text or "").split(","):
+        name = " ".join(part.split())
+        if name:
+            names.setdefault(normalize_tag(name), name)
+    return list(names.values())
+
+
+def parse_tag_param(value):
+    """Normalized keys from a comma-separated query param"""
+    return list({normalize_tag(name) for name in split_tags(value)})
+
+
+def tag_signature(tag_ids):
+    """Delimited, sorted tag ids (",3,17,42,"); "" when there are none"""
+    if not tag_ids:
+        return ""
+    return "," + ",".join(str(tag_id) for tag_id in sorted(tag_ids)) + ","
+
+
+def signature_token(tag_id):
+    """Substring that is present in a signature exactly when it holds `tag_id`"""
+    return f",{tag_id},"
@@ -1,3 +1,413 @@
-from django.test import TestCase
+import os
+import random
+import statistics
+import time
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from providers.models import Provider
+from service_orders.models import ServiceOrder
+from service_orders.tests import make_order
+from . import availability, search
+from .models import Specialist, SpecialistBooking, SpecialistTag, Tag, TagKind
+from .tags import signature_token, tag_signature
+
+# Specialists seeded for the search benchmark
+SEARCH_BENCHMARK_ROWS = int(os.getenv("SPECIALIST_SEARCH_BENCHMARK_ROWS", "200000"))
+# Bookings seeded for the availability benchmark
+BOOKING_BENCHMARK_ROWS = int(os.getenv("BOOKING_BENCHMARK_ROWS", "100000"))
+
+
+def make_specialist(provider, i=0, **fields):
+    """An unsaved specialist; save() it, or bulk_create it and rebuild the search index"""
+    values = {
+        "first_name": "Spec",
+        "last_name": f"Ialist {i}",
+        "email": f"specialist{i}@example.com",
+        "specialist_code": f"SPE-T{i:06d}",
+        "role_name": "Software Engineer",
+        "experience_level": "SENIOR",
+        "skills": "Python, Django",
+        "languages_spoken": "English",
+        "location": "Berlin, Germany",
+    }
+    values.update(fields)
+    return Specialist(provider=provider, **values)
+
+
+class SpecialistSearchTests(TestCase):
+    url = "/api/specialists/specialists/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.other_provider = Provider.objects.create(name="Other", email="other@example.com", phone="2")
+        cls.user = User.objects.create(username="rep", role="SUPPLIER_REP", provider=cls.provider)
+
+        specialists = {
+            "django_dev": make_specialist(
+                cls.provider, 1, role_name="Django Developer", skills="Python, Django, PostgreSQL"
+            ),
+            "generalist": make_specialist(
+                cls.provider, 2, skills="Java, Spring, Kotlin, Django, React, AWS, Terraform, Go"
+            ),
+            "frontend": make_specialist(
+                cls.provider, 3, role_name="Frontend Engineer", skills="React, TypeScript",
+                languages_spoken="Français, English",
+            ),
+            "on_leave": make_specialist(cls.provider, 4, skills="Django", status="On_Leave"),
+            "elsewhere": make_specialist(cls.other_provider, 5, skills="Django"),
+        }
+        for specialist in specialists.values():
+            specialist.save()
+        cls.specialists = specialists
+
+    def _matches(self, text, queryset=None):
+        queryset = Specialist.objects.all() if queryset is None else queryset
+        return [specialist.pk for specialist in search.search(queryset, text)]
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self._matches("typescr"), [self.specialists["frontend"].pk])
+        self.assertEqual(self._matches("pyth postg"), [self.specialists["django_dev"].pk])
+        self.assertEqual(self._matches("python cobol"), [])
+
+    def test_matching_is_case_and_accent_insensitive(self):
+        self.assertEqual(self._matches("FRANCAIS"), [self.specialists["frontend"].pk])
+
+    def test_best_match_first(self):
+        # django_dev mentions Django in two short fields, generalist once in a long list
+        ranked = self._matches("django", Specialist.objects.filter(provider=self.provider, status="Active"))
+        self.assertEqual(ranked, [self.specialists["django_dev"].pk, self.specialists["generalist"].pk])
+
+    def test_query_without_words_matches_nothing(self):
+        self.assertEqual(self._matches(" ,.- "), [])
+
+    def test_save_and_delete_keep_the_index_current(self):
+        frontend = self.specialists["frontend"]
+        frontend.skills = "Vue, Elixir"
+        frontend.save()
+        self.assertEqual(self._matches("typescript"), [])
+        self.assertEqual(self._matches("elixir"), [frontend.pk])
+
+        frontend.delete()
+        self.assertEqual(self._matches("elixir"), [])
+
+    def test_rebuild_picks_up_bulk_imports(self):
+        imported = Specialist.objects.bulk_create([make_specialist(self.provider, 10, skills="Haskell")])
+        self.assertEqual(self._matches("haskell"), [])
+
+        self.assertEqual(search.rebuild_index(), Specialist.objects.count())
+        self.assertEqual(self._matches("haskell"), [imported[0].pk])
+
+    def test_endpoint_searches_own_active_specialists(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(self.url, {"q": "djan"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]],
+            [str(self.specialists["django_dev"].pk), str(self.specialists["generalist"].pk)],
+        )
+
+
+class SpecialistTagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.backend = make_specialist(cls.provider, 1, skills="Python, Django, PostgreSQL")
+        cls.fullstack = make_specialist(cls.provider, 2, skills="python ,React,  Django")
+        cls.gopher = make_specialist(cls.provider, 3, skills="Go", certifications="CKA")
+        for specialist in (cls.backend, cls.fullstack, cls.gopher):
+            specialist.save()
+
+    def _ids(self, queryset):
+        return set(queryset.values_list("pk", flat=True))
+
+    def _skills(self, specialist):
+        return set(specialist.tags.filter(kind=TagKind.SKILL).values_list("normalized", flat=True))
+
+    def test_fields_are_mirrored_into_shared_tags(self):
+        self.assertEqual(self._skills(self.fullstack), {"python", "react", "django"})
+        # One row per (kind, normalized name), spelled as first seen
+        self.assertEqual(Tag.objects.get(kind=TagKind.SKILL, normalized="python").name, "Python")
+        self.assertEqual(Tag.objects.filter(normalized="python").count(), 1)
+
+    def test_with_any_tags_vs_with_all_tags(self):
+        specialists = Specialist.objects.all()
+        wanted = ["PYTHON", "react"]
+
+        self.assertEqual(self._ids(specialists.with_any_tags(TagKind.SKILL, wanted)), {self.backend.pk, self.fullstack.pk})
+        self.assertEqual(self._ids(specialists.with_all_tags(TagKind.SKILL, wanted)), {self.fullstack.pk})
+        self.assertEqual(self._ids(specialists.with_all_tags(TagKind.SKILL, ["Django", "python"])), {self.backend.pk, self.fullstack.pk})
+
+        # An unknown tag: nobody has all of them, some have any of them
+        self.assertEqual(self._ids(specialists.with_all_tags(TagKind.SKILL, ["Python", "COBOL"])), set())
+        self.assertEqual(len(self._ids(specialists.with_any_tags(TagKind.SKILL, ["Python", "COBOL"]))), 2)
+        # The kind is part of the match
+        self.assertEqual(self._ids(specialists.with_any_tags(TagKind.SKILL, ["CKA"])), set())
+        self.assertEqual(self._ids(specialists.with_all_tags(TagKind.SKILL, [])), self._ids(specialists))
+
+    def test_resync_removes_stale_tags(self):
+        self.backend.skills = "Django, Rust"
+        self.backend.save()
+
+        self.assertEqual(self._skills(self.backend), {"django", "rust"})
+        # Plus the English language tag
+        self.assertEqual(SpecialistTag.objects.filter(specialist=self.backend).count(), 3)
+        self.assertEqual(self._ids(Specialist.objects.with_any_tags(TagKind.SKILL, ["PostgreSQL"])), set())
+        self.assertEqual(self._ids(Specialist.objects.with_any_tags(TagKind.SKILL, ["Python"])), {self.fullstack.pk})
+
+        self.backend.skills = ""
+        self.backend.languages_spoken = ""
+        self.backend.save()
+        self.assertEqual(self._skills(self.backend), set())
+        self.backend.refresh_from_db()
+        self.assertEqual(self.backend.tag_signature, "")
+
+    def test_tag_signature_is_sorted(self):
+        self.assertEqual(tag_signature([42, 3, 17]), ",3,17,42,")
+        self.assertEqual(tag_signature([]), "")
+        # Delimited, so tag 1 is not found inside tag 11
+        self.assertNotIn(signature_token(1), tag_signature([11, 21]))
+
+        # Same tags in another order and spelling: same signature
+        again = make_specialist(self.provider, 4, skills="postgresql, DJANGO, Python")
+        again.save()
+        self.backend.refresh_from_db()
+        self.assertEqual(again.tag_signature, self.backend.tag_signature)
+        self.assertEqual(self.backend.tag_signature, tag_signature(self.backend.tags.values_list("pk", flat=True)))
+
+
+class TagBackfillMigrationTests(TransactionTestCase):
+    """0003 and 0004 build the tags and signatures of existing specialists"""
+
+    before = [("specialists", "0002_specialist_search_index")]
+    after = [("specialists", "0004_specialist_tag_signature")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_existing_specialists_are_backfilled(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        provider = old_apps.get_model("providers", "Provider").objects.create(name="Acme", email="acme@example.com", phone="1")
+
+        OldSpecialist = old_apps.get_model("specialists", "Specialist")
+        ids = {}
+        for i, (skills, certifications) in enumerate((("Python, python , Django", "AWS"), ("django", None), ("", ""))):
+            fields = make_specialist(None, i, skills=skills, certifications=certifications)
+            ids[i] = OldSpecialist.objects.create(
+                provider_id=provider.pk,
+                **{field: getattr(fields, field) for field in (
+                    "first_name", "last_name", "email", "specialist_code", "role_name",
+                    "experience_level", "skills", "certifications", "languages_spoken", "location",
+                )},
+            ).pk
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        new_apps = executor.loader.project_state(self.after).apps
+        NewTag = new_apps.get_model("specialists", "Tag")
+        NewSpecialistTag = new_apps.get_model("specialists", "SpecialistTag")
+        NewSpecialist = new_apps.get_model("specialists", "Specialist")
+
+        self.assertEqual(
+            set(NewTag.objects.values_list("kind", "normalized", "name")),
+            {("SKILL", "python", "Python"), ("SKILL", "django", "Django"), ("CERTIFICATION", "aws", "AWS"), ("LANGUAGE", "english", "English")},
+        )
+        tag_ids = {normalized: tag_id for tag_id, normalized in NewTag.objects.values_list("id", "normalized")}
+        links = lambda i: set(NewSpecialistTag.objects.filter(specialist_id=ids[i]).values_list("tag_id", flat=True))
+        self.assertEqual(links(0), {tag_ids["python"], tag_ids["django"], tag_ids["aws"], tag_ids["english"]})
+        self.assertEqual(links(1), {tag_ids["django"], tag_ids["english"]})
+
+        signatures = dict(NewSpecialist.objects.values_list("id", "tag_signature"))
+        self.assertEqual(signatures[ids[0]], tag_signature(links(0)))
+        self.assertEqual(signatures[ids[1]], tag_signature(links(1)))
+        self.assertEqual(signatures[ids[2]], tag_signature(links(2)))
+
+
+class SpecialistSearchBenchmark(TestCase):
+    """Ranked top-25 search over SEARCH_BENCHMARK_ROWS specialists"""
+
+    SKILLS = ["Python", "Django", "React", "Java", "Spring", "AWS", "Kubernetes", "Go", "Rust", "SQL", "Azure", "Vue"]
+
+    @classmethod
+    def setUpTestData(cls):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        skills = cls.SKILLS
+        for first in range(0, SEARCH_BENCHMARK_ROWS, 10000):
+            Specialist.objects.bulk_create(
+                make_specialist(
+                    provider,
+                    i,
+                    skills=", ".join(skills[(i + k) % len(skills)] for k in range(1 + i % 4)),
+                    # A rare certification: one specialist in ~1000
+                    certifications="COBOL Certified" if i % 997 == 0 else "AWS Solutions Architect",
+                )
+                for i in range(first, min(first + 10000, SEARCH_BENCHMARK_ROWS))
+            )
+        search.rebuild_index()
+
+    def _p50(self, text, runs=11):
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = list(search.search(Specialist.objects.all(), text).values_list("pk", flat=True)[:25])
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), rows
+
+    def test_selective_search_is_fast(self):
+        selective, rows = self._p50("cobol")
+        prefix, _ = self._p50("cob cert")
+        broad, broad_rows = self._p50("kubernetes")
+
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len(broad_rows), 25)
+        print(
+            f"\nSpecialist search over {SEARCH_BENCHMARK_ROWS} specialists (ranked top 25, p50): "
+            f"'cobol' {selective * 1000:.2f} ms, 'cob cert' {prefix * 1000:.2f} ms, "
+            f"'kubernetes' (~1/4 of rows) {broad * 1000:.2f} ms"
+        )
+        self.assertLess(selective, 0.010)
+        self.assertLess(prefix, 0.010)
+
+
+def seed_bookings(specialists, intervals):
+    """One booking (with its service order) per (specialist, start, end)"""
+    orders = ServiceOrder.objects.bulk_create(
+        [make_order(i, start=start, end=end) for i, (_, start, end) in enumerate(intervals)],
+        batch_size=5000,
+    )
+    SpecialistBooking.objects.bulk_create(
+        [
+            SpecialistBooking(
+                service_order=order,
+                specialist=specialist,
+                start_date=start,
+                end_date=end,
+                span_days=(end - start).days,
+                span_class=availability.span_class((end - start).days),
+            )
+            for order, (specialist, start, end) in zip(orders, intervals)
+        ],
+        batch_size=5000,
+    )
+
+
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        cls.specialists = Specialist.objects.bulk_create(make_specialist(provider, i) for i in range(40))
+
+        rnd = random.Random(17)
+        origin = date(2027, 1, 1)
+        intervals = []
+        for i in range(400):
+            start = origin + timedelta(days=rnd.randint(0, 700))
+            intervals.append((cls.specialists[i % 40], start, start + timedelta(days=rnd.randint(0, 60))))
+        # Long-span outliers, one starting years before every short booking
+        intervals.append((cls.specialists[0], date(2015, 1, 1), date(2045, 1, 1)))
+        intervals.append((cls.specialists[1], date(2020, 6, 1), date(2027, 2, 1)))
+        seed_bookings(cls.specialists, intervals)
+        cls.intervals = intervals
+
+    def _expected(self, start, end):
+        return {specialist.pk for specialist, first, last in self.intervals if first <= end and last >= start}
+
+    def test_busy_specialists_match_brute_force(self):
+        rnd = random.Random(3)
+        windows = [(date(2027, 1, 15), date(2027, 1, 15)), (date(2030, 1, 1), date(2030, 12, 31))]
+        for _ in range(50):
+            start = date(2026, 10, 1) + timedelta(days=rnd.randint(0, 900))
+            windows.append((start, start + timedelta(days=rnd.randint(0, 90))))
+
+        for start, end in windows:
+            busy = set(availability.busy_specialist_ids(start, end).values_list("specialist_id", flat=True))
+            self.assertEqual(busy, self._expected(start, end), (start, end))
+
+    def test_outlier_bookings_are_found(self):
+        # Only the 2015-2045 booking covers this window
+        start, end = date(2040, 1, 1), date(2040, 1, 31)
+        self.assertEqual(set(availability.busy_specialist_ids(start, end).values_list("specialist_id", flat=True)), {self.specialists[0].pk})
+        self.assertTrue(availability.is_booked(self.specialists[0].pk, start, end))
+        self.assertFalse(availability.is_booked(self.specialists[2].pk, start, end))
+
+    def test_free_in_window(self):
+        start, end = date(2027, 3, 1), date(2027, 3, 31)
+        free = set(availability.free_in_window(Specialist.objects.all(), start, end).values_list("pk", flat=True))
+        self.assertEqual(free, {specialist.pk for specialist in self.specialists} - self._expected(start, end))
+
+    def test_service_order_save_keeps_span_class(self):
+        order = make_order(999, start=date(2027, 1, 1), end=date(2027, 1, 10))
+        order.current_specialist_id = str(self.specialists[5].pk)
+        order.save()
+        self.assertEqual((order.booking.span_days, order.booking.span_class), (9, 4))
+
+        order.current_end_date = date(2028, 1, 1)
+        order.save()
+        order.booking.refresh_from_db()
+        self.assertEqual((order.booking.span_days, order.booking.span_class), (365, 9))
+
+    def test_each_span_class_is_an_index_range(self):
+        sql, params = availability.busy_specialist_ids(date(2027, 3, 1), date(2027, 3, 31)).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("span_class=? AND start_date>? AND start_date<?", plan.replace("start_date>=", "start_date>").replace("start_date<=", "start_date<"))
+        self.assertNotIn("SCAN", plan)
+
+
+class AvailabilityBenchmark(TestCase):
+    """Short-window overlap lookup with one decades-long booking in the table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        provider = Provider.objects.create(name="Acme", email="acme@example.com", phone="1")
+        specialists = Specialist.objects.bulk_create(make_specialist(provider, i) for i in range(1000))
+        rnd = random.Random(5)
+        origin = date(2020, 1, 1)
+        intervals = []
+        for i in range(BOOKING_BENCHMARK_ROWS):
+            start = origin + timedelta(days=rnd.randint(0, 3650))
+            intervals.append((specialists[i % 1000], start, start + timedelta(days=rnd.randint(5, 90))))
+        intervals.append((specialists[0], date(2000, 1, 1), date(2049, 12, 31)))
+        seed_bookings(specialists, intervals)
+
+    def _p50(self, queryset, runs=15):
+        # count() keeps the timing on the index scan rather than row conversion
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = queryset.count()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings), rows
+
+    def test_outlier_does_not_widen_the_scan(self):
+        # Late in the seeded decade, so nearly every booking starts after 2000
+        start, end = date(2029, 9, 1), date(2029, 9, 30)
+        bucketed, busy = self._p50(availability.overlapping(SpecialistBooking.objects.all(), start, end))
+
+        # The single table-wide bound: every booking starting after 2000 is scanned
+        longest = (date(2049, 12, 31) - date(2000, 1, 1)).days
+        widened = SpecialistBooking.objects.filter(
+            start_date__gte=start - timedelta(days=longest), start_date__lte=end, end_date__gte=start
+        )
+        table_wide, expected = self._p50(widened)
+
+        self.assertEqual(busy, expected)
+        print(
+            f"\nOverlapping bookings over {BOOKING_BENCHMARK_ROWS} with one 50-year booking: "
+            f"span classes {bucketed * 1000:.2f} ms, table-wide bound {table_wide * 1000:.2f} ms (p50)"
+        )
+        self.assertLess(bucketed * 3, table_wide)
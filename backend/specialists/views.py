@@ -1,10 +1,14 @@
-from rest_framework import viewsets
+from datetime import date
+
+from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
 
-from .models import Specialist
+from .models import Specialist, TagKind
+from .tags import parse_tag_param
+from . import search as specialist_search
+from . import availability
 from .serializers import SpecialistSerializer
 from providers.permissions import IsProviderAdmin
 from audit_log.models import AuditLog
@@ -25,30 +29,77 @@ class SpecialistViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsProviderAdmin()]
         return [AllowAny()]
 
+    # ?skills_all=Python,AWS / ?skills_any=... etc., answered from the tag index
+    tag_filters = {
+        "skills": TagKind.SKILL,
+        "certifications": TagKind.CERTIFICATION,
+        "languages": TagKind.LANGUAGE,
+    }
+
+    def filter_by_tags(self, queryset):
+        params = self.request.query_params
+        for prefix, kind in self.tag_filters.items():
+            all_of = parse_tag_param(params.get(f"{prefix}_all"))
+            if all_of:
+                queryset = queryset.with_all_tags(kind, all_of)
+
+            any_of = parse_tag_param(params.get(f"{prefix}_any"))
+            if any_of:
+                queryset = queryset.with_any_tags(kind, any_of)
+        return queryset
+
     def get_queryset(self):
         user = self.request.user
-        queryset = self.queryset
+        queryset = self.filter_by_tags(self.queryset)
 
         if user.is_authenticated and (user.is_staff or user.is_superuser):
             return queryset.order_by("-created_at")
         
         search = self.request.query_params.get("q")
         if search:
-            queryset = queryset.filter(status="Active", provider=user.provider).filter(
-                Q(role_name__icontains=search) |
-                Q(experience_level__icontains=search) |
-                Q(skills__icontains=search) |
-                Q(languages_spoken__icontains=search) |
-                Q(specialization__icontains=search) |
-                Q(certifications__icontains=search)
-            )
-            return queryset.order_by("-created_at")
+            # Full-text index lookup, best match first
+            queryset = queryset.filter(status="Active", provider=user.provider)
+            return specialist_search.search(queryset, search)
         
         if user.is_authenticated and hasattr(user, 'provider'):
             return queryset.filter(provider=user.provider).order_by("-created_at")
 
         return queryset.order_by("-created_at")
 
+    @action(detail=False, methods=['get'], url_path='available')
+    def available(self, request):
+        """
+        Specialists free for the whole window, i.e. inside their availability
+        window and not booked on an active service order
+
+        Query params:
+        - start, end: ISO dates (YYYY-MM-DD), inclusive
+        """
+        try:
+            start = date.fromisoformat(request.query_params.get('start', ''))
+            end = date.fromisoformat(request.query_params.get('end', ''))
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be dates in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if end < start:
+            return Response(
+                {'error': 'end must not be before start'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = availability.free_in_window(self.filter_queryset(self.get_queryset()), start, end)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         # Auto-assign provider based on logged-in user
         specialist = serializer.save(provider=self.request.user.provider)